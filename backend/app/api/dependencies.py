@@ -2,6 +2,7 @@ from typing import Generator
 from fastapi import Depends
 from app.services.prediction import PredictionService
 from app.services.model_trainer import ModelTrainingService
+from app.services.scenarios import ScenarioService
 
 # Dependency for getting PredictionService instance
 def get_prediction_service() -> Generator[PredictionService, None, None]:
@@ -13,4 +14,12 @@ def get_prediction_service() -> Generator[PredictionService, None, None]:
 def get_training_service() -> Generator[ModelTrainingService, None, None]:
     """Dependency to inject ModelTrainingService instance."""
     service = ModelTrainingService()
+    yield service
+
+# Dependency for getting ScenarioService instance
+def get_scenario_service(
+    prediction_service: PredictionService = Depends(get_prediction_service)
+) -> Generator[ScenarioService, None, None]:
+    """Dependency to inject ScenarioService instance."""
+    service = ScenarioService(prediction_service)
     yield service
\ No newline at end of file
@@ -1,26 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, List, Any, Union
+import asyncio
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Dict, List, Any, Optional, Union
 
 from app.services.prediction import PredictionService
 from app.services.model_trainer import ModelTrainingService
-from app.api.dependencies import get_prediction_service, get_training_service
+from app.services.scenarios import ScenarioService
+from app.services.species import get_species_catalog
+from app.services.monitoring import anomaly_monitor, early_exit_monitor
+from app.services.prediction_log import prediction_log
+from app.api.dependencies import get_prediction_service, get_training_service, get_scenario_service
 from app.models.schemas import (
     BasicFishPredictionRequest,
     AdvancedFishPredictionRequest,
+    BasicFishBatchPredictionRequest,
+    AdvancedFishBatchPredictionRequest,
+    BasicFishColumnarRequest,
+    AdvancedFishColumnarRequest,
+    ColumnarPredictionResponse,
     WaterQualityRequest,
+    WaterQualityForecastRequest,
+    WaterQualityForecastResponse,
     PredictionResponse,
+    BatchPredictionResponse,
+    FishSpeciesInfo,
+    SpeciesFormat,
+    SensitivitySweepRequest,
+    SensitivitySweepResponse,
+    RecommendationRequest,
+    RecommendationResponse,
+    NearestSamplesResponse,
     TrainingRequest,
     TrainingResponse,
-    ParameterInfluenceResponse
+    RollbackRequest,
+    ShadowRequest,
+    ParameterInfluenceResponse,
+    AllocationProfileRequest
+)
+from app.core.serialization import FastJSONResponse, dumps, loads
+from app.core.binary_formats import (
+    JSON,
+    ARROW_STREAM,
+    MSGPACK,
+    UnsupportedMediaType,
+    request_format,
+    response_format,
+    decode_columns,
+    encode_columns
 )
+from app.core.admission import admission_stats
 from app.core.logging import logger
 
 router = APIRouter()
 
+SPECIES_FORMAT_QUERY = Query(
+    "full",
+    description="Return suitable species as full entries ('full') or by name only ('ref')"
+)
+
+EXPLAIN_QUERY = Query(
+    False,
+    description="Include per-feature contributions to the predicted species and water quality score"
+)
+
 # Prediction endpoints
-@router.post("/predict/basic", response_model=PredictionResponse, summary="Predict fish species using basic parameters")
+@router.post("/predict/basic", response_model=PredictionResponse, response_class=FastJSONResponse, summary="Predict fish species using basic parameters")
 async def predict_basic(
     data: BasicFishPredictionRequest,
+    species_format: SpeciesFormat = SPECIES_FORMAT_QUERY,
+    explain: bool = EXPLAIN_QUERY,
     prediction_service: PredictionService = Depends(get_prediction_service)
 ):
     """
@@ -29,8 +78,8 @@ async def predict_basic(
     This endpoint uses a simpler model that only requires pH, temperature, and turbidity.
     """
     try:
-        result = prediction_service.predict_basic(data)
-        return result
+        result = await asyncio.to_thread(prediction_service.predict_basic, data, explain)
+        return FastJSONResponse(prediction_service.render_prediction(result, species_format))
     except ValueError as e:
         logger.error(f"Validation error in basic prediction: {e}")
         raise HTTPException(
@@ -44,9 +93,11 @@ async def predict_basic(
             detail="An error occurred during prediction"
         )
 
-@router.post("/predict/advanced", response_model=PredictionResponse, summary="Predict fish species using comprehensive parameters")
+@router.post("/predict/advanced", response_model=PredictionResponse, response_class=FastJSONResponse, summary="Predict fish species using comprehensive parameters")
 async def predict_advanced(
     data: AdvancedFishPredictionRequest,
+    species_format: SpeciesFormat = SPECIES_FORMAT_QUERY,
+    explain: bool = EXPLAIN_QUERY,
     prediction_service: PredictionService = Depends(get_prediction_service)
 ):
     """
@@ -55,8 +106,8 @@ async def predict_advanced(
     This endpoint uses an advanced model that requires a full set of water quality parameters.
     """
     try:
-        result = prediction_service.predict_advanced(data)
-        return result
+        result = await asyncio.to_thread(prediction_service.predict_advanced, data, explain)
+        return FastJSONResponse(prediction_service.render_prediction(result, species_format))
     except ValueError as e:
         logger.error(f"Validation error in advanced prediction: {e}")
         raise HTTPException(
@@ -70,6 +121,295 @@ async def predict_advanced(
             detail="An error occurred during prediction"
         )
 
+@router.post("/predict/basic/batch", response_model=BatchPredictionResponse, response_class=FastJSONResponse, summary="Predict fish species for a batch of basic readings")
+async def predict_basic_batch(
+    data: BasicFishBatchPredictionRequest,
+    species_format: SpeciesFormat = SPECIES_FORMAT_QUERY,
+    explain: bool = EXPLAIN_QUERY,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Predict suitable fish species for many basic readings at once.
+    
+    Readings are scored with a single call per model. Use species_format=ref to
+    return suitable species by name and keep large responses small.
+    """
+    try:
+        results = await asyncio.to_thread(prediction_service.predict_basic_batch, data.readings, explain)
+        return FastJSONResponse(prediction_service.render_batch(results, species_format))
+    except ValueError as e:
+        logger.error(f"Validation error in basic batch prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in basic batch prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during prediction"
+        )
+
+@router.post("/predict/advanced/batch", response_model=BatchPredictionResponse, response_class=FastJSONResponse, summary="Predict fish species for a batch of comprehensive readings")
+async def predict_advanced_batch(
+    data: AdvancedFishBatchPredictionRequest,
+    species_format: SpeciesFormat = SPECIES_FORMAT_QUERY,
+    explain: bool = EXPLAIN_QUERY,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Predict suitable fish species for many comprehensive readings at once.
+    
+    Readings are scored with a single call per model. Use species_format=ref to
+    return suitable species by name and keep large responses small.
+    """
+    try:
+        results = await asyncio.to_thread(prediction_service.predict_advanced_batch, data.readings, explain)
+        return FastJSONResponse(prediction_service.render_batch(results, species_format))
+    except ValueError as e:
+        logger.error(f"Validation error in advanced batch prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in advanced batch prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during prediction"
+        )
+
+def _columnar_body(schema) -> Dict[str, Any]:
+    """Document a request body that the endpoint parses itself instead of through pydantic."""
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON: {"schema": schema.model_json_schema()},
+                ARROW_STREAM: binary,
+                MSGPACK: binary
+            }
+        }
+    }
+
+COLUMNAR_RESPONSES = {
+    200: {
+        "content": {ARROW_STREAM: {}, MSGPACK: {}},
+        "description": "Columnar results as JSON (default), an Arrow IPC stream or MessagePack, chosen by the Accept header"
+    }
+}
+
+async def _predict_columnar(request: Request, model_type: str, prediction_service: PredictionService, labels_only: bool = False):
+    try:
+        body_format = request_format(request.headers.get("content-type"))
+        result_format = response_format(request.headers.get("accept"))
+        body = await request.body()
+        if body_format == JSON:
+            try:
+                payload = loads(body)
+            except Exception:
+                raise ValueError("Request body is not valid JSON")
+        else:
+            payload = decode_columns(body, body_format)
+        result = await asyncio.to_thread(prediction_service.predict_columnar, model_type, payload, None, labels_only)
+        if result_format == JSON:
+            return FastJSONResponse(result)
+        return Response(encode_columns(result, result_format), media_type=result_format)
+    except UnsupportedMediaType as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        logger.error(f"Validation error in {model_type} columnar prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in {model_type} columnar prediction: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during prediction"
+        )
+
+@router.post(
+    "/predict/basic/columnar",
+    response_model=ColumnarPredictionResponse,
+    response_class=FastJSONResponse,
+    summary="Predict fish species for a columnar batch of basic readings",
+    responses=COLUMNAR_RESPONSES,
+    openapi_extra=_columnar_body(BasicFishColumnarRequest)
+)
+async def predict_basic_columnar(
+    request: Request,
+    labels_only: bool = Query(False, description="Return only the predicted species, without confidence and probabilities"),
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Predict fish species for a batch sent as one array per parameter, with optional site IDs.
+    
+    The arrays are validated as a whole (same length, numbers only, finite and within
+    each sensor's plausible range) and fed straight into the models, so large batches
+    avoid validating an object per reading. Results are returned as one array per output.
+    
+    Besides JSON, the body may be an Arrow IPC stream (application/vnd.apache.arrow.stream)
+    with one column per parameter, or a MessagePack map (application/msgpack) whose
+    values are arrays of numbers or little-endian float64 blobs. Numeric Arrow columns
+    and float64 blobs are read without copying. The response format follows the Accept
+    header, with JSON as the default.
+    
+    With labels_only, confidence and probabilities are left out. Gradient boosting
+    models with the scaler folded in then stop evaluating each reading of mid-sized
+    batches once the remaining stages cannot change its species, and early_exit
+    reports how many stages were evaluated.
+    """
+    return await _predict_columnar(request, "basic", prediction_service, labels_only)
+
+@router.post(
+    "/predict/advanced/columnar",
+    response_model=ColumnarPredictionResponse,
+    response_class=FastJSONResponse,
+    summary="Predict fish species for a columnar batch of comprehensive readings",
+    responses=COLUMNAR_RESPONSES,
+    openapi_extra=_columnar_body(AdvancedFishColumnarRequest)
+)
+async def predict_advanced_columnar(
+    request: Request,
+    labels_only: bool = Query(False, description="Return only the predicted species, without confidence and probabilities"),
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Predict fish species for a batch sent as one array per parameter, with optional site IDs.
+    
+    Dissolved oxygen may be sent as "DO" or "dissolved_oxygen". See /predict/basic/columnar
+    for how the arrays are validated.
+    """
+    return await _predict_columnar(request, "advanced", prediction_service, labels_only)
+
+@router.post("/predict/sensitivity", response_model=SensitivitySweepResponse, response_class=FastJSONResponse, summary="Sweep one or two parameters around a reading")
+async def predict_sensitivity(
+    data: SensitivitySweepRequest,
+    scenario_service: ScenarioService = Depends(get_scenario_service)
+):
+    """
+    Show how species probabilities and water quality score change as parameters vary.
+    
+    The whole grid of readings is scored in a single call per model and returned as
+    dense arrays indexed by the steps of each swept parameter.
+    """
+    try:
+        result = await asyncio.to_thread(scenario_service.sensitivity_sweep, data.model_type, data.base, data.sweeps)
+        return FastJSONResponse(result)
+    except ValueError as e:
+        logger.error(f"Validation error in sensitivity sweep: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in sensitivity sweep: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during the sensitivity sweep"
+        )
+
+@router.post("/recommendations", response_model=RecommendationResponse, summary="Find the smallest changes that reach a goal")
+async def recommend_changes(
+    data: RecommendationRequest,
+    scenario_service: ScenarioService = Depends(get_scenario_service)
+):
+    """
+    Search for the smallest parameter adjustments that make a reading reach a target.
+    
+    The target is a species, a minimum water quality score, or both. Candidate
+    adjustments are scored in batches until the time budget is spent; budgets above
+    RECOMMEND_MAX_TIME_BUDGET_MS are capped.
+    """
+    try:
+        return await asyncio.to_thread(
+            scenario_service.recommend,
+            model_type=data.model_type,
+            base=data.reading,
+            target_species=data.target_species,
+            min_water_quality=data.min_water_quality,
+            adjustable=data.adjustable,
+            time_budget_ms=data.time_budget_ms,
+            random_state=data.random_state
+        )
+    except ValueError as e:
+        logger.error(f"Validation error in recommendation search: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in recommendation search: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during the recommendation search"
+        )
+
+NEIGHBORS_QUERY = Query(5, ge=1, le=100, description="Number of samples to return")
+
+@router.post("/samples/basic/nearest", response_model=NearestSamplesResponse, response_class=FastJSONResponse, summary="Find the most similar basic training samples")
+async def nearest_basic_samples(
+    data: BasicFishPredictionRequest,
+    k: int = NEIGHBORS_QUERY,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Find the labelled rows of the basic dataset nearest to a reading.
+    
+    Distances are measured on the standardized features the model was trained on.
+    """
+    return await _nearest_samples(prediction_service, 'basic', prediction_service._basic_input(data), k)
+
+@router.post("/samples/advanced/nearest", response_model=NearestSamplesResponse, response_class=FastJSONResponse, summary="Find the most similar advanced training samples")
+async def nearest_advanced_samples(
+    data: AdvancedFishPredictionRequest,
+    k: int = NEIGHBORS_QUERY,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Find the labelled rows of the comprehensive dataset nearest to a reading.
+    
+    Distances are measured on the standardized features the model was trained on.
+    """
+    return await _nearest_samples(prediction_service, 'advanced', prediction_service._advanced_input(data), k)
+
+async def _nearest_samples(prediction_service: PredictionService, model_type: str, reading: Dict[str, float], k: int):
+    try:
+        samples = (await asyncio.to_thread(prediction_service.nearest_samples, model_type, [reading], k))[0]
+        return FastJSONResponse({'model_type': model_type, 'k': len(samples), 'samples': samples})
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ValueError as e:
+        logger.error(f"Validation error in nearest sample lookup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in nearest sample lookup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during the nearest sample lookup"
+        )
+
+@router.get("/species", response_model=List[FishSpeciesInfo], response_class=FastJSONResponse, summary="Get fish species information")
+async def get_species():
+    """
+    Get the fish species catalog.
+    
+    Use this to resolve species returned by reference with species_format=ref.
+    """
+    return FastJSONResponse(get_species_catalog().catalog_json)
+
 @router.post("/water-quality", response_model=float, summary="Predict water quality score")
 async def predict_water_quality(
     data: WaterQualityRequest,
@@ -86,7 +426,7 @@ async def predict_water_quality(
         if 'DO' in input_data:
             input_data['dissolved_oxygen'] = input_data.pop('DO')
         
-        result = prediction_service.water_quality_model.predict(input_data)
+        result = await asyncio.to_thread(prediction_service.water_quality_model.predict, input_data)
         return result
     except ValueError as e:
         logger.error(f"Validation error in water quality prediction: {e}")
@@ -101,6 +441,44 @@ async def predict_water_quality(
             detail="An error occurred during prediction"
         )
 
+@router.post("/water-quality/forecast", response_model=WaterQualityForecastResponse, response_class=FastJSONResponse, summary="Forecast water quality scores of many sites")
+async def forecast_water_quality(
+    data: WaterQualityForecastRequest,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Forecast the water quality score of each site for the next intervals.
+    
+    Each site sends its recent readings, evenly spaced and oldest first. The trend of
+    every parameter over the last readings is extrapolated, damped so it levels off,
+    and the forecast readings of all sites are scored together.
+    """
+    try:
+        sites = [
+            {'site_id': site.site_id, 'readings': [reading.model_dump() for reading in site.readings]}
+            for site in data.sites
+        ]
+        result = await asyncio.to_thread(
+            prediction_service.forecast_water_quality,
+            sites,
+            data.horizon,
+            data.window,
+            data.include_features
+        )
+        return FastJSONResponse(result)
+    except ValueError as e:
+        logger.error(f"Validation error in water quality forecast: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in water quality forecast: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during forecasting"
+        )
+
 # Training endpoints
 @router.post("/train", response_model=TrainingResponse, summary="Train a new model")
 async def train_model(
@@ -110,13 +488,24 @@ async def train_model(
     """
     Train a new model of the specified type.
     
-    This endpoint allows training or retraining of the prediction models.
+    This endpoint allows training or retraining of the prediction models. A request
+    identical to an earlier one, on an unchanged dataset, returns the earlier run's
+    saved version and metrics immediately; set force to retrain anyway.
     """
     try:
-        result = training_service.train_model(
+        # Training takes seconds to minutes; a worker thread keeps the event loop serving predictions
+        result = await asyncio.to_thread(
+            training_service.train_model,
             model_type=data.model_type,
             test_size=data.test_size,
-            random_state=data.random_state
+            random_state=data.random_state,
+            compact=data.compact,
+            streaming=data.streaming,
+            chunk_size=data.chunk_size,
+            activate=data.activate,
+            cv_folds=data.cv_folds,
+            fold_scaler=data.fold_scaler,
+            force=data.force
         )
         return result
     except ValueError as e:
@@ -132,17 +521,42 @@ async def train_model(
             detail=f"An error occurred during model training: {str(e)}"
         )
 
+def _etag(*parts: Any) -> str:
+    """Weak validator for a response that only changes when its parts do."""
+    return 'W/"' + hashlib.sha256(dumps(parts)).hexdigest()[:32] + '"'
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client's If-None-Match already has this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag))
+    return None
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Clients may keep the response but must revalidate it, since a training run can change it at any time
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
 @router.get("/models/status", response_model=Dict[str, Any], summary="Get model status")
 async def get_model_status(
+    request: Request,
     training_service: ModelTrainingService = Depends(get_training_service)
 ):
     """
     Get the status of all trained models.
     
     Returns information about which models are available and their performance metrics.
+    The response has an ETag that changes when a model is trained, published or rolled
+    back; send it in If-None-Match to get a 304 without the models being read.
     """
     try:
-        return training_service.get_model_status()
+        etag = _etag("status", training_service.status_version())
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return FastJSONResponse(training_service.get_model_status(), headers=_cache_headers(etag))
     except Exception as e:
         logger.error(f"Error getting model status: {e}")
         raise HTTPException(
@@ -150,15 +564,212 @@ async def get_model_status(
             detail="An error occurred while retrieving model status"
         )
 
+@router.get("/models/{model_type}/versions", response_model=List[Dict[str, Any]], summary="List saved model versions")
+async def list_model_versions(
+    model_type: str,
+    training_service: ModelTrainingService = Depends(get_training_service)
+):
+    """
+    List the saved versions of a model type, newest first.
+    
+    Each entry holds the version's training info and whether it is the active version.
+    """
+    try:
+        return training_service.list_versions(model_type)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error listing model versions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while listing model versions"
+        )
+
+@router.post("/models/{model_type}/rollback", response_model=Dict[str, Any], summary="Activate a saved model version")
+async def rollback_model(
+    model_type: str,
+    data: RollbackRequest,
+    training_service: ModelTrainingService = Depends(get_training_service)
+):
+    """
+    Make a saved version the live model.
+    
+    Requests already in flight finish on the previous version.
+    """
+    try:
+        return await asyncio.to_thread(training_service.rollback, model_type, data.version)
+    except ValueError as e:
+        logger.error(f"Validation error in model rollback: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in model rollback: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during model rollback"
+        )
+
+@router.post("/models/{model_type}/shadow", response_model=Dict[str, Any], summary="Shadow score a saved model version")
+async def start_shadow(
+    model_type: str,
+    data: ShadowRequest,
+    training_service: ModelTrainingService = Depends(get_training_service)
+):
+    """
+    Score a sample of live traffic with a saved version alongside the live model.
+    
+    The candidate runs in the background, off the request path; its agreement with the
+    live model and its latency are reported by GET on the same path. Single, batch and
+    columnar predictions (JSON, Arrow and MessagePack) are all sampled.
+    """
+    try:
+        return await asyncio.to_thread(training_service.start_shadow, model_type, data.version, data.sample_rate)
+    except ValueError as e:
+        logger.error(f"Validation error starting shadow scoring: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error starting shadow scoring: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while starting shadow scoring"
+        )
+
+@router.get("/models/{model_type}/shadow", response_model=Dict[str, Any], summary="Get the shadow scoring report")
+async def get_shadow_report(
+    model_type: str,
+    training_service: ModelTrainingService = Depends(get_training_service)
+):
+    """Get the agreement and latency of the shadowed version compared with the live model."""
+    report = training_service.get_shadow_report(model_type)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No shadow scoring running for {model_type} model"
+        )
+    return report
+
+@router.delete("/models/{model_type}/shadow", response_model=Dict[str, Any], summary="Stop shadow scoring")
+async def stop_shadow(
+    model_type: str,
+    training_service: ModelTrainingService = Depends(get_training_service)
+):
+    """Stop shadow scoring and return the final report."""
+    report = training_service.stop_shadow(model_type)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No shadow scoring running for {model_type} model"
+        )
+    return report
+
+@router.get("/monitoring/anomalies", response_model=Dict[str, Any], summary="Get input anomaly metrics")
+async def get_anomaly_metrics():
+    """
+    Get how many prediction inputs each model's anomaly detector has flagged.
+    
+    Includes the flag rate, the features most often out of range and the time spent checking.
+    """
+    return anomaly_monitor.report()
+
+@router.post("/admin/memory/allocations", response_model=Dict[str, Any], summary="Profile memory allocated by predictions")
+async def profile_allocations(
+    data: AllocationProfileRequest,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Trace the allocations of a number of predictions with tracemalloc.
+    
+    Reports the peak memory the predictions needed above the starting point, what
+    they left allocated and the source lines that allocated it, and the model's memory
+    footprint. Tracing slows the process down and also records other requests
+    running at the same time, so run it on an idle instance. The readings scored in
+    all (predictions x batch_size) are capped by MEMORY_PROFILE_MAX_ROWS, and profiles
+    are admitted as batch requests.
+    """
+    try:
+        return await asyncio.to_thread(
+            prediction_service.profile_allocations,
+            data.model_type,
+            data.predictions,
+            data.batch_size,
+            data.top
+        )
+    except ValueError as e:
+        logger.error(f"Validation error in allocation profile: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in allocation profile: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while profiling allocations"
+        )
+
+@router.get("/monitoring/early-exit", response_model=Dict[str, Any], summary="Get early exit inference metrics")
+async def get_early_exit_metrics():
+    """
+    Get how many boosting stages labels-only columnar batches evaluated per reading.
+    
+    Includes the rows scored, the stages each model has and the share of stages skipped.
+    """
+    return early_exit_monitor.report()
+
+@router.get("/monitoring/admission", response_model=Dict[str, Any], summary="Get admission control metrics")
+async def get_admission_metrics():
+    """
+    Get the load of each route class (predict, batch, train) and how many requests were shed.
+    
+    Includes the requests running and waiting now, how many waited, were rejected
+    because the queue was full or timed out waiting, and the mean wait and service times.
+    """
+    return admission_stats()
+
+@router.get("/predictions/history", response_model=List[Dict[str, Any]], summary="Get recent logged predictions")
+async def get_prediction_history(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of entries"),
+    model_type: Optional[str] = Query(None, description="Only predictions of this model type (basic/advanced)"),
+    before_id: Optional[int] = Query(None, description="Only entries older than this id, to page back through history")
+):
+    """
+    Get the most recent predictions from the audit log, newest first.
+    
+    Each entry holds the inputs, model version, outputs and latency of one prediction.
+    Entries are written in batches, so the last second or so may not be visible yet.
+    """
+    try:
+        return await asyncio.to_thread(prediction_log.recent, limit, model_type, before_id)
+    except Exception as e:
+        logger.error(f"Error reading prediction history: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while reading prediction history"
+        )
+
+@router.get("/predictions/history/stats", response_model=Dict[str, Any], summary="Get prediction log metrics")
+async def get_prediction_log_stats():
+    """Get the prediction log's queue depth, write and drop counters for this process."""
+    return prediction_log.stats()
+
 # Analysis endpoints
 @router.get("/parameters/basic/influence", response_model=ParameterInfluenceResponse, summary="Get influence of basic parameters")
 async def get_basic_parameter_influence(
+    request: Request,
     prediction_service: PredictionService = Depends(get_prediction_service)
 ):
     """
     Get information about the influence of basic water parameters on fish species.
     
-    Returns parameter importance and optimal ranges.
+    Returns parameter importance and optimal ranges, with an ETag tied to the model version.
     """
     try:
         model = prediction_service.basic_model
@@ -168,7 +779,11 @@ async def get_basic_parameter_influence(
                 detail="Basic model not trained yet"
             )
         
-        return model.get_parameter_influence()
+        etag = _etag("influence", "basic", model.model_info.get('version'), model.model_info.get('training_time'))
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return FastJSONResponse(model.get_parameter_influence(), headers=_cache_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
@@ -180,12 +795,13 @@ async def get_basic_parameter_influence(
 
 @router.get("/parameters/advanced/influence", response_model=ParameterInfluenceResponse, summary="Get influence of advanced parameters")
 async def get_advanced_parameter_influence(
+    request: Request,
     prediction_service: PredictionService = Depends(get_prediction_service)
 ):
     """
     Get information about the influence of advanced water parameters on fish species.
     
-    Returns parameter importance and optimal ranges.
+    Returns parameter importance and optimal ranges, with an ETag tied to the model version.
     """
     try:
         model = prediction_service.advanced_model
@@ -195,7 +811,11 @@ async def get_advanced_parameter_influence(
                 detail="Advanced model not trained yet"
             )
         
-        return model.get_parameter_influence()
+        etag = _etag("influence", "advanced", model.model_info.get('version'), model.model_info.get('training_time'))
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return FastJSONResponse(model.get_parameter_influence(), headers=_cache_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
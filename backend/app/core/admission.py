@@ -0,0 +1,190 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.serialization import dumps
+
+# Route classes by the end of a POST path, checked in order; other requests are not limited
+ROUTE_CLASSES = (
+    ("train", ("/train",)),
+    ("batch", ("/batch", "/columnar", "/forecast", "/sensitivity", "/recommendations", "/allocations")),
+    ("predict", ("/predict/basic", "/predict/advanced", "/water-quality", "/nearest")),
+)
+
+
+class ConcurrencyLimiter:
+    """
+    Admits at most `limit` requests at a time, with at most `queue_size` more waiting.
+
+    Requests arriving when the queue is full, or that wait longer than `queue_timeout`
+    seconds, are rejected so the client can retry later instead of piling up behind
+    work the server cannot keep up with. Waiters are admitted in arrival order.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long an admitted request takes, for Retry-After
+        self._service_time = 0.0
+        self.stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'max_queue_length': 0,
+            'total_wait_time': 0.0
+        }
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; False if the request should be rejected instead."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.stats['admitted'] += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.stats['rejected'] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats['queued'] += 1
+        self.stats['max_queue_length'] = max(self.stats['max_queue_length'], len(self._waiters))
+        start_time = time.perf_counter()
+        try:
+            # The slot is handed over by release, so active is already counted
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait ran out; give the slot to the next waiter
+                self.release(0.0)
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            self.stats['timed_out'] += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            self.stats['total_wait_time'] += time.perf_counter() - start_time
+        self.stats['admitted'] += 1
+        return True
+
+    def release(self, service_time: float) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one."""
+        if service_time:
+            self._service_time = service_time if not self._service_time else 0.9 * self._service_time + 0.1 * service_time
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to admit another request."""
+        backlog = (len(self._waiters) + 1) / max(self.limit, 1)
+        return min(max(math.ceil(self._service_time * backlog), 1), 60)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'limit': self.limit,
+            'queue_size': self.queue_size,
+            'active': self.active,
+            'queue_length': len(self._waiters),
+            **{name: value for name, value in self.stats.items() if name != 'total_wait_time'},
+            'mean_wait_ms': self.stats['total_wait_time'] / self.stats['queued'] * 1000 if self.stats['queued'] else 0.0,
+            'mean_service_ms': self._service_time * 1000
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that limits how many requests of each route class run at once.
+
+    Prediction, batch and training requests each have their own ConcurrencyLimiter
+    (ADMISSION_LIMITS and ADMISSION_QUEUE_SIZES), so a burst of batch jobs cannot
+    starve single predictions. Saturated classes answer 503 with a Retry-After header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = _limiter_for(scope) if scope['type'] == 'http' and settings.ADMISSION_ENABLED else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await _reject(send, limiter)
+            return
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start_time)
+
+
+def admission_stats() -> Dict[str, Any]:
+    """Get the current load and rejection counts of each route class."""
+    return {
+        'enabled': settings.ADMISSION_ENABLED,
+        'classes': {name: limiter.snapshot() for name, limiter in _limiters.items()}
+    }
+
+
+def _limiter_for(scope) -> Optional[ConcurrencyLimiter]:
+    if scope['method'] != 'POST':
+        return None
+    path = scope['path'].rstrip('/')
+    for name, suffixes in ROUTE_CLASSES:
+        if path.endswith(suffixes):
+            return _limiters.get(name)
+    return None
+
+
+async def _reject(send, limiter: ConcurrencyLimiter) -> None:
+    retry_after = limiter.retry_after()
+    logger.warning(
+        f"Shedding {limiter.name} request: {limiter.active} running, {limiter.queue_length} queued"
+    )
+    body = dumps({'detail': f"Server is busy with {limiter.name} requests, retry after {retry_after} seconds"})
+    await send({
+        'type': 'http.response.start',
+        'status': 503,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            (b'retry-after', str(retry_after).encode('latin-1'))
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# One limiter per route class, shared by every request of the process
+_limiters: Dict[str, ConcurrencyLimiter] = {
+    name: ConcurrencyLimiter(
+        name,
+        limit=settings.ADMISSION_LIMITS.get(name, 1),
+        queue_size=settings.ADMISSION_QUEUE_SIZES.get(name, 0),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+    )
+    for name, _ in ROUTE_CLASSES
+}
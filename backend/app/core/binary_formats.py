@@ -0,0 +1,179 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional, Arrow bodies are rejected without it
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, MessagePack bodies are rejected without it
+    msgpack = None
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+
+# Media types accepted for each format, including common unofficial names
+MEDIA_TYPES = {
+    JSON: JSON,
+    ARROW_STREAM: ARROW_STREAM,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK
+}
+
+
+class UnsupportedMediaType(ValueError):
+    """The body's format is unknown or needs a library that is not installed."""
+
+
+def request_format(content_type: Optional[str]) -> str:
+    """Get the format of a request body from its Content-Type, defaulting to JSON."""
+    if not content_type:
+        return JSON
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type not in MEDIA_TYPES:
+        raise UnsupportedMediaType(f"Unsupported content type {media_type}; use {JSON}, {ARROW_STREAM} or {MSGPACK}")
+    return _available(MEDIA_TYPES[media_type])
+
+
+def response_format(accept: Optional[str]) -> str:
+    """
+    Pick the response format from an Accept header.
+
+    The supported and installed type with the highest quality wins, in header order
+    on ties; JSON is used when nothing matches.
+    """
+    best, best_quality = JSON, 0.0
+    for part in (accept or "").split(","):
+        media_type, _, parameters = part.partition(";")
+        media_type = MEDIA_TYPES.get(media_type.strip().lower())
+        if media_type is None or (media_type == ARROW_STREAM and pa is None) or (media_type == MSGPACK and msgpack is None):
+            continue
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def decode_columns(body: bytes, media_type: str) -> Dict[str, Any]:
+    """
+    Decode a binary columnar body into arrays, without copying where the format allows.
+
+    Arrow: a record batch stream with one column per feature. Numeric columns with a
+    single chunk and no nulls are returned as read-only views of the body.
+
+    MessagePack: a map of feature name to either an array of numbers or a binary blob
+    of little-endian float64 values, which is viewed without copying.
+
+    Args:
+        body: The request body
+        media_type: ARROW_STREAM or MSGPACK
+
+    Returns:
+        Column name to values, ready for app.models.columnar.parse_columns
+    """
+    if media_type == ARROW_STREAM:
+        try:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+        except Exception as e:
+            raise ValueError(f"Request body is not a valid Arrow IPC stream: {e}")
+        return {name: _arrow_values(table.column(name)) for name in table.column_names}
+
+    if media_type == MSGPACK:
+        try:
+            payload = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(f"Request body is not valid MessagePack: {e}")
+        if not isinstance(payload, dict):
+            raise ValueError("Columnar request body must be a map of feature arrays")
+        columns = {}
+        for name, values in payload.items():
+            if isinstance(values, (bytes, bytearray)):
+                if len(values) % 8:
+                    raise ValueError(f"{name}: binary values must be little-endian float64")
+                values = np.frombuffer(values, dtype='<f8')
+            columns[name] = values
+        return columns
+
+    raise UnsupportedMediaType(f"Cannot decode {media_type}")
+
+
+def encode_columns(result: Dict[str, Any], media_type: str) -> bytes:
+    """
+    Encode a columnar prediction result.
+
+    Arrow: one row per reading, with a probability_<class> column per class and the
+    anomaly flags as is_anomaly and anomaly_score. MessagePack: the same structure as
+    the JSON response, with arrays of numbers.
+
+    Args:
+        result: A result of PredictionService.predict_columnar
+        media_type: ARROW_STREAM or MSGPACK
+
+    Returns:
+        The response body
+    """
+    if media_type == ARROW_STREAM:
+        columns = {}
+        if result.get('site_ids') is not None:
+            columns['site_id'] = pa.array(result['site_ids'], type=pa.string())
+        columns['predicted_species'] = pa.array(result['predicted_species'], type=pa.string())
+        if result.get('confidence') is not None:
+            columns['confidence'] = pa.array(np.asarray(result['confidence'], dtype=np.float64))
+        for name, values in (result.get('probabilities') or {}).items():
+            columns[f"probability_{name}"] = pa.array(np.asarray(values, dtype=np.float64))
+        if result.get('water_quality_score') is not None:
+            columns['water_quality_score'] = pa.array(np.asarray(result['water_quality_score'], dtype=np.float64))
+        if result.get('anomaly') is not None:
+            columns['is_anomaly'] = pa.array(np.asarray(result['anomaly']['is_anomaly'], dtype=bool))
+            columns['anomaly_score'] = pa.array(np.asarray(result['anomaly']['score'], dtype=np.float64))
+        table = pa.table(columns)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    if media_type == MSGPACK:
+        return msgpack.packb(result, default=_msgpack_default)
+
+    raise UnsupportedMediaType(f"Cannot encode {media_type}")
+
+
+def _available(media_type: str) -> str:
+    if media_type == ARROW_STREAM and pa is None:
+        raise UnsupportedMediaType("Arrow bodies need pyarrow, which is not installed")
+    if media_type == MSGPACK and msgpack is None:
+        raise UnsupportedMediaType("MessagePack bodies need msgpack, which is not installed")
+    return media_type
+
+
+def _arrow_values(column: Any) -> Any:
+    """Get a column's values as a numpy array, viewing the Arrow buffer when possible."""
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        if column.num_chunks == 1 and column.null_count == 0:
+            return column.chunk(0).to_numpy(zero_copy_only=True)
+        # Nulls become NaN, which column validation rejects
+        return column.to_numpy()
+    return column.to_pylist()
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """Convert numpy values that msgpack does not understand."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
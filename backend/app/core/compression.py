@@ -0,0 +1,193 @@
+import asyncio
+import zlib
+from typing import Any, Optional
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses are gzipped without it
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+# Media types worth compressing; images and already compressed formats are left alone
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/msgpack",
+    b"application/vnd.apache.arrow.stream",
+    b"text/"
+)
+
+# Bodies larger than this are compressed on a worker thread instead of the event loop
+_THREAD_SIZE = 256 * 1024
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content encoding from an Accept-Encoding header.
+
+    Brotli is preferred over gzip at equal quality, when it is installed. A "*" entry
+    only covers the encodings the header does not name, so "gzip;q=0, *" still refuses
+    gzip. Returns None when the client accepts neither.
+    """
+    qualities = {}
+    wildcard = 0.0
+    for part in (accept_encoding or "").split(","):
+        coding, _, parameters = part.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        name, _, value = parameters.partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding == "*":
+            wildcard = quality
+        elif coding in (GZIP, BROTLI):
+            qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    # Brotli is checked first, so it wins ties
+    for coding in ((BROTLI, GZIP) if brotli is not None else (GZIP,)):
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor with the configured level."""
+
+    def __init__(self, encoding: str):
+        if encoding == BROTLI:
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # wbits 31 writes the gzip header and trailer
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress part of a streamed body, flushed so the client can decode it now."""
+        return self._compress(data) + self._flush()
+
+    def whole(self, data: bytes) -> bytes:
+        return self._compress(data) + self._finish()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses large responses with gzip or brotli.
+
+    The encoding is negotiated from Accept-Encoding. Complete bodies are compressed
+    when they are at least COMPRESSION_MIN_SIZE bytes, and streamed bodies chunk by
+    chunk. Only JSON, MessagePack, Arrow and text responses are compressed, and never
+    ones that already have a Content-Encoding.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope.get('headers', ()):
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            async def send_vary(message: dict) -> None:
+                # Caches must not give this uncompressed response to clients that accept gzip
+                if message['type'] == 'http.response.start':
+                    message['headers'] = _add_vary(message.get('headers', []))
+                await send(message)
+
+            await self.app(scope, receive, send_vary)
+            return
+
+        start_message: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: dict) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if start_message is not None:
+                headers = start_message.get('headers', [])
+                if not _compressible(start_message['status'], headers) or (not more_body and len(body) < settings.COMPRESSION_MIN_SIZE):
+                    passthrough = True
+                else:
+                    compressor = _Compressor(encoding)
+                    headers = [(name, value) for name, value in headers if name.lower() != b'content-length']
+                    headers.append((b'content-encoding', encoding.encode('latin-1')))
+                    if not more_body:
+                        body = await _compress_whole(compressor, body)
+                        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+                    start_message['headers'] = _add_vary(headers)
+                if passthrough:
+                    start_message['headers'] = _add_vary(start_message.get('headers', []))
+                await send(start_message)
+                start_message = None
+                if passthrough or not more_body:
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+                    return
+            if passthrough:
+                await send(message)
+                return
+            data = compressor.chunk(body) if more_body else compressor.whole(body)
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def _compress_whole(compressor: _Compressor, body: bytes) -> bytes:
+    if len(body) >= _THREAD_SIZE:
+        return await asyncio.to_thread(compressor.whole, body)
+    return compressor.whole(body)
+
+
+def _compressible(status: int, headers: Any) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    content_type = b''
+    for name, value in headers:
+        name = name.lower()
+        if name == b'content-encoding':
+            return False
+        if name == b'content-type':
+            content_type = value.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: Any) -> list:
+    """Tell caches the body depends on Accept-Encoding."""
+    headers = list(headers)
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b'vary':
+            if b'accept-encoding' not in value.lower():
+                headers[index] = (name, value + b', Accept-Encoding')
+            return headers
+    headers.append((b'vary', b'Accept-Encoding'))
+    return headers
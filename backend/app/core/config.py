@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 from pydantic_settings import BaseSettings
 import os
 
@@ -16,14 +16,116 @@ class Settings(BaseSettings):
     ADVANCED_MODEL_PATH: str = os.path.join("models", "advanced_fish_prediction_model.pkl")
     WATER_QUALITY_MODEL_PATH: str = os.path.join("models", "water_quality_model.pkl")
     
+    # Model Versioning Settings
+    MODEL_VERSIONS_PATH: str = os.path.join("models", "versions")
+    MAX_MODEL_VERSIONS: int = 10
+    
+    # Shadow Scoring Settings
+    SHADOW_MAX_PENDING: int = 32
+    SHADOW_REGRESSION_TOLERANCE: float = 0.05
+    
     # Data Settings
     REAL_FISH_DATASET: str = os.path.join("data", "raw", "realfishdataset.csv")
     WATER_QUALITY_DATASET: str = os.path.join("data", "raw", "WQD_with_Fish_Species_v2.csv")
     PROCESSED_DATA_PATH: str = os.path.join("data", "processed")
     
+    # Server Settings (used by app.serve)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 2
+    
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    # "text" for the plain format, "json" for one JSON object per line
+    LOG_FORMAT: str = "text"
+    # Fraction of records below WARNING kept per logger name, e.g.
+    # {"fish-habitat-analyzer.prediction": 0.1, "fish-habitat-analyzer.access": 0.1}
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+    
+    # Startup Settings
+    PARALLEL_MODEL_LOADING: bool = True
+    WARMUP_ON_STARTUP: bool = True
+    
+    # Anomaly Detection Settings (fitted when species models are trained)
+    ANOMALY_QUANTILE: float = 0.001
+    ANOMALY_MARGIN: float = 0.1
+    ANOMALY_CONTAMINATION: float = 0.01
+    
+    # Prediction Log Settings
+    PREDICTION_LOG_ENABLED: bool = True
+    PREDICTION_LOG_PATH: str = os.path.join("data", "predictions.db")
+    # Most rows waiting to be written, and rows written per transaction
+    PREDICTION_LOG_QUEUE_SIZE: int = 10000
+    PREDICTION_LOG_BATCH_SIZE: int = 500
+    PREDICTION_LOG_FLUSH_INTERVAL: float = 1.0
+    
+    # Batch Settings
+    # Largest batch accepted by the columnar prediction endpoints
+    COLUMNAR_MAX_ROWS: int = 100000
+    # Boosting stages evaluated between early exit checks for labels-only columnar batches
+    EARLY_EXIT_BLOCK_STAGES: int = 5
+    # Fewest rows a folded boosting model scores with early exit; smaller batches are
+    # evaluated in full, which is faster than checking between stages
+    EARLY_EXIT_MIN_BATCH_ROWS: int = 32
+    # Larger batches skip the folded ensemble for the scikit-learn estimator it was folded
+    # from, whose compiled traversal outruns the numpy one once there are enough rows
+    FOLDED_MAX_BATCH_ROWS: int = 64
+    # Most readings an allocation profile may score in all (predictions x batch_size), all traced
+    MEMORY_PROFILE_MAX_ROWS: int = 100000
+    
+    # Admission Control Settings
+    ADMISSION_ENABLED: bool = True
+    # Requests of each route class (predict, batch, train) handled at once per process
+    ADMISSION_LIMITS: Dict[str, int] = {"predict": 32, "batch": 4, "train": 1}
+    # Requests of each route class allowed to wait for a slot; more are rejected with 503
+    ADMISSION_QUEUE_SIZES: Dict[str, int] = {"predict": 256, "batch": 16, "train": 0}
+    # Seconds a request may wait for a slot before it is rejected with 503
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0
+    
+    # Compression Settings
+    COMPRESSION_ENABLED: bool = True
+    # Smallest response body compressed, in bytes
+    COMPRESSION_MIN_SIZE: int = 1024
+    # Low levels, since large batch responses are compressed per request
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    # Forecast Settings
+    # Most recent readings per site used to fit each feature's trend
+    FORECAST_WINDOW: int = 6
+    # Fraction of the trend kept from one forecast step to the next
+    FORECAST_DAMPING: float = 0.8
+    FORECAST_MAX_HORIZON: int = 48
+    FORECAST_MAX_SITES: int = 10000
+    # Longest window a request may ask for; the trend fit holds sites x window x features values
+    FORECAST_MAX_WINDOW: int = 500
+    
+    # What-if Settings
+    SWEEP_MAX_POINTS: int = 10000
+    RECOMMEND_TIME_BUDGET_MS: int = 250
+    # Longest search a request may ask for; the search holds a worker thread throughout
+    RECOMMEND_MAX_TIME_BUDGET_MS: int = 2000
+    RECOMMEND_POPULATION: int = 256
+    # Candidates stay within this many standard deviations of the training mean
+    RECOMMEND_MAX_STD: float = 4.0
+    
     # Training Settings
     TEST_SIZE: float = 0.2
     RANDOM_STATE: int = 42
+    # Processes for cross validation folds (-1 uses every core)
+    CV_N_JOBS: int = -1
+    
+    # Streaming Settings (used when training with streaming=True)
+    STREAMING_CHUNK_SIZE: int = 10000
+    STREAMING_EPOCHS: int = 10
+    STREAMING_HIDDEN_LAYERS: List[int] = [64, 32]
+    STREAMING_LEARNING_RATE: float = 0.01
+    
+    # Compaction Settings (used when training with compact=True)
+    COMPACT_MAX_DEPTH: Optional[int] = 12
+    COMPACT_MIN_SAMPLES_LEAF: int = 2
+    COMPACT_MIN_AGREEMENT: float = 0.99
+    COMPACT_SELECTION_ROWS: int = 1000
     
     class Config:
         env_file = ".env"
@@ -1,24 +1,185 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from app.core.config import settings
+from app.core.serialization import dumps
+
+# ID of the request being handled, set by RequestLoggingMiddleware and copied into
+# worker threads started with asyncio.to_thread
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and is
+# added to the JSON record as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including fields passed with `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        try:
+            return dumps(entry).decode()
+        except TypeError:
+            return dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+                          for key, value in entry.items()}).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """The plain text format, with the request ID when there is one."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        request_id = getattr(record, 'request_id', None)
+        return f"{text} [request_id={request_id}]" if request_id else text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING from the configured loggers.
+
+    Rates are looked up by logger name, falling back to the nearest configured parent,
+    so "fish-habitat-analyzer.prediction" also covers its children. Warnings and errors
+    always pass. Filtering runs on every thread that logs, so the counts of sampled
+    out records are updated under a lock.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.sampled_out: Dict[str, int] = {}
+
+    def rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        with self._lock:
+            self.sampled_out[record.name] = self.sampled_out.get(record.name, 0) + 1
+        return False
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that stamps records with the request ID on the logging thread.
+
+    Only the message is rendered before queueing (so arguments are not shared with the
+    listener thread); formatting and writing happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware that gives every HTTP request an ID and logs its duration.
+
+    The ID is taken from the X-Request-ID header when the client sends one, attached
+    to every record logged while handling the request, and returned in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get('headers', ()):
+            if name == b'x-request-id':
+                request_id = value.decode('latin-1')[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                message['headers'] = list(message.get('headers', ())) + [(b'x-request-id', request_id.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                "%s %s %d",
+                scope['method'], scope['path'], status_code,
+                extra={
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'status_code': status_code,
+                    'duration_ms': (time.perf_counter() - start_time) * 1000
+                }
+            )
+            request_id_var.reset(token)
 
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger instance with the given name.
-    
+
     Args:
         name: The name for the logger
-        
+
     Returns:
         A configured logger instance
     """
@@ -26,5 +187,78 @@ def get_logger(name: str) -> logging.Logger:
     return logger
 
 
+def sampling_stats() -> Dict[str, Any]:
+    """Get the configured sample rates and how many records each logger had sampled out."""
+    with _sampling_filter._lock:
+        sampled_out = dict(_sampling_filter.sampled_out)
+    return {'rates': dict(_sampling_filter.rates), 'sampled_out': sampled_out}
+
+
+def log_synchronously() -> None:
+    """
+    Write records on the thread that logs them, and stop the listener thread.
+
+    For a preforking master (app.serve): a process that forks should have no other
+    threads, which could hold a lock the child then never sees released. Forked
+    children go back to a queue and a listener thread of their own.
+    """
+    global _synchronous
+    if _synchronous:
+        return
+    _stop_listener()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _stream_handler.addFilter(_sampling_filter)
+    root.addHandler(_stream_handler)
+    _synchronous = True
+
+
+def _start_listener() -> None:
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue, _stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_listener_in_child() -> None:
+    """A forked worker has the queue but not the listener thread, so start its own."""
+    global _queue, _synchronous
+    if _synchronous:
+        root = logging.getLogger()
+        root.removeHandler(_stream_handler)
+        _stream_handler.removeFilter(_sampling_filter)
+        root.addHandler(_queue_handler)
+        _synchronous = False
+    _queue = queue.SimpleQueue()
+    _queue_handler.queue = _queue
+    _start_listener()
+
+
+def _stop_listener() -> None:
+    """Write out the queued records when the process exits."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+# Configure logging: records are put on a queue by the threads that log them and
+# written to stdout by a background listener thread
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+_sampling_filter = SamplingFilter(settings.LOG_SAMPLE_RATES)
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_queue_handler = ContextQueueHandler(_queue)
+_queue_handler.addFilter(_sampling_filter)
+_listener: Optional[logging.handlers.QueueListener] = None
+# Set by log_synchronously in a preforking master
+_synchronous = False
+
+logging.basicConfig(level=settings.LOG_LEVEL, handlers=[_queue_handler])
+_start_listener()
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
 # Create a logger for the app
-logger = get_logger("fish-habitat-analyzer")
\ No newline at end of file
+logger = get_logger("fish-habitat-analyzer")
+
+# Access records of RequestLoggingMiddleware, one per request
+access_logger = get_logger("fish-habitat-analyzer.access")
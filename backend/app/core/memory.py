@@ -0,0 +1,169 @@
+import gc
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Fields read from /proc/<pid>/smaps_rollup, reported in bytes
+_SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty'
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    Get the memory usage of a process in bytes.
+
+    On Linux this includes proportional (PSS) and shared/private breakdowns, which show
+    how much of a forked worker's memory is still shared copy-on-write with its parent.
+    Elsewhere only the peak RSS of the current process is available.
+
+    Args:
+        pid: The process to inspect, defaults to the current process
+
+    Returns:
+        Memory figures keyed by name
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        if pid != os.getpid():
+            return {}
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {'max_rss': usage.ru_maxrss * 1024}
+
+    memory = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(':') in _SMAPS_FIELDS:
+            memory[_SMAPS_FIELDS[parts[0].rstrip(':')]] = int(parts[1]) * 1024
+    memory['shared'] = memory.get('shared_clean', 0) + memory.get('shared_dirty', 0)
+    memory['private'] = memory.get('private_clean', 0) + memory.get('private_dirty', 0)
+    return memory
+
+
+def children_memory(pids: List[int]) -> Dict[int, Dict[str, int]]:
+    """Get the memory usage of several processes, skipping ones that have exited."""
+    return {pid: memory for pid, memory in ((pid, process_memory(pid)) for pid in pids) if memory}
+
+
+def deep_nbytes(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimate the bytes an object and everything it references occupy in memory.
+
+    Numpy buffers are counted once even when several arrays view them. Extension
+    objects without a __dict__ (such as scikit-learn trees and KD-trees) are measured
+    through the state they pickle, which holds their node arrays.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Arrays that own their data include it in getsizeof; views add their base's
+        return sys.getsizeof(obj) + (deep_nbytes(obj.base, seen) if obj.base is not None else 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None), np.generic)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_nbytes(key, seen) + deep_nbytes(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_nbytes(item, seen) for item in obj)
+    if isinstance(obj, type):
+        return 0
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + deep_nbytes(vars(obj), seen)
+    try:
+        state = obj.__getstate__()
+    except Exception:
+        return sys.getsizeof(obj)
+    return sys.getsizeof(obj) + (deep_nbytes(state, seen) if state is not obj else 0)
+
+
+def allocation_profile(fn: Callable[[], Any], calls: int, top: int = 10) -> Dict[str, Any]:
+    """
+    Trace the Python and numpy allocations of calling `fn` repeatedly.
+
+    `fn` is called once untraced to warm caches, then `calls` times between two
+    tracemalloc snapshots. Allocations freed by the end of the run (per-request
+    temporaries) only show in the peak; allocations still alive are attributed to the
+    lines that made them, which is how a leak or a growing cache shows up. Other
+    threads allocating meanwhile are traced too, so profile a quiet process.
+
+    Args:
+        fn: The work to profile
+        calls: Number of traced calls
+        top: Number of allocation sites to report
+
+    Returns:
+        Peak bytes above the starting point, bytes retained overall and per call,
+        the run time and the top sites by retained bytes
+
+    Raises:
+        ValueError: If another profile is running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ValueError("An allocation profile is already running")
+    try:
+        fn()
+        gc.collect()
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start_time = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            elapsed = time.perf_counter() - start_time
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+    finally:
+        _profile_lock.release()
+
+    # Leave out the profiler's own bookkeeping
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ]
+    differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    differences.sort(key=lambda stat: stat.size_diff, reverse=True)
+    return {
+        'calls': calls,
+        'elapsed': elapsed,
+        'peak_bytes': peak - baseline,
+        'retained_bytes': current - baseline,
+        'retained_bytes_per_call': (current - baseline) / calls if calls else 0.0,
+        'top_sites': [
+            {
+                'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_diff_bytes': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size_bytes': stat.size
+            }
+            for stat in differences[:top]
+            if stat.size_diff or stat.count_diff
+        ]
+    }
+
+
+# One allocation profile at a time, since tracemalloc is process-wide
+_profile_lock = threading.Lock()
@@ -0,0 +1,73 @@
+import json
+from typing import Any, Iterable
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Convert numpy values that the standard library encoder does not understand."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to compact JSON bytes.
+
+    Uses orjson when it is installed and the standard library otherwise.
+
+    Args:
+        obj: The object to serialize
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Deserialize JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def join_array(fragments: Iterable[bytes]) -> bytes:
+    """Join already serialized JSON values into a JSON array."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def splice_field(body: bytes, key: str, value: bytes) -> bytes:
+    """
+    Append a pre-serialized value to a serialized JSON object.
+
+    Args:
+        body: A serialized JSON object
+        key: The field name to add
+        value: The serialized field value
+
+    Returns:
+        The serialized object with the extra field
+    """
+    separator = b"," if body != b"{}" else b""
+    return body[:-1] + separator + dumps(key) + b":" + value + b"}"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response that skips response model validation and accepts pre-serialized bodies."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,236 @@
+"""
+Load generator for measuring how much traffic one instance sustains.
+
+Drives the API with a fixed number of concurrent clients, each sending its next
+request as soon as the previous one finishes, for a fixed duration. Requests are
+drawn from a weighted mix of basic, advanced and water quality predictions and
+model status checks. Payloads are rows sampled from the datasets, serialized before
+the run starts. Prints a JSON report with throughput, latency percentiles and the
+error rate, overall and per request kind. Run with:
+
+    python -m app.loadtest --concurrency 16 --duration 30 --mix advanced=8,basic=1,water_quality=1
+
+By default the app is served in-process through its ASGI interface, so client and
+server share one event loop and CPU; use --url to load a server started separately
+(e.g. `python -m app.serve --workers 4`), which gives the realistic numbers.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.serialization import dumps
+from app.core.config import settings
+
+REQUEST_KINDS = ("basic", "advanced", "water_quality", "status")
+
+DEFAULT_MIX = {"advanced": 1.0}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse a request mix such as "advanced=8,basic=1,status=1" into weights."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}; choose from {', '.join(REQUEST_KINDS)}")
+        mix[kind] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The request mix needs at least one positive weight")
+    return mix
+
+
+def build_requests(kinds: List[str], samples: int, seed: int) -> Dict[str, List[Tuple[str, str, Optional[bytes]]]]:
+    """
+    Prepare the requests of each kind: method, path and serialized body.
+
+    Prediction bodies are rows sampled from the dataset each model is trained on.
+    """
+    import pandas as pd
+    from app.models.prediction import WATER_QUALITY_COLUMN_MAPPING
+
+    prefix = settings.API_V1_STR
+    requests: Dict[str, List[Tuple[str, str, Optional[bytes]]]] = {}
+    if "basic" in kinds:
+        df = pd.read_csv(settings.REAL_FISH_DATASET, usecols=["ph", "temperature", "turbidity"]).dropna()
+        rows = df.sample(n=samples, replace=True, random_state=seed).to_dict("records")
+        requests["basic"] = [("POST", f"{prefix}/predict/basic?species_format=ref", dumps(row)) for row in rows]
+    if "advanced" in kinds or "water_quality" in kinds:
+        columns = [name for name, feature in WATER_QUALITY_COLUMN_MAPPING.items() if feature not in ("water_quality", "fish")]
+        df = pd.read_csv(settings.WATER_QUALITY_DATASET, usecols=columns).dropna()
+        df = df.rename(columns=WATER_QUALITY_COLUMN_MAPPING).rename(columns={"dissolved_oxygen": "DO"})
+        rows = df.sample(n=samples, replace=True, random_state=seed).to_dict("records")
+        if "advanced" in kinds:
+            requests["advanced"] = [("POST", f"{prefix}/predict/advanced?species_format=ref", dumps(row)) for row in rows]
+        if "water_quality" in kinds:
+            requests["water_quality"] = [("POST", f"{prefix}/water-quality", dumps(row)) for row in rows]
+    if "status" in kinds:
+        requests["status"] = [("GET", f"{prefix}/models/status", None)]
+    return requests
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput, error rate and latency percentiles in milliseconds of a set of requests."""
+    count = len(latencies)
+    summary = {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput_rps": count / elapsed if elapsed > 0 else 0.0
+    }
+    if count:
+        latencies_ms = np.asarray(latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        summary["latency_ms"] = {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencies_ms.max())
+        }
+    return summary
+
+
+async def run_load(
+    client: Any,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    samples: int = 1000,
+    seed: int = 0,
+    timeout: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Send requests from `concurrency` clients for `duration` seconds and report on them.
+
+    Requests completed during the first `warmup` seconds are sent but not measured.
+
+    Args:
+        client: An httpx.AsyncClient pointing at the API
+        mix: Weight of each request kind
+        concurrency: Number of clients sending requests at the same time
+        duration: Measured seconds, after the warmup
+        warmup: Seconds of unmeasured load before measuring
+        samples: Number of distinct payloads per request kind
+        seed: Random seed for payloads and the request mix
+        timeout: Seconds before a request counts as an error
+
+    Returns:
+        The JSON-serializable report
+    """
+    kinds = [kind for kind, weight in mix.items() if weight > 0]
+    weights = [mix[kind] for kind in kinds]
+    requests = build_requests(kinds, samples, seed)
+
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors: Counter = Counter()
+    status_codes: Counter = Counter()
+    start_time = time.perf_counter()
+    measure_from = start_time + warmup
+    stop_at = measure_from + duration
+
+    async def client_loop(index: int) -> None:
+        rng = random.Random(seed + index)
+        headers = {"content-type": "application/json"}
+        while True:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = rng.choice(requests[kind])
+            sent_at = time.perf_counter()
+            if sent_at >= stop_at:
+                return
+            try:
+                response = await client.request(method, path, content=body, headers=headers, timeout=timeout)
+                status = str(response.status_code)
+                failed = response.status_code >= 400
+            except Exception as e:
+                status = type(e).__name__
+                failed = True
+            finished_at = time.perf_counter()
+            if measure_from <= sent_at and finished_at <= stop_at:
+                latencies[kind].append(finished_at - sent_at)
+                status_codes[status] += 1
+                errors[kind] += failed
+
+    await asyncio.gather(*(client_loop(index) for index in range(concurrency)))
+
+    every = [latency for kind in kinds for latency in latencies[kind]]
+    return {
+        "config": {
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "mix": {kind: mix[kind] for kind in kinds},
+            "samples": samples,
+            "seed": seed
+        },
+        **summarize(every, sum(errors.values()), duration),
+        "status_codes": dict(status_codes),
+        "by_kind": {kind: summarize(latencies[kind], errors[kind], duration) for kind in kinds}
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test against a URL, or against the app in-process."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    options = dict(
+        mix=args.mix,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        warmup=args.warmup,
+        samples=args.samples,
+        seed=args.seed,
+        timeout=args.timeout
+    )
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+            report = await run_load(client, **options)
+        report["target"] = args.url
+        return report
+
+    from app.main import app
+
+    # Per-request logs from the in-process app would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as client:
+            report = await run_load(client, **options)
+    report["target"] = "in-process"
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of the API under concurrent load")
+    parser.add_argument("--url", default=None, help="Base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Weighted request kinds, e.g. advanced=8,basic=1,water_quality=1,status=0")
+    parser.add_argument("--samples", type=int, default=1000, help="Distinct payloads per request kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a request counts as an error")
+    parser.add_argument("--output", default=None, help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    body = dumps(report)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(body)
+    else:
+        sys.stdout.buffer.write(body + b"\n")
+
+
+if __name__ == "__main__":
+    main()
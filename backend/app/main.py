@@ -1,23 +1,64 @@
+import time
+
+# Measured before the application imports so /health can report the import cost
+_import_start = time.perf_counter()
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router as api_router
+from app.services.model_registry import model_registry
+from app.services.prediction_log import prediction_log
+from app.core.memory import process_memory
+from app.core.logging import RequestLoggingMiddleware, sampling_stats
+from app.core.admission import AdmissionControlMiddleware, admission_stats
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 
+IMPORT_TIME = time.perf_counter() - _import_start
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models and warm up before the server accepts requests, unless a
+    # preforking master (app.serve) already did so before forking this worker
+    if model_registry.state != "ready":
+        await asyncio.to_thread(model_registry.startup)
+    yield
+    # Write out the predictions still queued for the log
+    await asyncio.to_thread(prediction_log.close)
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for Fish Habitat Analyzer: Water Quality & Species Prediction",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
-# Set up CORS
+# Compress large responses with gzip or brotli
+app.add_middleware(CompressionMiddleware)
+
+# Limit concurrent prediction, batch and training requests, shedding the excess
+app.add_middleware(AdmissionControlMiddleware)
+
+# Give each request an ID and log its duration
+app.add_middleware(RequestLoggingMiddleware)
+
+# Set up CORS. Added last, so it wraps every other middleware and the responses they
+# produce themselves, such as shed requests, carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Request-ID", "ETag"],
 )
 
 # Include API routes
@@ -29,8 +70,17 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "ready": model_registry.state == "ready",
+        "state": model_registry.state,
+        "models": model_registry.status(),
+        "startup": {"import_time": IMPORT_TIME, **model_registry.startup_info},
+        "process": {"pid": os.getpid(), "memory": process_memory()},
+        "logging": sampling_stats(),
+        "admission": admission_stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
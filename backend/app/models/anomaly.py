@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Values outside these limits cannot come from a working sensor. Features not listed
+# only need to be non-negative
+PLAUSIBLE_RANGES: Dict[str, Tuple[float, float]] = {
+    'temperature': (0.0, 45.0),
+    'ph': (0.0, 14.0)
+}
+
+
+class AnomalyDetector:
+    """
+    Flags readings that look unlike the data a model was trained on.
+
+    Three checks are combined, all vectorized over the rows being scored:
+
+    - implausible: a value outside the physical range of its sensor
+    - out_of_range: a value outside the range seen in training, with a margin
+    - a Mahalanobis distance from the training rows beyond the distance that only a
+      `contamination` fraction of training rows exceed, which catches unusual
+      combinations of individually normal values
+
+    The statistics are fitted on the plausible training rows only, so sensor glitches
+    in the dataset do not widen what counts as normal.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        plausible_low: np.ndarray,
+        plausible_high: np.ndarray,
+        low: np.ndarray,
+        high: np.ndarray,
+        mean: np.ndarray,
+        precision: np.ndarray,
+        threshold: float
+    ):
+        self.feature_names = feature_names
+        self.plausible_low = plausible_low
+        self.plausible_high = plausible_high
+        self.low = low
+        self.high = high
+        self.mean = mean
+        self.precision = precision
+        self.threshold = threshold
+
+    @classmethod
+    def fit(
+        cls,
+        X: np.ndarray,
+        feature_names: List[str],
+        quantile: float = 0.001,
+        margin: float = 0.1,
+        contamination: float = 0.01
+    ) -> "AnomalyDetector":
+        """
+        Fit the detector on training features in their original units.
+
+        Args:
+            X: Training features, shape (n_rows, n_features)
+            feature_names: Name of each column
+            quantile: Tail fraction cut off each side when taking the training range
+            margin: Fraction of the training range added on each side
+            contamination: Fraction of training rows allowed beyond the distance threshold
+
+        Returns:
+            The fitted detector
+        """
+        X = np.asarray(X, dtype=np.float64)
+        plausible_low = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[0] for name in feature_names])
+        plausible_high = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[1] for name in feature_names])
+        X = X[((X >= plausible_low) & (X <= plausible_high)).all(axis=1)]
+
+        low, high = np.quantile(X, [quantile, 1.0 - quantile], axis=0)
+        spread = high - low
+        mean = X.mean(axis=0)
+        precision = np.linalg.pinv(np.atleast_2d(np.cov(X, rowvar=False)))
+
+        detector = cls(
+            feature_names=list(feature_names),
+            plausible_low=plausible_low,
+            plausible_high=plausible_high,
+            low=low - margin * spread,
+            high=high + margin * spread,
+            mean=mean,
+            precision=precision,
+            threshold=1.0
+        )
+        detector.threshold = float(np.quantile(detector._distance(X), 1.0 - contamination))
+        return detector
+
+    def check(self, readings: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+        """
+        Check readings against the training distribution.
+
+        Args:
+            readings: Readings with every feature the detector was fitted on
+
+        Returns:
+            One result per reading: whether it is anomalous, its distance score relative
+            to the threshold (above 1 is unusual) and the features that failed a range check
+        """
+        X = np.array([[reading[name] for name in self.feature_names] for reading in readings], dtype=np.float64)
+        is_anomaly, scores, implausible, out_of_range = self.check_array(X)
+
+        results = []
+        for row_anomaly, row_implausible, row_out_of_range, score in zip(is_anomaly, implausible, out_of_range, scores):
+            features = {
+                self.feature_names[i]: 'implausible' if row_implausible[i] else 'out_of_range'
+                for i in np.flatnonzero(row_implausible | row_out_of_range)
+            }
+            results.append({
+                'is_anomaly': bool(row_anomaly),
+                'score': float(score),
+                'features': features
+            })
+        return results
+
+    def check_array(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Check a feature matrix, with columns in `feature_names` order, without building per-row results.
+
+        Returns:
+            Whether each row is anomalous, its distance score, and boolean matrices of
+            the implausible and out of range values
+        """
+        X = np.asarray(X, dtype=np.float64)
+        implausible = (X < self.plausible_low) | (X > self.plausible_high)
+        out_of_range = ((X < self.low) | (X > self.high)) & ~implausible
+        scores = self._distance(X) / self.threshold
+        is_anomaly = implausible.any(axis=1) | out_of_range.any(axis=1) | (scores > 1.0)
+        return is_anomaly, scores, implausible, out_of_range
+
+    def _distance(self, X: np.ndarray) -> np.ndarray:
+        """Mahalanobis distance of each row from the training mean."""
+        centered = X - self.mean
+        return np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', centered, self.precision, centered), 0.0))
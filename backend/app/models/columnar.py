@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.models.anomaly import PLAUSIBLE_RANGES
+
+# Model features of each species model, in the order the models expect them
+BASIC_FEATURES = ['ph', 'temperature', 'turbidity']
+ADVANCED_FEATURES = [
+    'temperature', 'turbidity', 'dissolved_oxygen', 'bod', 'co2', 'ph', 'alkalinity',
+    'hardness', 'calcium', 'ammonia', 'nitrite', 'phosphorus', 'h2s', 'plankton'
+]
+
+# Other names a column may be sent under, as in the row request schemas
+COLUMN_ALIASES = {'dissolved_oxygen': 'DO'}
+
+
+def parse_columns(
+    payload: Mapping[str, Any],
+    features: List[str],
+    max_rows: int
+) -> Tuple[Dict[str, np.ndarray], Optional[List[str]]]:
+    """
+    Validate a columnar batch, one array per feature, as whole arrays.
+
+    Each column must be a one-dimensional array of numbers (not booleans or strings),
+    all of the same length, finite, and within the plausible range of its sensor.
+    Arrays that are already float64 numpy arrays are used without copying.
+
+    Args:
+        payload: Feature name to array of values, plus optional "site_ids"
+        features: The model features that must be present
+        max_rows: Largest accepted batch
+
+    Returns:
+        The float64 column of each feature and the site IDs, if given
+
+    Raises:
+        ValueError: With every problem found, naming the columns and first bad rows
+    """
+    if not isinstance(payload, Mapping):
+        raise ValueError("Columnar request body must be an object of feature arrays")
+
+    problems = []
+    columns: Dict[str, np.ndarray] = {}
+    for name in features:
+        alias = COLUMN_ALIASES.get(name)
+        values = payload.get(name, payload.get(alias) if alias else None)
+        if values is None:
+            problems.append(f"{name}: missing")
+            continue
+        try:
+            array = np.asarray(values)
+        except Exception:
+            problems.append(f"{name}: must be an array of numbers")
+            continue
+        if array.ndim != 1 or array.dtype.kind not in 'iuf':
+            problems.append(f"{name}: must be an array of numbers")
+            continue
+        columns[name] = array.astype(np.float64, copy=False)
+
+    lengths = {len(array) for array in columns.values()}
+    if len(lengths) > 1:
+        problems.append("all columns must have the same length, got " + ", ".join(
+            f"{name}={len(array)}" for name, array in columns.items()
+        ))
+    n_rows = lengths.pop() if len(lengths) == 1 else 0
+    if columns and n_rows == 0 and not problems:
+        problems.append("columns must not be empty")
+    if n_rows > max_rows:
+        problems.append(f"batch has {n_rows} rows, more than the limit of {max_rows}")
+
+    if not problems:
+        for name, array in columns.items():
+            low, high = PLAUSIBLE_RANGES.get(name, (0.0, np.inf))
+            invalid = ~np.isfinite(array) | (array < low) | (array > high)
+            if invalid.any():
+                rows = np.flatnonzero(invalid)
+                shown = ", ".join(str(row) for row in rows[:5]) + (", ..." if len(rows) > 5 else "")
+                problems.append(f"{name}: {len(rows)} values are not finite or outside [{low}, {high}] (rows {shown})")
+
+    site_ids = payload.get('site_ids')
+    if site_ids is not None:
+        site_ids = np.asarray(site_ids)
+        if site_ids.ndim != 1 or site_ids.dtype.kind not in 'UOiu':
+            problems.append("site_ids: must be an array of strings")
+        elif not problems and len(site_ids) != n_rows:
+            problems.append(f"site_ids: has {len(site_ids)} values for {n_rows} rows")
+        else:
+            site_ids = site_ids.astype(str).tolist()
+
+    if problems:
+        raise ValueError("Invalid columnar batch: " + "; ".join(problems))
+    return columns, site_ids
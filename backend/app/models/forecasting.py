@@ -0,0 +1,86 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from app.models.anomaly import PLAUSIBLE_RANGES
+
+
+def stack_histories(histories: Sequence[np.ndarray], window: int) -> np.ndarray:
+    """
+    Stack the recent readings of many sites into one array.
+
+    Args:
+        histories: One (n_readings, n_features) array per site, oldest reading first
+        window: Number of most recent readings kept per site
+
+    Returns:
+        Array of shape (n_sites, window, n_features), with each site's readings
+        aligned to end at the last step and NaN before a site's first reading
+    """
+    n_features = histories[0].shape[1]
+    stacked = np.full((len(histories), window, n_features), np.nan)
+    for site, history in enumerate(histories):
+        recent = history[-window:]
+        stacked[site, window - len(recent):] = recent
+    return stacked
+
+
+def rolling_trend(stacked: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit a least squares line through each site's recent readings of each feature.
+
+    All sites and features are fitted at once; steps without a reading are left out
+    of their site's fit. A site with a single reading has no trend.
+
+    Args:
+        stacked: Array of shape (n_sites, window, n_features) from stack_histories
+
+    Returns:
+        The fitted level at the last step and the slope per step, each of shape
+        (n_sites, n_features)
+    """
+    valid = ~np.isnan(stacked)
+    values = np.where(valid, stacked, 0.0)
+    count = np.maximum(valid.sum(axis=1), 1)
+    # Steps counted back from the most recent reading, which is step 0
+    steps = (np.arange(stacked.shape[1]) - (stacked.shape[1] - 1)).astype(np.float64)[None, :, None]
+
+    mean_step = (steps * valid).sum(axis=1) / count
+    mean_value = values.sum(axis=1) / count
+    step_offset = (steps - mean_step[:, None, :]) * valid
+    variance = (step_offset ** 2).sum(axis=1)
+    covariance = (step_offset * (values - mean_value[:, None, :])).sum(axis=1)
+
+    slope = np.divide(covariance, variance, out=np.zeros_like(covariance), where=variance > 0)
+    level = mean_value - slope * mean_step
+    return level, slope
+
+
+def damped_trend_forecast(
+    level: np.ndarray,
+    slope: np.ndarray,
+    horizon: int,
+    damping: float,
+    feature_names: List[str]
+) -> np.ndarray:
+    """
+    Extrapolate each feature with a damped trend and keep it within its sensor's range.
+
+    The value h steps ahead is level + slope * (damping + damping² + ... + damping^h),
+    so trends flatten out instead of running away over long horizons.
+
+    Args:
+        level: Fitted level at the last step, shape (n_sites, n_features)
+        slope: Fitted slope per step, shape (n_sites, n_features)
+        horizon: Number of future steps
+        damping: Factor between 0 and 1 applied to the trend at each step
+        feature_names: Feature of each column, used to look up plausible ranges
+
+    Returns:
+        Array of shape (n_sites, horizon, n_features)
+    """
+    cumulative = np.cumsum(damping ** np.arange(1, horizon + 1))
+    forecast = level[:, None, :] + slope[:, None, :] * cumulative[None, :, None]
+    low = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[0] for name in feature_names])
+    high = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[1] for name in feature_names])
+    return np.clip(forecast, low, high)
@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class NeighborIndex:
+    """
+    KD-tree over the standardized features of a training dataset.
+
+    Built when a species model is trained and saved with it, so the labelled rows most
+    similar to a reading can be looked up without reloading the dataset. Queries are
+    standardized with the model's scaler statistics copied into the index, which avoids
+    building a DataFrame per lookup.
+    """
+
+    def __init__(
+        self,
+        tree: Any,
+        mean: np.ndarray,
+        scale: np.ndarray,
+        feature_names: List[str],
+        features: np.ndarray,
+        rows: np.ndarray,
+        species: np.ndarray,
+        water_quality: Optional[np.ndarray] = None
+    ):
+        self.tree = tree
+        self.mean = mean
+        self.scale = scale
+        self.feature_names = feature_names
+        self.features = features
+        self.rows = rows
+        self.species = species
+        self.water_quality = water_quality
+
+    @classmethod
+    def build(
+        cls,
+        X_scaled: np.ndarray,
+        features: "pd.DataFrame",
+        species: "pd.Series",
+        scaler: Any,
+        water_quality: Optional["pd.Series"] = None,
+        leaf_size: int = 40
+    ) -> "NeighborIndex":
+        """
+        Index the scaled training features.
+
+        Args:
+            X_scaled: Standardized features of every labelled row
+            features: The same rows in original units, with the dataset's row labels
+            species: Species label of each row
+            scaler: The fitted StandardScaler that produced X_scaled
+            water_quality: Water quality of each row, if the dataset has it
+            leaf_size: KD-tree leaf size
+
+        Returns:
+            The index
+        """
+        from sklearn.neighbors import KDTree
+
+        return cls(
+            tree=KDTree(np.ascontiguousarray(X_scaled, dtype=np.float64), leaf_size=leaf_size),
+            mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scale=np.asarray(scaler.scale_, dtype=np.float64),
+            feature_names=list(features.columns),
+            features=features.to_numpy(dtype=np.float64),
+            rows=np.asarray(features.index),
+            species=np.asarray(species, dtype=object),
+            water_quality=np.asarray(water_quality, dtype=np.float64) if water_quality is not None else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def query(self, readings: List[Dict[str, float]], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Find the k labelled rows nearest to each reading.
+
+        Args:
+            readings: Readings with every indexed feature
+            k: Number of neighbors per reading
+
+        Returns:
+            For each reading, its neighbors from nearest to farthest with their distance
+            in standardized units, dataset row, species, water quality and features
+        """
+        missing = [name for name in self.feature_names if name not in readings[0]]
+        if missing:
+            raise ValueError(f"Input data missing required features: {missing}")
+
+        X = np.array([[reading[name] for name in self.feature_names] for reading in readings], dtype=np.float64)
+        distances, indices = self.tree.query((X - self.mean) / self.scale, k=min(k, len(self)))
+
+        return [
+            [
+                {
+                    'distance': float(distance),
+                    'row': int(self.rows[index]),
+                    'species': self.species[index],
+                    'water_quality': float(self.water_quality[index]) if self.water_quality is not None else None,
+                    'features': dict(zip(self.feature_names, self.features[index].tolist()))
+                }
+                for distance, index in zip(row_distances, row_indices)
+            ]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
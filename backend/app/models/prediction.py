@@ -1,17 +1,84 @@
-from typing import Dict, List, Optional, Tuple, Any, Union
-import pandas as pd
+from typing import Dict, List, Optional, Tuple, Any, Union, TYPE_CHECKING
+from datetime import datetime, timezone
 import numpy as np
+import json
 import pickle
 import os
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler
+import tempfile
 from app.core.logging import logger
 from app.core.config import settings
 
+# pandas and scikit-learn are imported where they are used so that importing the
+# API does not pay for them; unpickling a model pulls in what serving needs
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Map WQD_with_Fish_Species_v2.csv column names to standardized names
+WATER_QUALITY_COLUMN_MAPPING = {
+    'Temp': 'temperature',
+    'Turbidity (cm)': 'turbidity',
+    'DO(mg/L)': 'dissolved_oxygen',
+    'BOD (mg/L)': 'bod',
+    'CO2': 'co2',
+    'pH`': 'ph',
+    'Alkalinity (mg L-1 )': 'alkalinity',
+    'Hardness (mg L-1 )': 'hardness',
+    'Calcium (mg L-1 )': 'calcium',
+    'Ammonia (mg L-1 )': 'ammonia',
+    'Nitrite (mg L-1 )': 'nitrite',
+    'Phosphorus (mg L-1 )': 'phosphorus',
+    'H2S (mg L-1 )': 'h2s',
+    'Plankton (No. L-1)': 'plankton',
+    'Water Quality': 'water_quality',
+    'fish': 'fish'
+}
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write a file by renaming a fully written temporary file over it."""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert numpy values in model info to JSON types."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+WATER_QUALITY_FEATURES = [
+    'temperature', 'turbidity', 'dissolved_oxygen', 'bod', 'co2', 
+    'ph', 'alkalinity', 'hardness', 'calcium', 'ammonia', 
+    'nitrite', 'phosphorus', 'h2s', 'plankton'
+]
+
 
 class BasePredictionModel:
     """Base class for prediction models."""
     
+    # Subclasses describe their dataset so shared training code can load it
+    MODEL_TYPE: str = None
+    TASK: str = 'classification'
+    DEFAULT_DATA_PATH: str = None
+    # Hyperparameters of the estimator trained by `train`, besides random_state
+    ESTIMATOR_PARAMS: Dict[str, Any] = {}
+    COLUMN_MAPPING: Dict[str, str] = {}
+    FEATURE_NAMES: List[str] = []
+    TARGET_NAME: str = None
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model = None
         self.scaler = None
@@ -19,54 +86,576 @@ class BasePredictionModel:
         self.target_name = None
         self.model_path = model_path
         self.model_info = {}
+        # Flattened copy of the ensemble used for explanations, built on first use
+        self._explainer = None
+        # KD-tree over the training rows, built when a species model is trained
+        self.neighbor_index = None
+        # Out-of-distribution check for inputs, fitted when a species model is trained
+        self.anomaly_detector = None
+        # The estimator the scaler was folded out of, kept to score large batches
+        self.scaled_model = None
         
         # Try to load the model if it exists
         if os.path.exists(self.model_path):
             self.load_model()
     
-    def load_model(self) -> None:
-        """Load model from disk."""
+    def load_model(self, path: Optional[str] = None) -> None:
+        """Load model from disk, by default from the live model path."""
+        path = path or self.model_path
         try:
-            with open(self.model_path, 'rb') as f:
+            with open(path, 'rb') as f:
                 model_data = pickle.load(f)
                 self.model = model_data['model']
                 self.scaler = model_data.get('scaler')
                 self.feature_names = model_data.get('feature_names')
                 self.target_name = model_data.get('target_name')
                 self.model_info = model_data.get('model_info', {})
-                logger.info(f"Model loaded from {self.model_path}")
+                self.neighbor_index = model_data.get('neighbor_index')
+                self.anomaly_detector = model_data.get('anomaly_detector')
+                self.scaled_model = model_data.get('scaled_model')
+                logger.info(f"Model loaded from {path}")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
     
-    def save_model(self) -> None:
-        """Save model to disk."""
+    def save_model(self, activate: bool = True) -> None:
+        """
+        Save the model to disk as a new version.
+        
+        Every save writes an immutable version file; with activate it is also published
+        as the live model. All files are written to a temporary file and renamed into
+        place, so readers never see a partially written model.
+        """
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        os.makedirs(self.versions_dir, exist_ok=True)
         
         try:
-            model_data = {
-                'model': self.model,
-                'scaler': self.scaler,
-                'feature_names': self.feature_names,
-                'target_name': self.target_name,
-                'model_info': self.model_info
-            }
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            logger.info(f"Model saved to {self.model_path}")
+            version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            self.model_info['version'] = version
+            self.model_info['created_at'] = datetime.now(timezone.utc).isoformat()
+            
+            _atomic_write(self._version_path(version), pickle.dumps(self._model_data()))
+            _atomic_write(
+                self._version_path(version, '.json'),
+                json.dumps(self.model_info, default=_json_default).encode('utf-8')
+            )
+            logger.info(f"Model version {version} saved to {self.versions_dir}")
+            
+            if activate:
+                self.publish()
+            self._prune_versions()
         except Exception as e:
             logger.error(f"Error saving model: {e}")
             raise
     
-    def predict(self, data: Union[pd.DataFrame, Dict]) -> Dict:
-        """Make a prediction using the trained model."""
+    def publish(self) -> None:
+        """Atomically make this model the live model on disk and point ACTIVE at its version."""
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        version = self.model_info.get('version')
+        version_path = self._version_path(version) if version else None
+        
+        if version_path and os.path.exists(version_path):
+            with open(version_path, 'rb') as f:
+                data = f.read()
+        else:
+            data = pickle.dumps(self._model_data())
+        _atomic_write(self.model_path, data)
+        if version:
+            _atomic_write(os.path.join(self.versions_dir, 'ACTIVE'), version.encode('utf-8'))
+        logger.info(f"Model saved to {self.model_path}")
+    
+    def load_version(self, version: str) -> None:
+        """Load a saved version of the model."""
+        path = self._version_path(version)
+        if os.path.basename(version) != version or not os.path.exists(path):
+            raise ValueError(f"Unknown {self.MODEL_TYPE} model version: {version}")
+        self.load_model(path)
+    
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """List the saved versions of the model, newest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        active = self.active_version()
+        versions = []
+        for name in sorted(os.listdir(self.versions_dir), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.versions_dir, name)) as f:
+                info = json.load(f)
+            info['active'] = info.get('version') == active
+            versions.append(info)
+        return versions
+    
+    def active_version(self) -> Optional[str]:
+        """Get the version currently published as the live model."""
+        try:
+            with open(os.path.join(self.versions_dir, 'ACTIVE')) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    @property
+    def versions_dir(self) -> str:
+        return os.path.join(settings.MODEL_VERSIONS_PATH, self.MODEL_TYPE)
+    
+    def _version_path(self, version: str, extension: str = '.pkl') -> str:
+        return os.path.join(self.versions_dir, f"{version}{extension}")
+    
+    def _model_data(self) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'feature_names': self.feature_names,
+            'target_name': self.target_name,
+            'model_info': self.model_info,
+            'neighbor_index': self.neighbor_index,
+            'anomaly_detector': self.anomaly_detector,
+            'scaled_model': self.scaled_model
+        }
+    
+    def _prune_versions(self) -> None:
+        """Delete the oldest versions beyond MAX_MODEL_VERSIONS, never the active one."""
+        versions = sorted(
+            name[:-len('.pkl')] for name in os.listdir(self.versions_dir) if name.endswith('.pkl')
+        )
+        active = self.active_version()
+        excess = max(len(versions) - settings.MAX_MODEL_VERSIONS, 0)
+        for version in [version for version in versions if version != active][:excess]:
+            for extension in ('.pkl', '.json'):
+                try:
+                    os.remove(self._version_path(version, extension))
+                except OSError:
+                    pass
+    
+    def train_streaming(
+        self,
+        data_path: str = None,
+        chunk_size: int = 10000,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        activate: bool = True
+    ) -> Dict:
+        """
+        Train an incremental model by streaming the dataset in chunks.
+        
+        Only one chunk is held in memory at a time. The first pass fits the scaler
+        with partial_fit, the next passes train a small neural network classifier or
+        regressor with partial_fit, and a final pass scores the holdout rows. Each row's train/test
+        assignment is drawn from a generator seeded per chunk, so every pass agrees.
+        
+        Args:
+            data_path: CSV file to train on, defaults to the model's dataset
+            chunk_size: Number of rows read per chunk
+            test_size: Proportion of rows held out for evaluation
+            random_state: Random seed for reproducibility
+            activate: Publish the trained model as the live model once saved
+            
+        Returns:
+            Training metrics, including the peak memory traced during training
+        """
+        from sklearn.neural_network import MLPClassifier, MLPRegressor
+        from sklearn.preprocessing import StandardScaler
+        import time
+        import tracemalloc
+        
+        data_path = data_path or self.DEFAULT_DATA_PATH
+        logger.info(f"Streaming data from {data_path} in chunks of {chunk_size} rows")
+        
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start_time = time.time()
+        
+        self.feature_names = list(self.FEATURE_NAMES)
+        self.target_name = self.TARGET_NAME
+        is_classifier = self.TASK == 'classification'
+        # Indexing every row for neighbor lookups or fitting the anomaly detector
+        # would need the whole dataset in memory
+        self.neighbor_index = None
+        self.anomaly_detector = None
+        
+        # Pass 1: fit the scaler on the training rows and collect the classes
+        self.scaler = StandardScaler()
+        classes = set()
+        n_rows = 0
+        n_chunks = 0
+        for X, y, is_test in self._stream_chunks(data_path, chunk_size, test_size, random_state):
+            n_rows += len(y)
+            n_chunks += 1
+            if (~is_test).any():
+                self.scaler.partial_fit(X[~is_test])
+                if is_classifier:
+                    classes.update(y[~is_test])
+        if n_rows == 0:
+            raise ValueError(f"No usable rows found in {data_path}")
+        
+        # Passes 2..n: train the incremental model
+        network = {
+            'hidden_layer_sizes': tuple(settings.STREAMING_HIDDEN_LAYERS),
+            'learning_rate_init': settings.STREAMING_LEARNING_RATE,
+            'random_state': random_state
+        }
+        if is_classifier:
+            self.model = MLPClassifier(**network)
+            classes = np.array(sorted(classes))
+        else:
+            self.model = MLPRegressor(**network)
+        self.scaled_model = None
+        rng = np.random.RandomState(random_state)
+        for _ in range(settings.STREAMING_EPOCHS):
+            for X, y, is_test in self._stream_chunks(data_path, chunk_size, test_size, random_state):
+                # Shuffle within the chunk so files sorted by target do not bias the updates
+                order = rng.permutation(np.flatnonzero(~is_test))
+                if len(order) == 0:
+                    continue
+                X_train = self.scaler.transform(X[order])
+                if is_classifier:
+                    self.model.partial_fit(X_train, y[order], classes=classes)
+                else:
+                    self.model.partial_fit(X_train, y[order])
+        training_time = time.time() - start_time
+        
+        # Final pass: evaluate on the holdout rows, keeping only running totals
+        metrics = self._evaluate_streaming(data_path, chunk_size, test_size, random_state)
+        
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        if not tracing:
+            tracemalloc.stop()
+        
+        streaming = {
+            'chunk_size': chunk_size,
+            'n_chunks': n_chunks,
+            'n_rows': n_rows,
+            'epochs': settings.STREAMING_EPOCHS,
+            'peak_memory_mb': peak_memory / (1024 * 1024)
+        }
+        self.model_info = {
+            'model_type': self.MODEL_TYPE,
+            **metrics,
+            'training_time': training_time,
+            'feature_names': self.feature_names,
+            'streaming': streaming
+        }
+        self.save_model(activate=activate)
+        
+        return {
+            'model_type': self.MODEL_TYPE,
+            **metrics,
+            'training_time': training_time,
+            'model_path': self.model_path,
+            'streaming': streaming
+        }
+    
+    def _stream_chunks(self, data_path: str, chunk_size: int, test_size: float, random_state: int):
+        """Yield (features, target, holdout mask) for each chunk of the dataset."""
+        import pandas as pd
+        
+        # Only read the columns the model needs
+        original_names = {standard: original for original, standard in self.COLUMN_MAPPING.items()}
+        columns = [original_names.get(name, name) for name in self.FEATURE_NAMES + [self.TARGET_NAME]]
+        
+        for index, chunk in enumerate(pd.read_csv(data_path, usecols=columns, chunksize=chunk_size)):
+            chunk = chunk.rename(columns=self.COLUMN_MAPPING).dropna()
+            is_test = np.random.RandomState(random_state + index).rand(len(chunk)) < test_size
+            yield (
+                chunk[self.FEATURE_NAMES].to_numpy(dtype=np.float64),
+                chunk[self.TARGET_NAME].to_numpy(),
+                is_test
+            )
+    
+    def _evaluate_streaming(self, data_path: str, chunk_size: int, test_size: float, random_state: int) -> Dict[str, float]:
+        """Score the holdout rows chunk by chunk from running totals."""
+        is_classifier = self.TASK == 'classification'
+        classes = list(self.model.classes_) if is_classifier else []
+        true_positive = np.zeros(len(classes))
+        predicted = np.zeros(len(classes))
+        support = np.zeros(len(classes))
+        n = 0
+        squared_error = 0.0
+        total = 0.0
+        total_squared = 0.0
+        
+        for X, y, is_test in self._stream_chunks(data_path, chunk_size, test_size, random_state):
+            if not is_test.any():
+                continue
+            y_test = y[is_test]
+            y_pred = self.model.predict(self.scaler.transform(X[is_test]))
+            n += len(y_test)
+            if is_classifier:
+                true_index = np.searchsorted(classes, y_test)
+                known = np.isin(y_test, classes)
+                pred_index = np.searchsorted(classes, y_pred)
+                np.add.at(support, true_index[known], 1)
+                np.add.at(predicted, pred_index, 1)
+                np.add.at(true_positive, pred_index[(y_pred == y_test)], 1)
+            else:
+                squared_error += float(((y_test - y_pred) ** 2).sum())
+                total += float(y_test.sum())
+                total_squared += float((y_test ** 2).sum())
+        
+        if n == 0:
+            raise ValueError("No holdout rows to evaluate; increase test_size")
+        
+        if is_classifier:
+            precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+            recall = np.divide(true_positive, support, out=np.zeros_like(true_positive), where=support > 0)
+            f1 = np.divide(2 * precision * recall, precision + recall,
+                           out=np.zeros_like(true_positive), where=(precision + recall) > 0)
+            return {
+                'accuracy': float(true_positive.sum() / n),
+                'f1_score': float((f1 * support).sum() / max(support.sum(), 1))
+            }
+        
+        variance = total_squared - total ** 2 / n
+        return {
+            'mse': squared_error / n,
+            'r2_score': 1.0 - squared_error / variance if variance > 0 else 0.0
+        }
+    
+    def compact_model(self, X_fit: np.ndarray, X_test: np.ndarray, y_test: Any) -> Dict[str, Any]:
+        """
+        Replace the fitted ensemble with a smaller FlatTreeEnsemble.
+        
+        Trees are pruned to the configured depth and leaf size limits, forests drop the
+        trees that contribute least to their predictions on X_fit, and thresholds and
+        leaf values are stored in float32.
+        
+        Args:
+            X_fit: Scaled training features, used to decide which trees to drop
+            X_test: Scaled holdout features
+            y_test: Holdout targets
+            
+        Returns:
+            Size, latency and accuracy (or R²) of the model before and after compaction
+        """
+        from app.models.tree_ensemble import FlatTreeEnsemble
+        import time
+        
+        start_time = time.time()
+        original = self.model
+        ensemble = FlatTreeEnsemble.from_sklearn(original)
+        trees_before, nodes_before = ensemble.n_trees, ensemble.n_nodes
+        
+        ensemble = ensemble.prune(
+            max_depth=settings.COMPACT_MAX_DEPTH,
+            min_samples_leaf=settings.COMPACT_MIN_SAMPLES_LEAF
+        )
+        if ensemble.kind == "forest":
+            ensemble = ensemble.select_by_agreement(
+                X_fit[:settings.COMPACT_SELECTION_ROWS],
+                min_agreement=settings.COMPACT_MIN_AGREEMENT
+            )
+        compacted = ensemble.compact()
+        compaction_time = time.time() - start_time
+        
+        report = {
+            'before': self._footprint(original, X_test, y_test),
+            'after': self._footprint(compacted, X_test, y_test),
+            'n_trees': [trees_before, compacted.n_trees],
+            'n_nodes': [nodes_before, compacted.n_nodes],
+            'max_depth': settings.COMPACT_MAX_DEPTH,
+            'min_samples_leaf': settings.COMPACT_MIN_SAMPLES_LEAF,
+            'min_agreement': settings.COMPACT_MIN_AGREEMENT,
+            'compaction_time': compaction_time
+        }
+        logger.info(
+            f"Compacted model from {report['before']['size_bytes']} to {report['after']['size_bytes']} bytes"
+        )
+        
+        self.model = compacted
+        return report
+    
+    def _footprint(self, model: Any, X_test: np.ndarray, y_test: Any) -> Dict[str, float]:
+        """Measure the pickled size, prediction latency and holdout score of a model."""
+        from sklearn.metrics import accuracy_score, r2_score
+        import time
+        
+        single_row = X_test[:1]
+        timings = []
+        for _ in range(20):
+            start_time = time.perf_counter()
+            model.predict(single_row)
+            timings.append(time.perf_counter() - start_time)
+        
+        start_time = time.perf_counter()
+        y_pred = model.predict(X_test)
+        batch_time = time.perf_counter() - start_time
+        
+        is_classifier = getattr(model, 'classes_', None) is not None
+        return {
+            'size_bytes': len(pickle.dumps(model)),
+            'latency_ms': float(np.median(timings)) * 1000,
+            'batch_latency_ms': batch_time * 1000,
+            'accuracy' if is_classifier else 'r2_score': float(
+                accuracy_score(y_test, y_pred) if is_classifier else r2_score(y_test, y_pred)
+            )
+        }
+    
+    def cross_validate(self, X: "pd.DataFrame", y: "pd.Series", folds: int, random_state: int = 42) -> Dict[str, Any]:
+        """
+        Estimate the model's accuracy with k-fold cross validation, fitting the folds in parallel.
+        
+        Each fold fits a fresh copy of the trained model's estimator, with its own scaler
+        fitted on the fold's training rows. Folds run in CV_N_JOBS processes, so wall time
+        stays close to one fit while there are cores for every fold.
+        
+        Args:
+            X: Unscaled features of every labelled row
+            y: Targets
+            folds: Number of folds
+            random_state: Seed for shuffling rows into folds
+            
+        Returns:
+            Mean, standard deviation and per-fold values of each metric (accuracy and
+            weighted F1 for classifiers, R² and MSE for regressors), per-fold fit times,
+            and the wall time of the whole run
+        """
+        import time
+        from sklearn.base import clone
+        from sklearn.model_selection import KFold, StratifiedKFold, cross_validate
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        
+        if self.TASK == 'classification':
+            splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+            scoring = {'accuracy': 'accuracy', 'f1_score': 'f1_weighted'}
+        else:
+            splitter = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+            scoring = {'r2_score': 'r2', 'mse': 'neg_mean_squared_error'}
+        
+        logger.info(f"Cross validating the {self.MODEL_TYPE} model with {folds} folds")
+        start_time = time.perf_counter()
+        scores = cross_validate(
+            make_pipeline(StandardScaler(), clone(self.model)),
+            X,
+            y,
+            cv=splitter,
+            scoring=scoring,
+            n_jobs=settings.CV_N_JOBS
+        )
+        wall_time = time.perf_counter() - start_time
+        
+        report = {'folds': folds}
+        for name in scoring:
+            # Losses are negated by sklearn so that higher is better
+            values = -scores[f'test_{name}'] if name == 'mse' else scores[f'test_{name}']
+            report[name] = {
+                'mean': float(np.mean(values)),
+                'std': float(np.std(values)),
+                'folds': values.tolist()
+            }
+        report['fit_time'] = scores['fit_time'].tolist()
+        report['wall_time'] = wall_time
+        # Above 1 when folds ran in parallel
+        report['speedup'] = float(np.sum(scores['fit_time'] + scores['score_time']) / wall_time) if wall_time > 0 else None
+        return report
+    
+    def _fit_anomaly_detector(self, X: "pd.DataFrame"):
+        """Fit the input anomaly detector on the unscaled training features."""
+        from app.models.anomaly import AnomalyDetector
+        
+        return AnomalyDetector.fit(
+            X.to_numpy(),
+            self.feature_names,
+            quantile=settings.ANOMALY_QUANTILE,
+            margin=settings.ANOMALY_MARGIN,
+            contamination=settings.ANOMALY_CONTAMINATION
+        )
+    
+    def _feature_importances(self) -> np.ndarray:
+        """Get feature importances, falling back to input weight sizes for neural networks."""
+        if hasattr(self.model, 'feature_importances_'):
+            return self.model.feature_importances_
+        # Features are standardized, so first layer weight magnitudes are comparable
+        weights = np.abs(self.model.coefs_[0]).sum(axis=1)
+        return weights / weights.sum() if weights.sum() > 0 else weights
+    
+    def fold_scaler(self, X: "pd.DataFrame") -> Dict[str, Any]:
+        """
+        Fold the scaler into the tree thresholds, so predictions skip scaling.
+        
+        Trees only compare features against thresholds, so rewriting the thresholds in
+        unscaled units (see FlatTreeEnsemble.fold_scaler) gives the same predictions
+        without transforming every request. The folded model is checked against the
+        scaled path on X and only replaces the model if every prediction matches.
+        The scaler itself is kept for the neighbor index and what-if scenarios.
+        
+        The folded ensemble walks its trees in numpy, which beats scikit-learn's
+        per-call overhead for a few rows but not its compiled traversal for many, so a
+        scikit-learn estimator is kept as scaled_model to score batches larger than
+        FOLDED_MAX_BATCH_ROWS.
+        
+        Args:
+            X: Unscaled features to check the folded model on, e.g. the whole dataset
+            
+        Returns:
+            Whether the scaler was folded in, the rows checked, the rows whose
+            prediction differed and the largest difference in model output
+        """
+        from app.models.tree_ensemble import FlatTreeEnsemble
+        import time
+        
+        if self.scaler is None or not hasattr(self.scaler, 'scale_'):
+            raise ValueError("The model has no fitted scaler to fold")
+        
+        start_time = time.time()
+        ensemble = self._tree_ensemble()
+        folded = ensemble.fold_scaler(self.scaler.mean_, self.scaler.scale_)
+        
+        X_raw = X[self.feature_names].to_numpy(dtype=np.float64)
+        X_scaled = self.scaler.transform(X[self.feature_names])
+        if self.TASK == 'classification':
+            expected, actual = self.model.predict_proba(X_scaled), folded.predict_proba(X_raw)
+            mismatches = int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+        else:
+            expected, actual = self.model.predict(X_scaled), folded.predict(X_raw)
+            mismatches = 0
+        max_difference = float(np.abs(expected - actual).max()) if len(X_raw) else 0.0
+        
+        # Summation order can differ from scikit-learn's by a few ulps, nothing more
+        applied = mismatches == 0 and max_difference <= 1e-9
+        report = {
+            'applied': applied,
+            'rows_checked': len(X_raw),
+            'mismatches': mismatches,
+            'max_difference': max_difference,
+            'folding_time': time.time() - start_time
+        }
+        if applied:
+            # A compacted ensemble is no faster than the folded one, so only keep scikit-learn's
+            if not isinstance(self.model, FlatTreeEnsemble):
+                self.scaled_model = self.model
+            self.model = folded
+            logger.info(f"Folded the scaler into the {self.MODEL_TYPE} model's split thresholds")
+        else:
+            logger.warning(
+                f"Not folding the scaler into the {self.MODEL_TYPE} model: {mismatches} of "
+                f"{len(X_raw)} predictions differ, max difference {max_difference:.3g}"
+            )
+        return report
+    
+    @property
+    def raw_features(self) -> bool:
+        """Whether the model takes unscaled features, having the scaler folded in."""
+        return getattr(self.model, 'raw_features', False)
+    
+    def _prepare_features(self, data: Union["pd.DataFrame", Dict, List[Dict]]) -> Union["pd.DataFrame", np.ndarray]:
+        """Select and scale the model features from the input data."""
+        import pandas as pd
+        
         if not self.model:
             raise ValueError("Model not loaded. Train or load a model first.")
         
-        # Convert dict to DataFrame if necessary
+        # Models with the scaler folded in take the raw values, so skip the DataFrame
+        if self.raw_features:
+            return self._raw_feature_matrix(data)
+        
+        # Convert dict or list of dicts to DataFrame if necessary
         if isinstance(data, dict):
             data = pd.DataFrame([data])
+        elif isinstance(data, list):
+            data = pd.DataFrame(data)
         
         # Ensure data has the expected features
         if not all(feature in data.columns for feature in self.feature_names):
@@ -80,33 +669,263 @@ class BasePredictionModel:
         if self.scaler:
             X = pd.DataFrame(self.scaler.transform(X), columns=self.feature_names)
         
-        # Get prediction and probabilities
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
-        confidence = max(probabilities)
-        
-        result = {
-            'predicted_species': prediction,
-            'confidence': float(confidence),
-            'probabilities': {
-                class_name: float(prob) 
-                for class_name, prob in zip(self.model.classes_, probabilities)
-            }
+        return X
+    
+    def _raw_feature_matrix(self, data: Union["pd.DataFrame", Dict, List[Dict]]) -> np.ndarray:
+        """Select the model features as a float64 matrix, without scaling."""
+        if isinstance(data, dict):
+            data = [data]
+        if isinstance(data, list):
+            try:
+                return np.array([[row[f] for f in self.feature_names] for row in data], dtype=np.float64)
+            except KeyError:
+                missing = sorted({f for row in data for f in self.feature_names if f not in row})
+                raise ValueError(f"Input data missing required features: {missing}")
+        
+        missing = [f for f in self.feature_names if f not in data.columns]
+        if missing:
+            raise ValueError(f"Input data missing required features: {missing}")
+        return data[self.feature_names].to_numpy(dtype=np.float64)
+    
+    def _batch_model(self, X: Union["pd.DataFrame", np.ndarray]) -> Tuple[Any, Union["pd.DataFrame", np.ndarray]]:
+        """Pick the model that scores the prepared rows fastest, with the features it takes."""
+        import pandas as pd
+        
+        if self.scaled_model is None or not self.raw_features or len(X) <= settings.FOLDED_MAX_BATCH_ROWS:
+            return self.model, X
+        return self.scaled_model, self.scaler.transform(pd.DataFrame(X, columns=self.feature_names))
+    
+    def predict_array(self, data: Union["pd.DataFrame", List[Dict]]) -> np.ndarray:
+        """
+        Score many rows with a single model call and return the model output as an array.
+        
+        Returns:
+            Class probabilities, shape (n_rows, n_classes), ordered as `classes`, for
+            classifiers; predicted values, shape (n_rows,), for regressors
+        """
+        model, X = self._batch_model(self._prepare_features(data))
+        if self.TASK == 'classification':
+            return model.predict_proba(X)
+        return np.asarray(model.predict(X), dtype=np.float64)
+    
+    def predict_labels(self, data: Union["pd.DataFrame", List[Dict]]) -> Tuple[np.ndarray, Optional[Dict[str, Any]]]:
+        """
+        Predict only the most probable class of many rows, without probabilities.
+        
+        Gradient boosting models served as a FlatTreeEnsemble, e.g. with the scaler
+        folded in, stop evaluating each row once the remaining stages can no longer
+        change its class (FlatTreeEnsemble.predict_early_exit), which gives the same
+        classes as predict_batch with fewer tree visits. The checks between stages only pay for
+        themselves from EARLY_EXIT_MIN_BATCH_ROWS rows, and scikit-learn's compiled
+        predict beats both numpy traversals once the batch goes to scaled_model, so
+        other batches and models are evaluated in full by the model that scores them
+        fastest.
+        
+        Returns:
+            The predicted classes, and for gradient boosting models the number of
+            stages per row (n_stages) and the mean, smallest and largest number of
+            stages evaluated for the rows; None for other models
+        """
+        if self.TASK != 'classification':
+            raise ValueError("Labels are only predicted by classification models")
+        from app.models.tree_ensemble import FlatTreeEnsemble
+        
+        X = self._prepare_features(data)
+        if isinstance(self.model, FlatTreeEnsemble):
+            boosting = self.model.kind == "boosting"
+        else:
+            boosting = type(self.model).__name__ == "GradientBoostingClassifier"
+        if not boosting:
+            return np.asarray(self.model.predict(X)), None
+        
+        model, X = self._batch_model(X)
+        if isinstance(model, FlatTreeEnsemble) and len(X) >= settings.EARLY_EXIT_MIN_BATCH_ROWS:
+            labels, stages = model.predict_early_exit(X, settings.EARLY_EXIT_BLOCK_STAGES)
+            n_stages = model.n_stages
+        else:
+            labels = np.asarray(model.predict(X))
+            n_stages = model.n_stages if isinstance(model, FlatTreeEnsemble) else model.n_estimators_
+            stages = np.full(len(X), n_stages)
+        return labels, {
+            'n_stages': n_stages,
+            'mean_stages': float(stages.mean()),
+            'min_stages': int(stages.min()),
+            'max_stages': int(stages.max())
         }
+    
+    @property
+    def classes(self) -> List[str]:
+        """Class labels of a classifier, in the column order of predict_array."""
+        return list(self.model.classes_)
+    
+    def predict_batch(self, data: Union["pd.DataFrame", List[Dict]]) -> List[Dict]:
+        """Make predictions for many rows with a single model call."""
+        # Predictions are the most probable classes, so one predict_proba call covers both
+        probabilities = self.predict_array(data)
+        classes = self.model.classes_
+        best = probabilities.argmax(axis=1)
+        
+        return [
+            {
+                'predicted_species': classes[index],
+                'confidence': float(row[index]),
+                'probabilities': {
+                    class_name: float(prob)
+                    for class_name, prob in zip(classes, row)
+                }
+            }
+            for index, row in zip(best, probabilities)
+        ]
+    
+    def predict(self, data: Union["pd.DataFrame", Dict]) -> Dict:
+        """Make a prediction using the trained model."""
+        return self.predict_batch(data)[0]
+    
+    def explain_batch(
+        self,
+        data: Union["pd.DataFrame", List[Dict]],
+        predictions: Optional[List[Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Explain predictions as per-feature contributions from the ensemble's decision paths.
+        
+        For classifiers the predicted class is explained, in probability units for
+        forests and log-odds for boosting; for regressors the predicted value is.
+        
+        Args:
+            data: Input rows
+            predictions: The rows' predict_batch results, computed if not given
+            
+        Returns:
+            One explanation per row: the base value, which with the contributions sums
+            to the model output, and contributions sorted by absolute size
+        """
+        X = np.asarray(self._prepare_features(data))
+        ensemble = self._tree_ensemble()
+        
+        sign = None
+        if self.TASK == 'regression':
+            target = [self.target_name] * len(X)
+            bias, contributions = ensemble.explain(X, np.zeros(len(X), dtype=np.intp))
+            units = 'score'
+        else:
+            predictions = predictions if predictions is not None else self.predict_batch(data)
+            target = [prediction['predicted_species'] for prediction in predictions]
+            class_index = np.searchsorted(ensemble.classes_, target)
+            if ensemble.kind == 'boosting' and len(ensemble.classes_) == 2:
+                # Binary boosting has one raw score for the positive class; flip it for the negative one
+                sign = np.where(class_index == 1, 1.0, -1.0)
+                class_index = np.zeros_like(class_index)
+            bias, contributions = ensemble.explain(X, class_index)
+            units = 'probability' if ensemble.kind == 'forest' else 'log_odds'
+        if sign is not None:
+            bias, contributions = bias * sign, contributions * sign[:, None]
+        
+        explanations = []
+        for row_target, row_bias, row_contributions in zip(target, bias, contributions):
+            order = np.argsort(-np.abs(row_contributions), kind='stable')
+            explanations.append({
+                'target': row_target,
+                'units': units,
+                'base_value': float(row_bias),
+                'contributions': {
+                    self.feature_names[index]: float(row_contributions[index])
+                    for index in order
+                }
+            })
+        return explanations
+    
+    def _tree_ensemble(self):
+        """Get the model as a FlatTreeEnsemble, flattening a scikit-learn ensemble once."""
+        from app.models.tree_ensemble import FlatTreeEnsemble
         
-        return result
+        if not self.model:
+            raise ValueError("Model not loaded. Train or load a model first.")
+        if isinstance(self.model, FlatTreeEnsemble):
+            return self.model
+        if self._explainer is None or self._explainer[0] is not self.model:
+            try:
+                self._explainer = (self.model, FlatTreeEnsemble.from_sklearn(self.model))
+            except ValueError:
+                raise ValueError("Explanations are only available for tree ensemble models")
+        return self._explainer[1]
+    
+    @property
+    def has_explainer(self) -> bool:
+        """Whether the flattened copy used for explanations has been built."""
+        return self._explainer is not None and self._explainer[0] is self.model
+    
+    def memory_footprint(self) -> Dict[str, Any]:
+        """
+        Measure the loaded model's size in memory.
+        
+        Returns:
+            The estimator class, its tree and node counts (or parameter count for
+            neural networks), and the bytes held by the estimator, the scaler, the
+            neighbor index, the anomaly detector, the estimator kept for large batches
+            of folded models and the cached explainer
+        """
+        from app.core.memory import deep_nbytes
+        from app.models.tree_ensemble import FlatTreeEnsemble
+        
+        footprint: Dict[str, Any] = {'estimator': type(self.model).__name__ if self.model is not None else None}
+        if isinstance(self.model, FlatTreeEnsemble):
+            footprint['n_trees'] = self.model.n_trees
+            footprint['n_nodes'] = self.model.n_nodes
+        elif hasattr(self.model, 'estimators_'):
+            trees = [estimator.tree_ for estimator in np.ravel(self.model.estimators_)]
+            footprint['n_trees'] = len(trees)
+            footprint['n_nodes'] = int(sum(tree.node_count for tree in trees))
+        elif hasattr(self.model, 'coefs_'):
+            footprint['n_parameters'] = int(
+                sum(weights.size for weights in self.model.coefs_) + sum(bias.size for bias in self.model.intercepts_)
+            )
+        
+        # Shared objects, such as the explainer holding the model, are counted once
+        seen: set = set()
+        parts = {
+            'model': self.model,
+            'scaler': self.scaler,
+            'neighbor_index': self.neighbor_index,
+            'anomaly_detector': self.anomaly_detector,
+            'scaled_model': self.scaled_model,
+            'explainer': self._explainer[1] if self.has_explainer else None
+        }
+        sizes = {name: deep_nbytes(part, seen) if part is not None else 0 for name, part in parts.items()}
+        sizes['total'] = sum(sizes.values())
+        footprint['bytes'] = sizes
+        return footprint
 
 
 class BasicFishPredictionModel(BasePredictionModel):
     """Model for predicting fish species based on basic water parameters."""
     
+    MODEL_TYPE = 'basic'
+    DEFAULT_DATA_PATH = settings.REAL_FISH_DATASET
+    FEATURE_NAMES = ['ph', 'temperature', 'turbidity']
+    TARGET_NAME = 'fish'
+    ESTIMATOR_PARAMS = {'n_estimators': 100}
+    
     def __init__(self, model_path: Optional[str] = None):
         # Override with basic-specific path
         model_path = model_path or settings.BASIC_MODEL_PATH
         super().__init__(model_path)
     
-    def train(self, data_path: str = None, test_size: float = 0.2, random_state: int = 42) -> Dict:
+    def train(
+        self,
+        data_path: str = None,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict:
         """Train the model using the simplified dataset."""
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        from app.models.neighbors import NeighborIndex
         from sklearn.model_selection import train_test_split
         from sklearn.metrics import accuracy_score, f1_score, classification_report
         import time
@@ -121,8 +940,8 @@ class BasicFishPredictionModel(BasePredictionModel):
         df = df.dropna()
         
         # Define features and target
-        self.feature_names = ['ph', 'temperature', 'turbidity']
-        self.target_name = 'fish'
+        self.feature_names = list(self.FEATURE_NAMES)
+        self.target_name = self.TARGET_NAME
         
         X = df[self.feature_names]
         y = df[self.target_name]
@@ -131,6 +950,10 @@ class BasicFishPredictionModel(BasePredictionModel):
         self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
+        # Index every labelled row for nearest sample lookups
+        self.neighbor_index = NeighborIndex.build(X_scaled, X, y, self.scaler)
+        self.anomaly_detector = self._fit_anomaly_detector(X)
+        
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X_scaled, y, test_size=test_size, random_state=random_state
@@ -138,16 +961,26 @@ class BasicFishPredictionModel(BasePredictionModel):
         
         # Train model
         start_time = time.time()
-        self.model = RandomForestClassifier(n_estimators=100, random_state=random_state)
+        self.model = RandomForestClassifier(**self.ESTIMATOR_PARAMS, random_state=random_state)
+        self.scaled_model = None
         self.model.fit(X_train, y_train)
         training_time = time.time() - start_time
         
+        # Optionally cross validate, for a steadier estimate than the single holdout split
+        cross_validation = self.cross_validate(X, y, cv_folds, random_state) if cv_folds else None
+        
+        # Optionally compact before evaluating, so the metrics describe the saved model
+        compaction = self.compact_model(X_train, X_test, y_test) if compact else None
+        
         # Evaluate model
         y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred, average='weighted')
         report = classification_report(y_test, y_pred, output_dict=True)
         
+        # Fold the scaler into the trees once evaluated, so serving skips scaling
+        scaler_folding = self.fold_scaler(X) if fold_scaler else None
+        
         # Save model info
         self.model_info = {
             'model_type': 'basic',
@@ -157,16 +990,25 @@ class BasicFishPredictionModel(BasePredictionModel):
             'feature_names': self.feature_names,
             'classification_report': report
         }
+        if compaction:
+            self.model_info['compaction'] = compaction
+        if cross_validation:
+            self.model_info['cross_validation'] = cross_validation
+        if scaler_folding:
+            self.model_info['scaler_folding'] = scaler_folding
         
         # Save model
-        self.save_model()
+        self.save_model(activate=activate)
         
         return {
             'model_type': 'basic',
             'accuracy': accuracy,
             'f1_score': f1,
             'training_time': training_time,
-            'model_path': self.model_path
+            'model_path': self.model_path,
+            'compaction': compaction,
+            'cross_validation': cross_validation,
+            'scaler_folding': scaler_folding
         }
     
     def get_parameter_influence(self) -> Dict:
@@ -175,7 +1017,7 @@ class BasicFishPredictionModel(BasePredictionModel):
             raise ValueError("Model not loaded. Train or load a model first.")
         
         # Get feature importances
-        importances = self.model.feature_importances_
+        importances = self._feature_importances()
         feature_importance = {
             feature: float(importance)
             for feature, importance in zip(self.feature_names, importances)
@@ -197,13 +1039,33 @@ class BasicFishPredictionModel(BasePredictionModel):
 class AdvancedFishPredictionModel(BasePredictionModel):
     """Model for predicting fish species based on comprehensive water parameters."""
     
+    MODEL_TYPE = 'advanced'
+    DEFAULT_DATA_PATH = settings.WATER_QUALITY_DATASET
+    COLUMN_MAPPING = WATER_QUALITY_COLUMN_MAPPING
+    FEATURE_NAMES = WATER_QUALITY_FEATURES
+    TARGET_NAME = 'fish'
+    ESTIMATOR_PARAMS = {'n_estimators': 100}
+    
     def __init__(self, model_path: Optional[str] = None):
         # Override with advanced-specific path
         model_path = model_path or settings.ADVANCED_MODEL_PATH
         super().__init__(model_path)
     
-    def train(self, data_path: str = None, test_size: float = 0.2, random_state: int = 42) -> Dict:
+    def train(
+        self,
+        data_path: str = None,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict:
         """Train the model using the comprehensive dataset."""
+        import pandas as pd
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.preprocessing import StandardScaler
+        from app.models.neighbors import NeighborIndex
         from sklearn.model_selection import train_test_split
         from sklearn.metrics import accuracy_score, f1_score, classification_report
         import time
@@ -218,35 +1080,11 @@ class AdvancedFishPredictionModel(BasePredictionModel):
         df = df.dropna()
         
         # Map column names to standardized names
-        column_mapping = {
-            'Temp': 'temperature',
-            'Turbidity (cm)': 'turbidity',
-            'DO(mg/L)': 'dissolved_oxygen',
-            'BOD (mg/L)': 'bod',
-            'CO2': 'co2',
-            'pH`': 'ph',
-            'Alkalinity (mg L-1 )': 'alkalinity',
-            'Hardness (mg L-1 )': 'hardness',
-            'Calcium (mg L-1 )': 'calcium',
-            'Ammonia (mg L-1 )': 'ammonia',
-            'Nitrite (mg L-1 )': 'nitrite',
-            'Phosphorus (mg L-1 )': 'phosphorus',
-            'H2S (mg L-1 )': 'h2s',
-            'Plankton (No. L-1)': 'plankton',
-            'Water Quality': 'water_quality',
-            'fish': 'fish'
-        }
-        
-        # Rename columns
-        df = df.rename(columns=column_mapping)
+        df = df.rename(columns=self.COLUMN_MAPPING)
         
         # Define features and target
-        self.feature_names = [
-            'temperature', 'turbidity', 'dissolved_oxygen', 'bod', 'co2', 
-            'ph', 'alkalinity', 'hardness', 'calcium', 'ammonia', 
-            'nitrite', 'phosphorus', 'h2s', 'plankton'
-        ]
-        self.target_name = 'fish'
+        self.feature_names = list(self.FEATURE_NAMES)
+        self.target_name = self.TARGET_NAME
         
         # Ensure all feature columns exist
         for feature in self.feature_names:
@@ -260,6 +1098,10 @@ class AdvancedFishPredictionModel(BasePredictionModel):
         self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
+        # Index every labelled row for nearest sample lookups
+        self.neighbor_index = NeighborIndex.build(X_scaled, X, y, self.scaler, water_quality=df['water_quality'])
+        self.anomaly_detector = self._fit_anomaly_detector(X)
+        
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X_scaled, y, test_size=test_size, random_state=random_state
@@ -267,16 +1109,26 @@ class AdvancedFishPredictionModel(BasePredictionModel):
         
         # Train model
         start_time = time.time()
-        self.model = GradientBoostingClassifier(n_estimators=100, random_state=random_state)
+        self.model = GradientBoostingClassifier(**self.ESTIMATOR_PARAMS, random_state=random_state)
+        self.scaled_model = None
         self.model.fit(X_train, y_train)
         training_time = time.time() - start_time
         
+        # Optionally cross validate, for a steadier estimate than the single holdout split
+        cross_validation = self.cross_validate(X, y, cv_folds, random_state) if cv_folds else None
+        
+        # Optionally compact before evaluating, so the metrics describe the saved model
+        compaction = self.compact_model(X_train, X_test, y_test) if compact else None
+        
         # Evaluate model
         y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred, average='weighted')
         report = classification_report(y_test, y_pred, output_dict=True)
         
+        # Fold the scaler into the trees once evaluated, so serving skips scaling
+        scaler_folding = self.fold_scaler(X) if fold_scaler else None
+        
         # Save model info
         self.model_info = {
             'model_type': 'advanced',
@@ -286,9 +1138,15 @@ class AdvancedFishPredictionModel(BasePredictionModel):
             'feature_names': self.feature_names,
             'classification_report': report
         }
+        if compaction:
+            self.model_info['compaction'] = compaction
+        if cross_validation:
+            self.model_info['cross_validation'] = cross_validation
+        if scaler_folding:
+            self.model_info['scaler_folding'] = scaler_folding
         
         # Save model
-        self.save_model()
+        self.save_model(activate=activate)
         
         return {
             'model_type': 'advanced',
@@ -296,6 +1154,9 @@ class AdvancedFishPredictionModel(BasePredictionModel):
             'f1_score': f1,
             'training_time': training_time,
             'model_path': self.model_path,
+            'compaction': compaction,
+            'cross_validation': cross_validation,
+            'scaler_folding': scaler_folding,
             'accuracy': None,  
             'f1_score': None
         }
@@ -306,7 +1167,7 @@ class AdvancedFishPredictionModel(BasePredictionModel):
             raise ValueError("Model not loaded. Train or load a model first.")
         
         # Get feature importances
-        importances = self.model.feature_importances_
+        importances = self._feature_importances()
         feature_importance = {
             feature: float(importance)
             for feature, importance in zip(self.feature_names, importances)
@@ -339,11 +1200,31 @@ class AdvancedFishPredictionModel(BasePredictionModel):
 class WaterQualityModel(BasePredictionModel):
     """Model for predicting water quality score based on water parameters."""
     
+    MODEL_TYPE = 'water_quality'
+    TASK = 'regression'
+    DEFAULT_DATA_PATH = settings.WATER_QUALITY_DATASET
+    COLUMN_MAPPING = WATER_QUALITY_COLUMN_MAPPING
+    FEATURE_NAMES = WATER_QUALITY_FEATURES
+    TARGET_NAME = 'water_quality'
+    ESTIMATOR_PARAMS = {'n_estimators': 100}
+    
     def __init__(self, model_path: Optional[str] = None):
         super().__init__(model_path or settings.WATER_QUALITY_MODEL_PATH)
     
-    def train(self, data_path: str = None, test_size: float = 0.2, random_state: int = 42) -> Dict:
+    def train(
+        self,
+        data_path: str = None,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict:
         """Train the model to predict water quality score."""
+        import pandas as pd
+        from sklearn.ensemble import GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
         from sklearn.model_selection import train_test_split
         from sklearn.metrics import mean_squared_error, r2_score
         import time
@@ -358,34 +1239,11 @@ class WaterQualityModel(BasePredictionModel):
         df = df.dropna()
         
         # Map column names to standardized names
-        column_mapping = {
-            'Temp': 'temperature',
-            'Turbidity (cm)': 'turbidity',
-            'DO(mg/L)': 'dissolved_oxygen',
-            'BOD (mg/L)': 'bod',
-            'CO2': 'co2',
-            'pH`': 'ph',
-            'Alkalinity (mg L-1 )': 'alkalinity',
-            'Hardness (mg L-1 )': 'hardness',
-            'Calcium (mg L-1 )': 'calcium',
-            'Ammonia (mg L-1 )': 'ammonia',
-            'Nitrite (mg L-1 )': 'nitrite',
-            'Phosphorus (mg L-1 )': 'phosphorus',
-            'H2S (mg L-1 )': 'h2s',
-            'Plankton (No. L-1)': 'plankton',
-            'Water Quality': 'water_quality'
-        }
-        
-        # Rename columns
-        df = df.rename(columns=column_mapping)
+        df = df.rename(columns=self.COLUMN_MAPPING)
         
         # Define features and target
-        self.feature_names = [
-            'temperature', 'turbidity', 'dissolved_oxygen', 'bod', 'co2', 
-            'ph', 'alkalinity', 'hardness', 'calcium', 'ammonia', 
-            'nitrite', 'phosphorus', 'h2s', 'plankton'
-        ]
-        self.target_name = 'water_quality'
+        self.feature_names = list(self.FEATURE_NAMES)
+        self.target_name = self.TARGET_NAME
         
         # Ensure all feature columns exist
         for feature in self.feature_names:
@@ -409,16 +1267,25 @@ class WaterQualityModel(BasePredictionModel):
         
         # Train model
         start_time = time.time()
-        from sklearn.ensemble import GradientBoostingRegressor
-        self.model = GradientBoostingRegressor(n_estimators=100, random_state=random_state)
+        self.model = GradientBoostingRegressor(**self.ESTIMATOR_PARAMS, random_state=random_state)
+        self.scaled_model = None
         self.model.fit(X_train, y_train)
         training_time = time.time() - start_time
         
+        # Optionally cross validate, for a steadier estimate than the single holdout split
+        cross_validation = self.cross_validate(X, y, cv_folds, random_state) if cv_folds else None
+        
+        # Optionally compact before evaluating, so the metrics describe the saved model
+        compaction = self.compact_model(X_train, X_test, y_test) if compact else None
+        
         # Evaluate model
         y_pred = self.model.predict(X_test)
         mse = mean_squared_error(y_test, y_pred)
         r2 = r2_score(y_test, y_pred)
         
+        # Fold the scaler into the trees once evaluated, so serving skips scaling
+        scaler_folding = self.fold_scaler(X) if fold_scaler else None
+        
         # Save model info
         self.model_info = {
             'model_type': 'water_quality',
@@ -427,40 +1294,31 @@ class WaterQualityModel(BasePredictionModel):
             'training_time': training_time,
             'feature_names': self.feature_names
         }
+        if compaction:
+            self.model_info['compaction'] = compaction
+        if cross_validation:
+            self.model_info['cross_validation'] = cross_validation
+        if scaler_folding:
+            self.model_info['scaler_folding'] = scaler_folding
         
         # Save model
-        self.save_model()
+        self.save_model(activate=activate)
         
         return {
             'model_type': 'water_quality',
             'mse': mse,
             'r2_score': r2,
             'training_time': training_time,
-            'model_path': self.model_path
+            'model_path': self.model_path,
+            'compaction': compaction,
+            'cross_validation': cross_validation,
+            'scaler_folding': scaler_folding
         }
     
-    def predict(self, data: Union[pd.DataFrame, Dict]) -> float:
+    def predict_batch(self, data: Union["pd.DataFrame", List[Dict]]) -> List[float]:
+        """Predict water quality scores for many rows with a single model call."""
+        return self.predict_array(data).tolist()
+    
+    def predict(self, data: Union["pd.DataFrame", Dict]) -> float:
         """Predict water quality score."""
-        if not self.model:
-            raise ValueError("Model not loaded. Train or load a model first.")
-        
-        # Convert dict to DataFrame if necessary
-        if isinstance(data, dict):
-            data = pd.DataFrame([data])
-        
-        # Ensure data has the expected features
-        if not all(feature in data.columns for feature in self.feature_names):
-            missing = [f for f in self.feature_names if f not in data.columns]
-            raise ValueError(f"Input data missing required features: {missing}")
-        
-        # Select only the features used by the model
-        X = data[self.feature_names].copy()
-        
-        # Scale if scaler exists
-        if self.scaler:
-            X = pd.DataFrame(self.scaler.transform(X), columns=self.feature_names)
-        
-        # Get prediction
-        prediction = float(self.model.predict(X)[0])
-        
-        return prediction
\ No newline at end of file
+        return self.predict_batch(data)[0]
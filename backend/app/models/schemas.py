@@ -1,5 +1,9 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Literal, Union
+
+
+# How suitable species are returned: full catalog entries or names only
+SpeciesFormat = Literal["full", "ref"]
 
 
 class BasicFishPredictionRequest(BaseModel):
@@ -97,6 +101,37 @@ class WaterQualityRequest(BaseModel):
     )
 
 
+class SiteReadingHistory(BaseModel):
+    """Schema for the recent readings of one site."""
+    site_id: str = Field(..., description="Site the readings were taken at")
+    readings: List[WaterQualityRequest] = Field(..., min_length=1, description="Evenly spaced readings, oldest first")
+
+
+class WaterQualityForecastRequest(BaseModel):
+    """Schema for a multi-step water quality forecast of many sites."""
+    sites: List[SiteReadingHistory] = Field(..., min_length=1, description="Reading history of each site")
+    horizon: int = Field(6, ge=1, description="Number of future intervals to forecast")
+    window: Optional[int] = Field(None, ge=2, description="Most recent readings used for each trend (defaults to FORECAST_WINDOW)")
+    include_features: bool = Field(False, description="Also return the forecast parameter values")
+
+
+class SiteForecast(BaseModel):
+    """Schema for the forecast of one site."""
+    site_id: str
+    # Score of the site's latest reading
+    current_score: float
+    # Forecast score of each future interval
+    scores: List[float]
+    features: Optional[List[Dict[str, float]]] = None
+
+
+class WaterQualityForecastResponse(BaseModel):
+    """Schema for a multi-step water quality forecast."""
+    horizon: int
+    window: int
+    forecasts: List[SiteForecast]
+
+
 class FishSpeciesInfo(BaseModel):
     """Information about a fish species."""
     name: str
@@ -112,8 +147,13 @@ class PredictionResponse(BaseModel):
     predicted_species: str
     confidence: float
     water_quality_score: Optional[float] = None
-    suitable_species: Optional[List[FishSpeciesInfo]] = None
+    # Full species entries, or species names when requested with species_format=ref
+    suitable_species: Optional[List[Union[FishSpeciesInfo, str]]] = None
     parameter_analysis: Optional[Dict[str, Any]] = None
+    # Per-feature contributions, keyed by "species" and "water_quality", when requested with explain=true
+    explanation: Optional[Dict[str, Any]] = None
+    # Out-of-distribution check of the input: is_anomaly, score (above 1 is unusual) and flagged features
+    anomaly: Optional[Dict[str, Any]] = None
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -153,18 +193,210 @@ class PredictionResponse(BaseModel):
     )
 
 
+class BasicFishBatchPredictionRequest(BaseModel):
+    """Schema for a batch of basic fish prediction requests."""
+    readings: List[BasicFishPredictionRequest] = Field(..., min_length=1, description="Water readings to score")
+
+
+class AdvancedFishBatchPredictionRequest(BaseModel):
+    """Schema for a batch of advanced fish prediction requests."""
+    readings: List[AdvancedFishPredictionRequest] = Field(..., min_length=1, description="Water readings to score")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Schema for batch prediction response."""
+    count: int
+    predictions: List[PredictionResponse]
+
+
+class BasicFishColumnarRequest(BaseModel):
+    """Schema for a columnar batch of basic readings, one array per parameter."""
+    ph: List[float] = Field(..., description="Water pH level of each reading")
+    temperature: List[float] = Field(..., description="Water temperature in Celsius of each reading")
+    turbidity: List[float] = Field(..., description="Water turbidity in cm of each reading")
+    site_ids: Optional[List[str]] = Field(None, description="Site of each reading, echoed in the response")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "ph": [7.2, 6.8],
+                "temperature": [28.5, 24.0],
+                "turbidity": [4.2, 6.1],
+                "site_ids": ["pond-1", "pond-2"]
+            }
+        }
+    )
+
+
+class AdvancedFishColumnarRequest(BaseModel):
+    """Schema for a columnar batch of comprehensive readings, one array per parameter."""
+    temperature: List[float] = Field(..., description="Water temperature in Celsius of each reading")
+    turbidity: List[float] = Field(..., description="Water turbidity in cm of each reading")
+    dissolved_oxygen: List[float] = Field(..., alias="DO", description="Dissolved oxygen in mg/L of each reading")
+    bod: List[float] = Field(..., description="Biological oxygen demand in mg/L of each reading")
+    co2: List[float] = Field(..., description="Carbon dioxide in mg/L of each reading")
+    ph: List[float] = Field(..., description="Water pH level of each reading")
+    alkalinity: List[float] = Field(..., description="Alkalinity in mg/L of each reading")
+    hardness: List[float] = Field(..., description="Hardness in mg/L of each reading")
+    calcium: List[float] = Field(..., description="Calcium in mg/L of each reading")
+    ammonia: List[float] = Field(..., description="Ammonia in mg/L of each reading")
+    nitrite: List[float] = Field(..., description="Nitrite in mg/L of each reading")
+    phosphorus: List[float] = Field(..., description="Phosphorus in mg/L of each reading")
+    h2s: List[float] = Field(..., description="Hydrogen sulfide in mg/L of each reading")
+    plankton: List[float] = Field(..., description="Plankton count in No. L-1 of each reading")
+    site_ids: Optional[List[str]] = Field(None, description="Site of each reading, echoed in the response")
+
+
+class ColumnarAnomalies(BaseModel):
+    """Schema for the anomaly flags of a columnar batch."""
+    is_anomaly: List[bool]
+    score: List[float]
+
+
+class EarlyExitStats(BaseModel):
+    """Schema for the boosting stages evaluated by a labels-only columnar batch."""
+    n_stages: int
+    mean_stages: float
+    min_stages: int
+    max_stages: int
+
+
+class ColumnarPredictionResponse(BaseModel):
+    """Schema for columnar batch prediction response, one array per output."""
+    count: int
+    site_ids: Optional[List[str]] = None
+    classes: List[str]
+    predicted_species: List[str]
+    # Confidence and probabilities are left out of labels-only batches
+    confidence: Optional[List[float]] = None
+    # Probability of each class, keyed by class name
+    probabilities: Optional[Dict[str, List[float]]] = None
+    water_quality_score: Optional[List[float]] = None
+    anomaly: Optional[ColumnarAnomalies] = None
+    early_exit: Optional[EarlyExitStats] = None
+
+
+class SweepSpec(BaseModel):
+    """Schema for one swept parameter of a sensitivity sweep."""
+    parameter: str = Field(..., description="Model feature to vary, e.g. ph or dissolved_oxygen")
+    start: float = Field(..., description="First value of the parameter")
+    stop: float = Field(..., description="Last value of the parameter")
+    steps: int = Field(20, ge=2, le=500, description="Number of evenly spaced values from start to stop")
+
+
+class SensitivitySweepRequest(BaseModel):
+    """Schema for a what-if sweep of one or two parameters around a base reading."""
+    model_type: Literal["basic", "advanced"] = Field("advanced", description="Species model to evaluate")
+    base: Dict[str, float] = Field(..., description="Base reading with every parameter the model type needs")
+    sweeps: List[SweepSpec] = Field(..., min_length=1, max_length=2, description="One or two parameters to vary")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "model_type": "basic",
+                "base": {"ph": 7.2, "temperature": 28.5, "turbidity": 45.2},
+                "sweeps": [
+                    {"parameter": "ph", "start": 6.0, "stop": 9.0, "steps": 31},
+                    {"parameter": "temperature", "start": 15.0, "stop": 35.0, "steps": 21}
+                ]
+            }
+        }
+    )
+
+
+class SensitivitySweepResponse(BaseModel):
+    """Schema for sensitivity sweep results as dense arrays over the sweep grid."""
+    model_type: str
+    parameters: List[str]
+    # Values of each swept parameter; grids are indexed [i] or [i][j] in this order
+    axes: List[List[float]]
+    shape: List[int]
+    classes: List[str]
+    # Species probabilities, with the class index last
+    probabilities: List[Any]
+    predicted_species: List[Any]
+    # Null when the water quality model is not trained
+    water_quality_score: Optional[List[Any]] = None
+
+
+class RecommendationRequest(BaseModel):
+    """Schema for a search for the smallest parameter changes that reach a goal."""
+    model_type: Literal["basic", "advanced"] = Field("advanced", description="Species model to evaluate")
+    reading: Dict[str, float] = Field(..., description="Current reading with every parameter the model type needs")
+    target_species: Optional[str] = Field(None, description="Species the adjusted reading should be predicted as")
+    min_water_quality: Optional[float] = Field(None, description="Lowest acceptable water quality score")
+    adjustable: Optional[List[str]] = Field(None, description="Parameters that may be changed (defaults to the controllable ones)")
+    time_budget_ms: Optional[int] = Field(None, gt=0, le=10000, description="Search time budget (defaults to RECOMMEND_TIME_BUDGET_MS, capped at RECOMMEND_MAX_TIME_BUDGET_MS)")
+    random_state: Optional[int] = Field(None, description="Random seed for a reproducible search")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "model_type": "basic",
+                "reading": {"ph": 7.2, "temperature": 28.5, "turbidity": 45.2},
+                "target_species": "tilapia",
+                "time_budget_ms": 200
+            }
+        }
+    )
+
+
+class RecommendationResponse(BaseModel):
+    """Schema for the result of a recommendation search."""
+    found: bool
+    # Per parameter: current value, recommended value and the change
+    changes: Dict[str, Dict[str, float]]
+    # Sum of the absolute changes in units of each parameter's standard deviation
+    distance: Optional[float] = None
+    predicted_species: Optional[str] = None
+    confidence: Optional[float] = None
+    water_quality_score: Optional[float] = None
+    evaluations: int
+    iterations: int
+    # Budget the search ran with, after the server-side cap
+    time_budget_ms: int
+    elapsed_ms: float
+
+
+class HistoricalSample(BaseModel):
+    """Schema for a labelled row of a training dataset."""
+    # Euclidean distance in standardized units
+    distance: float
+    # Row label in the dataset, counting data rows from 0
+    row: int
+    species: str
+    # Null for the basic dataset, which has no water quality column
+    water_quality: Optional[float] = None
+    features: Dict[str, float]
+
+
+class NearestSamplesResponse(BaseModel):
+    """Schema for nearest historical samples response."""
+    model_type: str
+    k: int
+    samples: List[HistoricalSample]
+
+
 class TrainingRequest(BaseModel):
     """Schema for model training request."""
     model_type: str = Field(..., description="Type of model to train (basic/advanced/water_quality)")
     test_size: float = Field(0.2, description="Proportion of data to use for testing")
     random_state: int = Field(42, description="Random seed for reproducibility")
+    compact: bool = Field(False, description="Prune the trained ensemble and store it in float32 to reduce memory")
+    streaming: bool = Field(False, description="Train an incremental model over the dataset in chunks instead of loading it whole")
+    chunk_size: Optional[int] = Field(None, gt=0, description="Rows per chunk when streaming (defaults to STREAMING_CHUNK_SIZE)")
+    activate: bool = Field(True, description="Serve the trained model immediately; otherwise only save it as a new version")
+    cv_folds: Optional[int] = Field(None, ge=2, le=20, description="Also report k-fold cross validation metrics, fitting the folds in parallel")
+    fold_scaler: bool = Field(True, description="Fold feature scaling into the tree thresholds so predictions skip the scaler")
+    force: bool = Field(False, description="Retrain even if an identical run's saved version can be reused")
     
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
                 "model_type": "advanced",
                 "test_size": 0.2,
-                "random_state": 42
+                "random_state": 42,
+                "compact": False
             }
         }
     )
@@ -223,6 +455,20 @@ class TrainingResponse(BaseModel):
     # Optional fields for regression models
     mse: Optional[float] = None
     r2_score: Optional[float] = None
+    # Before/after report when trained with compact=True
+    compaction: Optional[Dict[str, Any]] = None
+    # Chunking and peak memory report when trained with streaming=True
+    streaming: Optional[Dict[str, Any]] = None
+    # Per-metric mean, std and fold values and fold fit times when trained with cv_folds
+    cross_validation: Optional[Dict[str, Any]] = None
+    # Equivalence check of the folded model against the scaled one when trained with fold_scaler
+    scaler_folding: Optional[Dict[str, Any]] = None
+    # Saved version of the trained model and whether it is now being served
+    version: Optional[str] = None
+    activated: Optional[bool] = None
+    # Hash of the dataset, hyperparameters and options, and whether an earlier identical run was reused
+    training_key: Optional[str] = None
+    cached: Optional[bool] = None
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -237,6 +483,26 @@ class TrainingResponse(BaseModel):
     )
 
 
+class RollbackRequest(BaseModel):
+    """Schema for activating a saved model version."""
+    version: str = Field(..., description="Saved version to activate, as listed by /models/{model_type}/versions")
+
+
+class ShadowRequest(BaseModel):
+    """Schema for shadow scoring a saved model version."""
+    version: str = Field(..., description="Saved version to score alongside the live model")
+    sample_rate: float = Field(0.1, gt=0.0, le=1.0, description="Fraction of requests to score with the candidate")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "version": "20240101T120000000000Z",
+                "sample_rate": 0.1
+            }
+        }
+    )
+
+
 class ParameterInfluenceResponse(BaseModel):
     """Schema for parameter influence response."""
     parameter_importance: Dict[str, float]
@@ -259,4 +525,12 @@ class ParameterInfluenceResponse(BaseModel):
                 }
             }
         }
-    )
\ No newline at end of file
+    )
+
+
+class AllocationProfileRequest(BaseModel):
+    """Schema for profiling the memory allocated by predictions."""
+    model_type: Literal["basic", "advanced", "water_quality"] = Field("advanced", description="Model to profile")
+    predictions: int = Field(100, ge=1, le=10000, description="Number of traced prediction calls")
+    batch_size: int = Field(1, ge=1, le=10000, description="Readings per prediction call")
+    top: int = Field(10, ge=1, le=100, description="Number of allocation sites to report")
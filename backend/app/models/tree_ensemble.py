@@ -0,0 +1,615 @@
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+# Leaf values gathered at once by raw_predict; rows are scored in chunks of about this many
+CHUNK_ELEMENTS = 1 << 18
+
+
+class FlatTreeEnsemble:
+    """
+    A fitted scikit-learn tree ensemble flattened into contiguous numpy arrays.
+
+    All trees share one set of node arrays; tree t owns the nodes from
+    node_offsets[t] to node_offsets[t + 1]. Leaves point to themselves as both
+    children, so every row can walk every tree in lockstep for max_depth steps.
+
+    Supports RandomForestClassifier ("forest": leaf values are class probabilities
+    averaged over trees) and GradientBoostingClassifier/Regressor ("boosting": leaf
+    values already scaled by the learning rate are summed onto an initial raw score).
+    It exposes predict, predict_proba, classes_ and feature_importances_ so it can
+    stand in for the original estimator. Boosting classifiers can also predict with
+    early exit (predict_early_exit), skipping the stages that cannot change a row's class.
+
+    Ensembles fitted on standardized features compare float32 inputs, as scikit-learn
+    trees do. After fold_scaler they take unscaled features and compare in float64
+    (raw_features is True).
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        left: np.ndarray,
+        right: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        value: np.ndarray,
+        node_offsets: np.ndarray,
+        n_features: int,
+        classes: Optional[np.ndarray] = None,
+        tree_output: Optional[np.ndarray] = None,
+        init_raw: Optional[np.ndarray] = None,
+        node_samples: Optional[np.ndarray] = None,
+        feature_importances: Optional[np.ndarray] = None,
+        raw_features: bool = False
+    ):
+        self.kind = kind
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.node_offsets = node_offsets
+        self.n_features = n_features
+        self.classes_ = classes
+        self.tree_output = tree_output
+        self.init_raw = init_raw
+        self.node_samples = node_samples
+        self.feature_importances_ = feature_importances
+        self.raw_features = raw_features
+        self._build_traversal()
+
+    def __getstate__(self):
+        # The traversal arrays and early exit bounds are derived, so they are rebuilt on load rather than pickled
+        state = self.__dict__.copy()
+        for name in ('_children', '_remaining_low', '_remaining_high', '_rounding_error'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('raw_features', False)
+        self.__dict__.update(state)
+        self._build_traversal()
+
+    @classmethod
+    def from_sklearn(cls, model: Any) -> "FlatTreeEnsemble":
+        """Flatten a fitted random forest classifier or gradient boosting model."""
+        name = type(model).__name__
+        if name == "RandomForestClassifier":
+            kind = "forest"
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            tree_output = None
+        elif name in ("GradientBoostingClassifier", "GradientBoostingRegressor"):
+            kind = "boosting"
+            # Stage-major order: every output's tree for stage 0, then stage 1, ...
+            trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+            tree_output = np.tile(np.arange(model.estimators_.shape[1], dtype=np.int32), model.estimators_.shape[0])
+        else:
+            raise ValueError(f"Unsupported model type for flattening: {name}")
+
+        left, right, feature, threshold, value, samples = [], [], [], [], [], []
+        offsets = [0]
+        for tree in trees:
+            offset = offsets[-1]
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            if kind == "forest":
+                # Normalize so internal nodes hold class distributions whether counts or fractions are stored
+                node_value = tree.value[:, 0, :]
+                value.append(node_value / node_value.sum(axis=1, keepdims=True))
+            else:
+                value.append(tree.value[:, 0, :1] * model.learning_rate)
+            samples.append(tree.weighted_n_node_samples)
+            offsets.append(offset + tree.node_count)
+
+        ensemble = cls(
+            kind=kind,
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int16),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            value=np.concatenate(value).astype(np.float64),
+            node_offsets=np.asarray(offsets, dtype=np.int32),
+            n_features=model.n_features_in_,
+            classes=getattr(model, "classes_", None),
+            tree_output=tree_output,
+            init_raw=None,
+            node_samples=np.concatenate(samples),
+            feature_importances=model.feature_importances_
+        )
+
+        if kind == "boosting":
+            # The initial estimator's raw score is whatever the full model adds on top of the trees
+            X0 = np.zeros((1, model.n_features_in_))
+            full_raw = model.decision_function(X0) if ensemble.classes_ is not None else model.predict(X0)
+            trees_raw = ensemble._raw_from_leaves(ensemble.apply(X0), include_init=False)
+            ensemble.init_raw = (np.reshape(full_raw, (1, -1)) - trees_raw)[0]
+            ensemble._build_remaining_bounds()
+        return ensemble
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.node_offsets) - 1
+
+    @property
+    def n_stages(self) -> int:
+        """Boosting stages (trees per output); a forest's trees each count as one."""
+        if self.kind == "boosting":
+            return self.n_trees // self.n_outputs
+        return self.n_trees
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.left)
+
+    @property
+    def n_outputs(self) -> int:
+        """Columns of raw_predict: classes for a forest, raw scores for boosting."""
+        if self.kind == "boosting":
+            return int(self.tree_output.max()) + 1
+        return self.value.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the node arrays."""
+        arrays = [self.left, self.right, self.feature, self.threshold, self.value, self.node_offsets,
+                  self.tree_output, self.init_raw, self.node_samples]
+        return int(sum(array.nbytes for array in arrays if array is not None))
+
+    def apply(self, X: Any, trees: Optional[np.ndarray] = None) -> np.ndarray:
+        """Get the leaf reached by each row in each tree (or in each of `trees`), shape (n_rows, n_trees)."""
+        X = self._check_input(X)
+        roots = self.node_offsets[:-1] if trees is None else self.node_offsets[trees]
+        nodes = np.repeat(roots[None, :], X.shape[0], axis=0)
+        flat = X.ravel()
+        row_start = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        for _ in range(self.max_depth):
+            go_right = flat[row_start + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self._children[2 * nodes + go_right]
+        return nodes
+
+    def raw_predict(self, X: Any) -> np.ndarray:
+        """
+        Get averaged class probabilities (forest) or raw scores (boosting), shape (n_rows, n_outputs).
+
+        Rows are scored in chunks, so the leaves and leaf values held at once stay
+        around CHUNK_ELEMENTS however large the batch is.
+        """
+        X = self._check_input(X)
+        raw = np.empty((X.shape[0], self.n_outputs))
+        rows = max(1, CHUNK_ELEMENTS // (self.n_trees * self.value.shape[1]))
+        for start in range(0, X.shape[0], rows):
+            raw[start:start + rows] = self._raw_from_leaves(self.apply(X[start:start + rows]))
+        return raw
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Predict class probabilities."""
+        if self.classes_ is None:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self._proba_from_raw(self.raw_predict(X))
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predict classes for classifiers or values for regressors."""
+        if self.classes_ is None:
+            return self.raw_predict(X)[:, 0]
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_early_exit(self, X: Any, block: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict classes of a boosting classifier, stopping each row once its class is settled.
+
+        Stages are evaluated `block` at a time for the rows still undecided. After each
+        block, a row is decided when its leading class stays ahead of every other class
+        even if the remaining stages all add their smallest leaf values to the leader and
+        their largest to the rest (the bounds are precomputed from the leaf values). The
+        lead must also exceed a bound on the rounding error of the sums, so decided rows
+        get exactly the class predict returns. Rows still close after the last stage are
+        rescored with predict itself. The checks between blocks cost more than they save
+        for a handful of rows, so this pays off for batches.
+
+        Returns:
+            The predicted classes and the number of stages evaluated for each row
+        """
+        if self.kind != "boosting" or self.classes_ is None:
+            raise ValueError("Early exit is only available for gradient boosting classifiers")
+        if block < 1:
+            raise ValueError("block must be at least 1")
+        X = self._check_input(X)
+        n_outputs = self.n_outputs
+        n_stages = self.n_stages
+        raw = np.repeat(self.init_raw.astype(np.float64)[None, :], X.shape[0], axis=0)
+        stages = np.full(X.shape[0], n_stages)
+        active = np.arange(X.shape[0])
+        for start in range(0, n_stages, block):
+            stop = min(start + block, n_stages)
+            leaves = self.apply(X[active], np.arange(start * n_outputs, stop * n_outputs))
+            raw[active] += self.value[leaves, 0].reshape(len(active), -1, n_outputs).sum(axis=1)
+            decided = self._decided(raw[active], stop)
+            stages[active[decided]] = stop
+            active = active[~decided]
+            if len(active) == 0:
+                break
+
+        if n_outputs == 1:
+            index = (raw[:, 0] > 0).astype(np.intp)
+        else:
+            index = raw.argmax(axis=1)
+        predictions = self.classes_[index]
+        if len(active):
+            predictions[active] = self.predict(X[active])
+        return predictions, stages
+
+    def explain(self, X: Any, outputs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split each row's raw prediction into a bias plus one contribution per feature.
+
+        Walks every row down every tree in lockstep, crediting the change in node value
+        at each split to the split's feature. Contributions are in the units of
+        raw_predict: class probabilities for forests, raw scores for boosting.
+
+        Args:
+            X: Input rows
+            outputs: Optionally one output (class) index per row to explain, which
+                avoids accumulating contributions for every class
+
+        Returns:
+            The bias and the contributions, which sum over features with the bias to
+            raw_predict(X). Shapes are (n_outputs,) and (n_rows, n_features, n_outputs),
+            or (n_rows,) and (n_rows, n_features) when outputs are given
+        """
+        X = self._check_input(X)
+        n_rows = X.shape[0]
+        n_outputs = self.n_outputs
+        roots = self.node_offsets[:-1]
+        nodes = np.repeat(roots[None, :], n_rows, axis=0)
+        flat = X.ravel()
+        row_start = (np.arange(n_rows) * X.shape[1])[:, None]
+
+        if self.kind == "forest":
+            # Every tree adds to every class, weighted by its share of the average
+            bias = self.value[roots].mean(axis=0)
+            scale = 1.0 / self.n_trees
+        else:
+            # Each tree adds to the single output it was fitted for
+            bias = self.init_raw + np.bincount(self.tree_output, self.value[roots, 0], minlength=n_outputs)
+            scale = 1.0
+
+        if outputs is None:
+            width = n_outputs
+            value = self.value if self.kind == "forest" else None
+        else:
+            outputs = np.asarray(outputs)
+            width = 1
+            bias = bias[outputs]
+            if self.kind == "forest":
+                column = outputs[:, None]
+            else:
+                # Trees are stage-major, so each row only needs to walk its output's trees
+                nodes = roots.reshape(-1, n_outputs).T[outputs]
+
+        size = n_rows * self.n_features * width
+        base = np.arange(n_rows)[:, None] * self.n_features
+        contributions = np.zeros(size)
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            go_right = flat[row_start + feature] > self.threshold[nodes]
+            children = self._children[2 * nodes + go_right]
+            if outputs is not None:
+                if self.kind == "forest":
+                    delta = self.value[children, column] - self.value[nodes, column]
+                else:
+                    delta = self.value[children, 0] - self.value[nodes, 0]
+                index = base + feature
+            elif self.kind == "forest":
+                delta = value[children] - value[nodes]
+                index = ((base + feature) * width)[:, :, None] + np.arange(width)
+            else:
+                delta = self.value[children, 0] - self.value[nodes, 0]
+                index = (base + feature) * width + self.tree_output[None, :]
+            contributions += np.bincount(index.ravel(), delta.ravel(), minlength=size)
+            nodes = children
+
+        contributions *= scale
+        if outputs is not None:
+            return bias, contributions.reshape(n_rows, self.n_features)
+        return bias, contributions.reshape(n_rows, self.n_features, width)
+
+    def prune(self, max_depth: Optional[int] = None, min_samples_leaf: int = 1) -> "FlatTreeEnsemble":
+        """
+        Collapse subtrees into leaves below a depth limit or where a child holds too few samples.
+
+        Collapsed nodes keep the value scikit-learn stored for them, which is the
+        prediction for every training sample that reached them.
+        """
+        if self.node_samples is None:
+            raise ValueError("Pruning needs node sample counts, which compacted ensembles drop")
+
+        keep: List[int] = []
+        new_left: List[int] = []
+        new_right: List[int] = []
+        offsets = [0]
+        for t in range(self.n_trees):
+            mapping = {}
+            order = []
+            stack = [(int(self.node_offsets[t]), 0)]
+            leaves = set()
+            # Depth-first walk assigning new indices in visiting order
+            while stack:
+                node, depth = stack.pop()
+                mapping[node] = offsets[-1] + len(order)
+                order.append(node)
+                left, right = int(self.left[node]), int(self.right[node])
+                if left == node:
+                    continue
+                too_deep = max_depth is not None and depth >= max_depth
+                too_small = min(self.node_samples[left], self.node_samples[right]) < min_samples_leaf
+                if too_deep or too_small:
+                    leaves.add(node)
+                    continue
+                stack.append((right, depth + 1))
+                stack.append((left, depth + 1))
+            for node in order:
+                if node in leaves or int(self.left[node]) == node:
+                    new_left.append(mapping[node])
+                    new_right.append(mapping[node])
+                else:
+                    new_left.append(mapping[int(self.left[node])])
+                    new_right.append(mapping[int(self.right[node])])
+            keep.extend(order)
+            offsets.append(offsets[-1] + len(order))
+
+        keep = np.asarray(keep)
+        left = np.asarray(new_left, dtype=np.int32)
+        is_leaf = left == np.arange(len(left))
+        return self._replace(
+            left=left,
+            right=np.asarray(new_right, dtype=np.int32),
+            feature=np.where(is_leaf, 0, self.feature[keep]).astype(self.feature.dtype),
+            threshold=np.where(is_leaf, 0.0, self.threshold[keep]).astype(self.threshold.dtype),
+            value=self.value[keep],
+            node_offsets=np.asarray(offsets, dtype=np.int32),
+            node_samples=self.node_samples[keep]
+        )
+
+    def select_trees(self, trees: List[int]) -> "FlatTreeEnsemble":
+        """Keep only the given trees of a forest."""
+        if self.kind != "forest":
+            raise ValueError("Only forests can drop trees; boosting stages depend on each other")
+
+        parts = {name: [] for name in ("left", "right", "feature", "threshold", "value", "node_samples")}
+        offsets = [0]
+        for t in trees:
+            start, end = int(self.node_offsets[t]), int(self.node_offsets[t + 1])
+            shift = offsets[-1] - start
+            parts["left"].append(self.left[start:end] + shift)
+            parts["right"].append(self.right[start:end] + shift)
+            for name in ("feature", "threshold", "value", "node_samples"):
+                array = getattr(self, name)
+                if array is not None:
+                    parts[name].append(array[start:end])
+            offsets.append(offsets[-1] + end - start)
+
+        return self._replace(
+            node_offsets=np.asarray(offsets, dtype=np.int32),
+            **{name: np.concatenate(arrays) if arrays else None for name, arrays in parts.items()}
+        )
+
+    def select_by_agreement(self, X: Any, min_agreement: float = 0.99) -> "FlatTreeEnsemble":
+        """
+        Drop the trees that contribute least to a forest's predictions.
+
+        Trees are added greedily, each time picking the one that brings the subset's
+        predictions closest to the full forest's on X, until the subset agrees with
+        the full forest on at least min_agreement of the rows. Only the forest's own
+        predictions are used, so no labelled data is spent on the selection.
+        """
+        if self.kind != "forest":
+            raise ValueError("Only forests can drop trees; boosting stages depend on each other")
+
+        leaf_values = self.value[self.apply(X)]  # (n_rows, n_trees, n_classes)
+        full = leaf_values.mean(axis=1)
+        target = full.argmax(axis=1)
+
+        selected: List[int] = []
+        remaining = list(range(self.n_trees))
+        total = np.zeros_like(full)
+        while remaining:
+            candidates = total[:, None, :] + leaf_values[:, remaining, :]
+            agreement = (candidates.argmax(axis=2) == target[:, None]).mean(axis=0)
+            distance = np.abs(candidates / (len(selected) + 1) - full[:, None, :]).sum(axis=(0, 2))
+            best = int(np.lexsort((distance, -agreement))[0])
+            tree = remaining.pop(best)
+            selected.append(tree)
+            total += leaf_values[:, tree, :]
+            if agreement[best] >= min_agreement:
+                break
+        return self.select_trees(sorted(selected))
+
+    def fold_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "FlatTreeEnsemble":
+        """
+        Rewrite the split thresholds into unscaled feature units, so inputs skip the scaler.
+
+        A StandardScaler followed by the float32 cast of scikit-learn trees maps each
+        feature through f(x) = float32((x - mean) / scale), which never decreases as x
+        grows. A row goes left at a split on threshold t when f(x) <= t, so the new
+        threshold is the largest float64 x with f(x) <= t, found by bisecting over the
+        ordered float64 values. Every float64 input then takes the same path through
+        every tree as it did through the scaler and the original thresholds.
+
+        Args:
+            mean: The scaler's per-feature mean_
+            scale: The scaler's per-feature scale_ (all positive)
+
+        Returns:
+            An ensemble with raw_features set
+        """
+        if self.raw_features:
+            raise ValueError("The scaler is already folded into this ensemble")
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if mean.shape != (self.n_features,) or scale.shape != (self.n_features,) or not (scale > 0).all():
+            raise ValueError("Expected a positive scale and a mean for every feature")
+
+        split = np.flatnonzero(self.left != np.arange(self.n_nodes))
+        target = self.threshold[split].astype(np.float64)
+        split_mean = mean[self.feature[split]]
+        split_scale = scale[self.feature[split]]
+
+        def goes_left(x: np.ndarray) -> np.ndarray:
+            return ((x - split_mean) / split_scale).astype(np.float32) <= target
+
+        # Bracket each boundary around the naive inverse, widening until it is crossed
+        estimate = target * split_scale + split_mean
+        width = split_scale * np.abs(target) * 1e-6 + np.spacing(np.abs(estimate)) * 4
+        low, high = estimate - width, estimate + width
+        for _ in range(64):
+            low_wrong, high_wrong = ~goes_left(low), goes_left(high)
+            if not (low_wrong.any() or high_wrong.any()):
+                break
+            width = width * 2
+            low = np.where(low_wrong, estimate - width, low)
+            high = np.where(high_wrong, estimate + width, high)
+        else:
+            raise ValueError("Could not bracket the unscaled split thresholds")
+
+        # Bisect on the integer keys of the floats: the gap halves each step, so at most 64 steps
+        low_key, high_key = _ordered_key(low), _ordered_key(high)
+        while (high_key - low_key > 1).any():
+            middle_key = low_key + (high_key - low_key) // 2
+            left = goes_left(_from_ordered_key(middle_key))
+            low_key = np.where(left, middle_key, low_key)
+            high_key = np.where(left, high_key, middle_key)
+
+        threshold = self.threshold.astype(np.float64)
+        threshold[split] = _from_ordered_key(low_key)
+        return self._replace(threshold=threshold, raw_features=True)
+
+    def compact(self) -> "FlatTreeEnsemble":
+        """
+        Store thresholds and values in float32 and drop data only needed for pruning.
+
+        Thresholds are rounded down to the nearest float32, so for float32 inputs (what
+        scikit-learn trees compare against) every split goes the same way as before.
+        Ensembles with the scaler folded in compare float64 inputs and keep float64
+        thresholds.
+        """
+        if self.raw_features:
+            return self._replace(value=self.value.astype(np.float32), node_samples=None)
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        return self._replace(threshold=threshold, value=self.value.astype(np.float32), node_samples=None)
+
+    def _check_input(self, X: Any) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float64 if self.raw_features else np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def _raw_from_leaves(self, leaves: np.ndarray, include_init: bool = True) -> np.ndarray:
+        leaf_values = self.value[leaves]  # (n_rows, n_trees, n_outputs)
+        if self.kind == "forest":
+            return leaf_values.mean(axis=1)
+
+        n_outputs = self.n_outputs
+        raw = leaf_values[:, :, 0].reshape(leaves.shape[0], -1, n_outputs).sum(axis=1)
+        if include_init:
+            raw = raw + self.init_raw
+        return raw
+
+    def _proba_from_raw(self, raw: np.ndarray) -> np.ndarray:
+        if self.kind == "forest":
+            return raw
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _decided(self, raw: np.ndarray, stage: int) -> np.ndarray:
+        """Which rows' classes the stages from `stage` on can no longer change."""
+        low, high = self._remaining_low[stage], self._remaining_high[stage]
+        if raw.shape[1] == 1:
+            return (raw[:, 0] + low[0] > self._rounding_error) | (raw[:, 0] + high[0] < -self._rounding_error)
+        rows = np.arange(raw.shape[0])
+        best = raw.argmax(axis=1)
+        worst_best = raw[rows, best] + low[best]
+        best_other = raw + high
+        best_other[rows, best] = -np.inf
+        return worst_best - best_other.max(axis=1) > self._rounding_error
+
+    def _build_traversal(self) -> None:
+        """Interleave the children so each traversal step is a single gather."""
+        self._children = np.stack([self.left, self.right], axis=1).ravel()
+        self.max_depth = self._max_depth()
+        if self.kind == "boosting":
+            self._build_remaining_bounds()
+
+    def _build_remaining_bounds(self) -> None:
+        """
+        Bound what the stages from each stage on can add to each output, for early exit.
+
+        Row s of _remaining_low and _remaining_high sums the smallest and largest leaf
+        value of every tree from stage s on; the last row (after every stage) is zero.
+        """
+        n_outputs = self.n_outputs
+        is_leaf = self.left == np.arange(self.n_nodes)
+        values = self.value[:, 0].astype(np.float64)
+        roots = self.node_offsets[:-1]
+        low = np.minimum.reduceat(np.where(is_leaf, values, np.inf), roots).reshape(-1, n_outputs)
+        high = np.maximum.reduceat(np.where(is_leaf, values, -np.inf), roots).reshape(-1, n_outputs)
+        zero = np.zeros((1, n_outputs))
+        self._remaining_low = np.concatenate([np.cumsum(low[::-1], axis=0)[::-1], zero])
+        self._remaining_high = np.concatenate([np.cumsum(high[::-1], axis=0)[::-1], zero])
+        # Summing the same leaves in another order can differ by at most this much
+        magnitude = np.maximum(np.abs(low), np.abs(high)).sum()
+        if self.init_raw is not None:
+            magnitude += np.abs(self.init_raw).max()
+        self._rounding_error = 4 * len(low) * np.finfo(self.value.dtype).eps * magnitude + 1e-12
+
+    def _max_depth(self) -> int:
+        """Depth of the deepest tree, found by walking all trees level by level."""
+        frontier = self.node_offsets[:-1]
+        depth = 0
+        while True:
+            children = np.concatenate([self.left[frontier], self.right[frontier]])
+            children = children[children != np.concatenate([frontier, frontier])]
+            if len(children) == 0:
+                return depth
+            frontier = children
+            depth += 1
+
+    def _replace(self, **changes: Any) -> "FlatTreeEnsemble":
+        attributes = {
+            'kind': self.kind,
+            'left': self.left,
+            'right': self.right,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'value': self.value,
+            'node_offsets': self.node_offsets,
+            'n_features': self.n_features,
+            'classes': self.classes_,
+            'tree_output': self.tree_output,
+            'init_raw': self.init_raw,
+            'node_samples': self.node_samples,
+            'feature_importances': self.feature_importances_,
+            'raw_features': self.raw_features
+        }
+        attributes.update(changes)
+        return FlatTreeEnsemble(**attributes)
+
+
+def _ordered_key(x: np.ndarray) -> np.ndarray:
+    """Map float64 values to int64 keys that sort in the same order."""
+    bits = x.view(np.int64)
+    return np.where(bits < 0, np.int64(np.iinfo(np.int64).min) - bits, bits)
+
+
+def _from_ordered_key(key: np.ndarray) -> np.ndarray:
+    """Invert _ordered_key."""
+    return np.where(key < 0, np.int64(np.iinfo(np.int64).min) - key, key).view(np.float64)
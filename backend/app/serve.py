@@ -0,0 +1,203 @@
+"""
+Preload-then-fork server for running several workers.
+
+The master process loads the model registry once, then forks workers that inherit
+the loaded models copy-on-write instead of each unpickling its own copy. Run with:
+
+    python -m app.serve --workers 4
+
+Signals handled by the master:
+    SIGHUP   reload the models from disk and restart workers one at a time
+    SIGUSR1  log the memory use of the master and every worker
+    SIGTERM  stop the workers gracefully and exit (also SIGINT)
+
+Workers send SIGHUP to the master after a successful /train, so every worker picks
+up the retrained model.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict
+
+from app.core.memory import children_memory, process_memory
+from app.core.logging import log_synchronously, logger
+from app.core.config import settings
+
+# Signals the master waits for; they stay blocked in the master and are taken with sigwait
+MASTER_SIGNALS = {signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD}
+
+
+class PreforkServer:
+    """Master process that preloads the models and supervises forked uvicorn workers."""
+
+    def __init__(self, host: str, port: int, workers: int, log_level: str = "info"):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.log_level = log_level
+        self.workers: Dict[int, float] = {}
+        self.sock = None
+        self._stopping = False
+
+    def run(self) -> None:
+        """Preload the models, fork the workers and supervise them until stopped."""
+        # Import the app in the master too so workers share it rather than importing it each
+        from app.main import app
+        from app.services.model_registry import model_registry
+
+        # The master forks, so it must not have other threads: it logs synchronously and
+        # loads the models one after another (workers start their own logging thread)
+        log_synchronously()
+        model_registry.startup(parallel=False)
+        self._check_single_threaded()
+        self._freeze()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        logger.info(f"Master {os.getpid()} listening on {self.host}:{self.port} with {self.num_workers} workers")
+
+        # Blocked before the first fork so no signal is lost while the workers start
+        signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+        self.log_memory()
+
+        while not self._stopping:
+            self._dispatch(signal.sigwait(MASTER_SIGNALS))
+
+        self._stop_workers()
+        logger.info("Master stopped")
+
+    def reload(self) -> None:
+        """Reload the models in the master, then replace the workers one at a time."""
+        from app.services.model_registry import model_registry
+
+        logger.info("Reloading models and restarting workers")
+        gc.unfreeze()
+        model_registry.load_all(parallel=False)
+        model_registry.warmup()
+        self._check_single_threaded()
+        self._freeze()
+
+        # Start each replacement before stopping the old worker so capacity never drops
+        for pid in list(self.workers):
+            self._spawn_worker()
+            self._stop_worker(pid)
+        self.log_memory()
+
+    def log_memory(self) -> None:
+        """Log the memory of the master and each worker, including how much is shared."""
+        workers = children_memory(list(self.workers))
+        logger.info(f"Master {os.getpid()} memory: {process_memory()}")
+        for pid, memory in workers.items():
+            logger.info(f"Worker {pid} memory: {memory}")
+        if workers:
+            total_rss = sum(memory.get('rss', 0) for memory in workers.values())
+            total_pss = sum(memory.get('pss', 0) for memory in workers.values())
+            logger.info(f"Workers total RSS={total_rss} bytes, PSS={total_pss} bytes")
+
+    def _check_single_threaded(self) -> None:
+        """Warn when the master has a thread running, which a fork could catch holding a lock."""
+        others = [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()]
+        if others:
+            logger.warning(f"Master has threads running before forking workers: {others}")
+
+    def _freeze(self) -> None:
+        """Move loaded objects out of the garbage collector's reach so workers do not copy their pages."""
+        gc.collect()
+        gc.freeze()
+
+    def _spawn_worker(self) -> int:
+        """Fork a worker that serves the app on the shared socket."""
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker()
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = time.time()
+        logger.info(f"Started worker {pid}")
+        return pid
+
+    def _run_worker(self) -> None:
+        """Serve requests in a forked worker until it is told to stop."""
+        import uvicorn
+        from app.main import app
+        from app.services.model_registry import model_registry
+
+        for sig in MASTER_SIGNALS:
+            signal.signal(sig, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+
+        # Retraining in any worker reloads every worker through the master
+        master_pid = os.getppid()
+        model_registry.add_swap_listener(lambda model_type: os.kill(master_pid, signal.SIGHUP))
+
+        config = uvicorn.Config(app, log_level=self.log_level, access_log=False)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def _stop_worker(self, pid: int) -> None:
+        """Ask a worker to finish its in-flight requests and exit, then reap it."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.workers.pop(pid, None)
+        logger.info(f"Stopped worker {pid}")
+
+    def _stop_workers(self) -> None:
+        """Stop every worker."""
+        for pid in list(self.workers):
+            self._stop_worker(pid)
+
+    def _reap_workers(self) -> None:
+        """Collect exited workers and replace any that died unexpectedly."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.workers.pop(pid, None) is not None and not self._stopping:
+                logger.warning(f"Worker {pid} exited with status {status}, starting a replacement")
+                self._spawn_worker()
+
+    def _dispatch(self, signum: int) -> None:
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self._stopping = True
+        elif signum == signal.SIGHUP:
+            self.reload()
+        elif signum == signal.SIGUSR1:
+            self.log_memory()
+        elif signum == signal.SIGCHLD:
+            self._reap_workers()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the API with preloaded models shared by forked workers")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    PreforkServer(args.host, args.port, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
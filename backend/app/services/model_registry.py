@@ -0,0 +1,260 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Type
+
+from app.models.prediction import (
+    BasePredictionModel,
+    BasicFishPredictionModel,
+    AdvancedFishPredictionModel,
+    WaterQualityModel
+)
+from app.services.shadow import ShadowScorer
+from app.core.logging import logger
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ModelRegistry:
+    """Process-wide holder of the loaded prediction models."""
+
+    MODEL_CLASSES: Dict[str, Type[BasePredictionModel]] = {
+        'basic': BasicFishPredictionModel,
+        'advanced': AdvancedFishPredictionModel,
+        'water_quality': WaterQualityModel
+    }
+
+    def __init__(self):
+        """Initialize an empty registry; models are loaded by startup() or on first use."""
+        self._models: Dict[str, BasePredictionModel] = {}
+        self._lock = threading.Lock()
+        self.state = "starting"
+        self.load_times: Dict[str, float] = {}
+        self.startup_info: Dict[str, Any] = {}
+        self._swap_listeners: List[Callable[[str], None]] = []
+        self._shadows: Dict[str, ShadowScorer] = {}
+        # Memory footprint of each model type's current model, with whether it had built its explainer
+        self._footprints: Dict[str, Tuple[BasePredictionModel, bool, Dict[str, Any]]] = {}
+        # Serializes activations so the file on disk and the served model change together
+        self._activation_lock = threading.Lock()
+
+    def get(self, model_type: str) -> BasePredictionModel:
+        """Get the current model of the given type, loading it if necessary."""
+        model = self._models.get(model_type)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_type)
+                if model is None:
+                    model = self._load(model_type)
+                    self._models[model_type] = model
+        return model
+
+    def swap(self, model_type: str, model: BasePredictionModel) -> None:
+        """Make the given model the current one; requests already holding the old model keep it."""
+        if model_type not in self.MODEL_CLASSES:
+            raise ValueError(f"Unknown model type: {model_type}")
+        with self._lock:
+            self._models[model_type] = model
+        self._measure(model_type, model)
+        logger.info(f"Registry now serving {model_type} model")
+
+        for listener in self._swap_listeners:
+            try:
+                listener(model_type)
+            except Exception as e:
+                logger.error(f"Error notifying model swap listener: {e}")
+
+    def activate(self, model_type: str, model: BasePredictionModel) -> None:
+        """
+        Publish a saved model version as the live model and start serving it.
+        
+        Requests that already took the previous model finish on it; new requests get
+        the activated one.
+        """
+        with self._activation_lock:
+            model.publish()
+            self.swap(model_type, model)
+        logger.info(f"Activated {model_type} model version {model.model_info.get('version')}")
+
+    def rollback(self, model_type: str, version: str) -> BasePredictionModel:
+        """Activate a previously saved version of a model."""
+        model = self._model_class(model_type)()
+        model.load_version(version)
+        self.activate(model_type, model)
+        return model
+
+    def versions(self, model_type: str) -> List[Dict[str, Any]]:
+        """List the saved versions of a model type, newest first."""
+        return self.get(model_type).list_versions()
+
+    def set_shadow(self, model_type: str, version: str, sample_rate: float) -> Dict[str, Any]:
+        """Start scoring a sampled fraction of traffic with a saved version alongside the live model."""
+        candidate = self._model_class(model_type)()
+        candidate.load_version(version)
+        shadow = ShadowScorer(model_type, candidate, sample_rate)
+        self._shadows[model_type] = shadow
+        logger.info(f"Shadow scoring {model_type} model version {version} on {sample_rate:.0%} of requests")
+        return shadow.report()
+
+    def clear_shadow(self, model_type: str) -> Optional[Dict[str, Any]]:
+        """Stop shadow scoring a model type, returning its final report."""
+        shadow = self._shadows.pop(model_type, None)
+        return shadow.report() if shadow else None
+
+    def shadow_report(self, model_type: str) -> Optional[Dict[str, Any]]:
+        """Get the shadow scoring report of a model type, if one is running."""
+        shadow = self._shadows.get(model_type)
+        return shadow.report() if shadow else None
+
+    def shadow(self, model_type: str, rows: List[Dict[str, float]], outputs: List[Any], latency: float) -> None:
+        """Hand a scored request to the model type's shadow, if one is running."""
+        shadow = self._shadows.get(model_type)
+        if shadow is not None:
+            shadow.submit(rows, outputs, latency)
+
+    def shadow_columns(self, model_type: str, frame: "pd.DataFrame", outputs: Any, latency: float) -> None:
+        """Hand a scored columnar request to the model type's shadow, if one is running."""
+        shadow = self._shadows.get(model_type)
+        if shadow is not None:
+            shadow.submit_columns(frame, outputs, latency)
+
+    def memory_footprint(self, model_type: str) -> Dict[str, Any]:
+        """
+        Get the memory footprint of the current model of a type.
+
+        The footprint is measured when a model is loaded or swapped in, and again only
+        once the model builds its explainer, which adds to it.
+        """
+        return self._measure(model_type, self.get(model_type))
+
+    def add_swap_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback run with the model type whenever a model is swapped in."""
+        self._swap_listeners.append(listener)
+
+    def reload(self, model_type: str) -> BasePredictionModel:
+        """Load the given model type from disk and swap it in."""
+        model = self._load(model_type)
+        self.swap(model_type, model)
+        return model
+
+    def load_all(self, parallel: bool = True) -> None:
+        """Load every model type, optionally in parallel threads."""
+        model_types = list(self.MODEL_CLASSES)
+        if parallel:
+            # Unpickling imports scikit-learn; importing it from several threads at once
+            # can deadlock on its circular imports, so import it once up front
+            import sklearn.ensemble
+            import sklearn.preprocessing
+
+            with ThreadPoolExecutor(max_workers=len(model_types)) as executor:
+                models = list(executor.map(self._load, model_types))
+        else:
+            models = [self._load(model_type) for model_type in model_types]
+
+        with self._lock:
+            self._models.update(zip(model_types, models))
+
+    def warmup(self) -> None:
+        """
+        Run one inference through each trained model so the first request does not pay for it.
+
+        The models are called directly rather than through PredictionService, so the
+        example rows never reach the prediction log, the anomaly metrics or a shadow.
+        """
+        from app.models.schemas import BasicFishPredictionRequest, AdvancedFishPredictionRequest
+
+        examples = {
+            request_class: request_class(**request_class.model_config['json_schema_extra']['example']).model_dump()
+            for request_class in (BasicFishPredictionRequest, AdvancedFishPredictionRequest)
+        }
+        readings = {
+            'basic': examples[BasicFishPredictionRequest],
+            'advanced': examples[AdvancedFishPredictionRequest],
+            'water_quality': examples[AdvancedFishPredictionRequest]
+        }
+        for model_type, reading in readings.items():
+            model = self.get(model_type)
+            if not model.model:
+                continue
+            row = {feature: reading[feature] for feature in model.feature_names}
+            try:
+                model.predict_batch([row])
+                if model.anomaly_detector is not None:
+                    model.anomaly_detector.check([row])
+            except Exception as e:
+                logger.warning(f"Warmup inference failed for {model_type} model: {e}")
+                continue
+            try:
+                # Flattens the ensemble, which would otherwise happen on the first explain request
+                model.explain_batch([row])
+            except ValueError:
+                pass
+
+    def startup(self, parallel: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Load all models and warm up the prediction path, recording how long each step took.
+
+        Args:
+            parallel: Load the models in parallel threads (defaults to PARALLEL_MODEL_LOADING)
+
+        Returns:
+            Timings of the startup steps in seconds
+        """
+        start_time = time.perf_counter()
+        self.load_all(parallel=settings.PARALLEL_MODEL_LOADING if parallel is None else parallel)
+        load_time = time.perf_counter() - start_time
+
+        warmup_time = 0.0
+        if settings.WARMUP_ON_STARTUP:
+            warmup_start = time.perf_counter()
+            self.warmup()
+            warmup_time = time.perf_counter() - warmup_start
+
+        self.startup_info = {
+            'model_load_time': load_time,
+            'warmup_time': warmup_time,
+            'startup_time': time.perf_counter() - start_time
+        }
+        self.state = "ready"
+        logger.info(f"Models ready in {self.startup_info['startup_time']:.3f}s")
+        return self.startup_info
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Get which models are loaded and how long each took to load."""
+        return {
+            model_type: {
+                'loaded': bool(model_type in self._models and self._models[model_type].model),
+                'version': self._models[model_type].model_info.get('version') if model_type in self._models else None,
+                'load_time': self.load_times.get(model_type),
+                'shadow': model_type in self._shadows
+            }
+            for model_type in self.MODEL_CLASSES
+        }
+
+    def _load(self, model_type: str) -> BasePredictionModel:
+        """Construct a model of the given type, loading it from disk if it has been trained."""
+        model_class = self._model_class(model_type)
+        start_time = time.perf_counter()
+        model = model_class()
+        self.load_times[model_type] = time.perf_counter() - start_time
+        self._measure(model_type, model)
+        return model
+
+    def _measure(self, model_type: str, model: BasePredictionModel) -> Dict[str, Any]:
+        cached = self._footprints.get(model_type)
+        if cached is None or cached[0] is not model or cached[1] != model.has_explainer:
+            cached = (model, model.has_explainer, model.memory_footprint())
+            self._footprints[model_type] = cached
+        return cached[2]
+
+    def _model_class(self, model_type: str) -> Type[BasePredictionModel]:
+        model_class = self.MODEL_CLASSES.get(model_type)
+        if model_class is None:
+            raise ValueError(f"Unknown model type: {model_type}")
+        return model_class
+
+
+# Registry shared by the whole process
+model_registry = ModelRegistry()
@@ -1,5 +1,4 @@
 import os
-import pandas as pd
 import time
 from typing import Dict, List, Optional, Union, Any
 
@@ -8,6 +7,8 @@ from app.models.prediction import (
     AdvancedFishPredictionModel,
     WaterQualityModel
 )
+from app.services.model_registry import ModelRegistry, model_registry
+from app.services.training_cache import training_cache
 from app.core.logging import logger
 from app.core.config import settings
 
@@ -22,7 +23,15 @@ class ModelTrainingService:
         os.makedirs(os.path.dirname(settings.ADVANCED_MODEL_PATH), exist_ok=True)
         os.makedirs(os.path.dirname(settings.WATER_QUALITY_MODEL_PATH), exist_ok=True)
     
-    def train_basic_model(self, test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
+    def train_basic_model(
+        self,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict[str, Any]:
         """Train the basic fish species prediction model."""
         logger.info("Training basic fish prediction model")
         
@@ -31,8 +40,13 @@ class ModelTrainingService:
             result = model.train(
                 data_path=settings.REAL_FISH_DATASET,
                 test_size=test_size,
-                random_state=random_state
+                random_state=random_state,
+                compact=compact,
+                activate=False,
+                cv_folds=cv_folds,
+                fold_scaler=fold_scaler
             )
+            self._finish_training('basic', model, result, activate)
             
           
             if result and 'accuracy' in result and result['accuracy'] is not None:
@@ -53,7 +67,15 @@ class ModelTrainingService:
                 'model_path': settings.BASIC_MODEL_PATH
             }
     
-    def train_advanced_model(self, test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
+    def train_advanced_model(
+        self,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict[str, Any]:
         """Train the advanced fish species prediction model."""
         logger.info("Training advanced fish prediction model")
         
@@ -62,8 +84,13 @@ class ModelTrainingService:
             result = model.train(
                 data_path=settings.WATER_QUALITY_DATASET,
                 test_size=test_size,
-                random_state=random_state
+                random_state=random_state,
+                compact=compact,
+                activate=False,
+                cv_folds=cv_folds,
+                fold_scaler=fold_scaler
             )
+            self._finish_training('advanced', model, result, activate)
             
           
             if result and 'accuracy' in result and result['accuracy'] is not None:
@@ -84,7 +111,15 @@ class ModelTrainingService:
                 'model_path': settings.ADVANCED_MODEL_PATH
             }
     
-    def train_water_quality_model(self, test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
+    def train_water_quality_model(
+        self,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True
+    ) -> Dict[str, Any]:
         """Train the water quality prediction model."""
         logger.info("Training water quality model")
         
@@ -93,8 +128,13 @@ class ModelTrainingService:
             result = model.train(
                 data_path=settings.WATER_QUALITY_DATASET,
                 test_size=test_size,
-                random_state=random_state
+                random_state=random_state,
+                compact=compact,
+                activate=False,
+                cv_folds=cv_folds,
+                fold_scaler=fold_scaler
             )
+            self._finish_training('water_quality', model, result, activate)
             
           
             if result and 'r2_score' in result and result['r2_score'] is not None:
@@ -117,64 +157,184 @@ class ModelTrainingService:
                 'f1_score': None
             }
     
-    def train_model(self, model_type: str, test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
-        """Train a model of the specified type."""
-        if model_type == "basic":
-            return self.train_basic_model(test_size, random_state)
-        elif model_type == "advanced":
-            return self.train_advanced_model(test_size, random_state)
-        elif model_type == "water_quality":
-            return self.train_water_quality_model(test_size, random_state)
-        else:
+    def train_streaming_model(
+        self,
+        model_type: str,
+        chunk_size: int,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        activate: bool = True
+    ) -> Dict[str, Any]:
+        """Train an incremental model of the specified type over the dataset in chunks."""
+        model_class = ModelRegistry.MODEL_CLASSES.get(model_type)
+        if model_class is None:
             raise ValueError(f"Unknown model type: {model_type}")
-    
-    def get_model_status(self) -> Dict[str, Any]:
-        """Get the status of all models."""
-        result = {}
         
+        logger.info(f"Training {model_type} model in streaming mode")
+        model = model_class()
+        result = model.train_streaming(
+            chunk_size=chunk_size,
+            test_size=test_size,
+            random_state=random_state,
+            activate=False
+        )
+        self._finish_training(model_type, model, result, activate)
+        
+        logger.info(
+            f"Streaming {model_type} model training completed: "
+            f"peak memory={result['streaming']['peak_memory_mb']:.1f} MB"
+        )
+        return result
     
-        basic_model_path = settings.BASIC_MODEL_PATH
-        if os.path.exists(basic_model_path):
-            try:
-                basic_model = BasicFishPredictionModel()
-                result["basic"] = {
-                    "status": "available",
-                    "info": basic_model.model_info if hasattr(basic_model, "model_info") else {}
-                }
-            except Exception as e:
-                logger.error(f"Error loading basic model for status check: {e}")
-                result["basic"] = {"status": "error", "error": str(e)}
-        else:
-            result["basic"] = {"status": "not_trained"}
+    def train_model(
+        self,
+        model_type: str,
+        test_size: float = 0.2,
+        random_state: int = 42,
+        compact: bool = False,
+        streaming: bool = False,
+        chunk_size: Optional[int] = None,
+        activate: bool = True,
+        cv_folds: Optional[int] = None,
+        fold_scaler: bool = True,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Train a model of the specified type.
         
-     
-        advanced_model_path = settings.ADVANCED_MODEL_PATH
-        if os.path.exists(advanced_model_path):
-            try:
-                advanced_model = AdvancedFishPredictionModel()
-                result["advanced"] = {
-                    "status": "available",
-                    "info": advanced_model.model_info if hasattr(advanced_model, "model_info") else {}
-                }
-            except Exception as e:
-                logger.error(f"Error loading advanced model for status check: {e}")
-                result["advanced"] = {"status": "error", "error": str(e)}
+        The trained model is saved as a new version. With activate it also replaces the
+        live model; otherwise it can be shadow scored and activated later. With cv_folds
+        the model is also cross validated, with the folds fitted in parallel, and the
+        mean and spread of its metrics are reported alongside the holdout metrics.
+        With fold_scaler (the default) tree ensembles are saved with the scaler folded
+        into their split thresholds, so predictions skip scaling; streaming models are
+        neural networks and always keep their scaler.
+        
+        A run identical to an earlier one (same dataset contents, hyperparameters and
+        options) returns that run's saved version and metrics without retraining, unless
+        force is set.
+        """
+        model_class = ModelRegistry.MODEL_CLASSES.get(model_type)
+        if model_class is None:
+            raise ValueError(f"Unknown model type: {model_type}")
+        if streaming:
+            if compact:
+                raise ValueError("Compaction applies to tree ensembles and cannot be combined with streaming training")
+            if cv_folds:
+                raise ValueError("Cross validation needs the whole dataset and cannot be combined with streaming training")
+            chunk_size = chunk_size or settings.STREAMING_CHUNK_SIZE
+        
+        key = training_cache.key(model_class, {
+            'test_size': test_size,
+            'random_state': random_state,
+            'compact': compact,
+            'streaming': streaming,
+            'chunk_size': chunk_size if streaming else None,
+            'cv_folds': cv_folds,
+            'fold_scaler': fold_scaler and not streaming
+        })
+        if not force:
+            cached = self._cached_training(model_type, key, activate)
+            if cached is not None:
+                return cached
+        
+        if streaming:
+            result = self.train_streaming_model(model_type, chunk_size, test_size, random_state, activate)
+        elif model_type == "basic":
+            result = self.train_basic_model(test_size, random_state, compact, activate, cv_folds, fold_scaler)
+        elif model_type == "advanced":
+            result = self.train_advanced_model(test_size, random_state, compact, activate, cv_folds, fold_scaler)
         else:
-            result["advanced"] = {"status": "not_trained"}
+            result = self.train_water_quality_model(test_size, random_state, compact, activate, cv_folds, fold_scaler)
         
-
-        water_quality_model_path = settings.WATER_QUALITY_MODEL_PATH
-        if os.path.exists(water_quality_model_path):
+        # Failed runs return placeholder metrics without a saved version
+        if result.get('version'):
+            result['training_key'] = key
+            result['cached'] = False
+            training_cache.store(model_registry.get(model_type), key, result)
+        return result
+    
+    def _cached_training(self, model_type: str, key: str, activate: bool) -> Optional[Dict[str, Any]]:
+        """Return the result of an identical earlier run, activating its version if requested."""
+        entry = training_cache.lookup(model_registry.get(model_type), key)
+        if entry is None:
+            return None
+        
+        version = entry['version']
+        if activate and model_registry.get(model_type).model_info.get('version') != version:
+            model_registry.rollback(model_type, version)
+        logger.info(f"Reusing {model_type} model version {version} from an identical training run")
+        
+        result = dict(entry['result'])
+        result['activated'] = model_registry.get(model_type).model_info.get('version') == version
+        result['cached'] = True
+        return result
+    
+    def list_versions(self, model_type: str) -> List[Dict[str, Any]]:
+        """List the saved versions of a model type, newest first."""
+        return model_registry.versions(model_type)
+    
+    def rollback(self, model_type: str, version: str) -> Dict[str, Any]:
+        """Make a previously saved version the live model."""
+        model = model_registry.rollback(model_type, version)
+        return {'model_type': model_type, 'version': version, 'model_info': model.model_info}
+    
+    def start_shadow(self, model_type: str, version: str, sample_rate: float) -> Dict[str, Any]:
+        """Shadow score a saved version against the live model on a sample of traffic."""
+        return model_registry.set_shadow(model_type, version, sample_rate)
+    
+    def get_shadow_report(self, model_type: str) -> Optional[Dict[str, Any]]:
+        """Get the report of the shadow running for a model type, if any."""
+        return model_registry.shadow_report(model_type)
+    
+    def stop_shadow(self, model_type: str) -> Optional[Dict[str, Any]]:
+        """Stop shadow scoring a model type, returning its final report."""
+        return model_registry.clear_shadow(model_type)
+    
+    def _finish_training(self, model_type: str, model, result: Dict[str, Any], activate: bool) -> None:
+        """Record the saved version in the training result and activate it if requested."""
+        if activate:
+            model_registry.activate(model_type, model)
+        result['version'] = model.model_info.get('version')
+        result['activated'] = activate
+    
+    def status_version(self) -> List[Any]:
+        """
+        Cheaply identify the state get_model_status reports, without reading any model.
+        
+        Combines the version and training time of each model type's serving model,
+        which change whenever a model is trained, activated or rolled back, and whether
+        it has built its explainer, which adds to its memory.
+        """
+        parts = []
+        for model_type in ModelRegistry.MODEL_CLASSES:
+            model = model_registry.get(model_type)
+            if not model.model:
+                parts.append([model_type, None])
+                continue
+            parts.append([
+                model_type,
+                model.model_info.get('version'),
+                model.model_info.get('training_time'),
+                model.has_explainer
+            ])
+        return parts
+    
+    def get_model_status(self) -> Dict[str, Any]:
+        """Get the status of all models, as the registry serves them."""
+        result = {}
+        for model_type in ModelRegistry.MODEL_CLASSES:
             try:
-                water_quality_model = WaterQualityModel()
-                result["water_quality"] = {
+                model = model_registry.get(model_type)
+                if not model.model:
+                    result[model_type] = {"status": "not_trained"}
+                    continue
+                result[model_type] = {
                     "status": "available",
-                    "info": water_quality_model.model_info if hasattr(water_quality_model, "model_info") else {}
+                    "info": model.model_info,
+                    "memory": model_registry.memory_footprint(model_type)
                 }
             except Exception as e:
-                logger.error(f"Error loading water quality model for status check: {e}")
-                result["water_quality"] = {"status": "error", "error": str(e)}
-        else:
-            result["water_quality"] = {"status": "not_trained"}
-        
-        return result
\ No newline at end of file
+                logger.error(f"Error reading the {model_type} model for status check: {e}")
+                result[model_type] = {"status": "error", "error": str(e)}
+        return result
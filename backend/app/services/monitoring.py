@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+class AnomalyMonitor:
+    """Process-wide counters of the inputs flagged by the models' anomaly detectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, model_type: str, results: List[Dict[str, Any]], check_time: float) -> None:
+        """Count the rows of one check and which of them were flagged."""
+        flagged = [result['features'] for result in results if result['is_anomaly']]
+        self.record_counts(model_type, len(results), flagged, check_time)
+
+    def record_counts(
+        self,
+        model_type: str,
+        rows_checked: int,
+        flagged: List[Dict[str, str]],
+        check_time: float
+    ) -> None:
+        """Count a check given its size and the flagged features of each anomalous row."""
+        with self._lock:
+            stats = self._stats.setdefault(model_type, {
+                'checks': 0,
+                'rows_checked': 0,
+                'rows_flagged': 0,
+                'check_time': 0.0,
+                'feature_flags': Counter(),
+                'last_flagged_at': None
+            })
+            stats['checks'] += 1
+            stats['rows_checked'] += rows_checked
+            stats['rows_flagged'] += len(flagged)
+            stats['check_time'] += check_time
+            for features in flagged:
+                stats['feature_flags'].update(
+                    f"{feature}:{reason}" for feature, reason in features.items()
+                )
+            if flagged:
+                stats['last_flagged_at'] = time.time()
+
+    def report(self, model_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Get flag rates, flagged features and check latency per model type."""
+        with self._lock:
+            return {
+                name: {
+                    'checks': stats['checks'],
+                    'rows_checked': stats['rows_checked'],
+                    'rows_flagged': stats['rows_flagged'],
+                    'flag_rate': stats['rows_flagged'] / stats['rows_checked'] if stats['rows_checked'] else 0.0,
+                    'feature_flags': dict(stats['feature_flags'].most_common()),
+                    'mean_check_time_us': stats['check_time'] / stats['checks'] * 1e6 if stats['checks'] else 0.0,
+                    'last_flagged_at': stats['last_flagged_at']
+                }
+                for name, stats in self._stats.items()
+                if model_type is None or name == model_type
+            }
+
+
+class EarlyExitMonitor:
+    """Process-wide counts of the boosting stages evaluated by early exit predictions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, model_type: str, rows: int, stages: int, n_stages: int) -> None:
+        """Count a batch of `rows` that evaluated `stages` stages in total, out of `n_stages` per row."""
+        with self._lock:
+            stats = self._stats.setdefault(model_type, {'batches': 0, 'rows': 0, 'stages': 0, 'n_stages': n_stages})
+            stats['batches'] += 1
+            stats['rows'] += rows
+            stats['stages'] += stages
+            stats['n_stages'] = n_stages
+
+    def report(self, model_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Get the mean stages evaluated per row and the share of stages skipped per model type."""
+        with self._lock:
+            return {
+                name: {
+                    'batches': stats['batches'],
+                    'rows': stats['rows'],
+                    'n_stages': stats['n_stages'],
+                    'mean_stages': stats['stages'] / stats['rows'] if stats['rows'] else 0.0,
+                    'skipped_fraction': 1 - stats['stages'] / (stats['rows'] * stats['n_stages']) if stats['rows'] else 0.0
+                }
+                for name, stats in self._stats.items()
+                if model_type is None or name == model_type
+            }
+
+
+# Monitors shared by the whole process
+anomaly_monitor = AnomalyMonitor()
+early_exit_monitor = EarlyExitMonitor()
@@ -1,165 +1,342 @@
+import time
 from typing import Dict, List, Optional, Union, Any
-import pandas as pd
 
-from app.models.prediction import (
-    BasicFishPredictionModel,
-    AdvancedFishPredictionModel,
-    WaterQualityModel
-)
+import numpy as np
+
+from app.services.model_registry import ModelRegistry, model_registry
 from app.models.schemas import (
     BasicFishPredictionRequest,
-    AdvancedFishPredictionRequest,
-    FishSpeciesInfo
+    AdvancedFishPredictionRequest
 )
-from app.core.logging import logger
+from app.services.species import get_species_catalog
+from app.services.monitoring import anomaly_monitor, early_exit_monitor
+from app.services.prediction_log import prediction_log
+from app.models.columnar import BASIC_FEATURES, ADVANCED_FEATURES, parse_columns
+from app.core.serialization import dumps, join_array, splice_field
+from app.core.logging import get_logger
+from app.core.config import settings
+
+# The prediction path logs on every request, so it has its own logger that can be
+# sampled with LOG_SAMPLE_RATES
+logger = get_logger("fish-habitat-analyzer.prediction")
 
 
 class PredictionService:
     """Service for making predictions using trained models."""
     
-    def __init__(self):
-        """Initialize the prediction service with model instances."""
-        self.basic_model = BasicFishPredictionModel()
-        self.advanced_model = AdvancedFishPredictionModel()
-        self.water_quality_model = WaterQualityModel()
-        
-        # Fish species information database
-        self.fish_species_info = self._initialize_species_info()
+    # Values used for the water quality parameters the basic request does not provide.
+    # This is simplified and would need to be improved in a real application
+    BASIC_WATER_QUALITY_DEFAULTS = {
+        'dissolved_oxygen': 6.0,
+        'bod': 2.0,
+        'co2': 10.0,
+        'alkalinity': 120.0,
+        'hardness': 150.0,
+        'calcium': 40.0,
+        'ammonia': 0.05,
+        'nitrite': 0.01,
+        'phosphorus': 0.2,
+        'h2s': 0.002,
+        'plankton': 500.0
+    }
     
-    def _initialize_species_info(self) -> Dict[str, FishSpeciesInfo]:
-        """Initialize information about fish species."""
-        # This could be loaded from a database or external file
-        species_info = {
-            "Tilapia": FishSpeciesInfo(
-                name="Tilapia",
-                scientific_name="Oreochromis niloticus",
-                ideal_ph_range=[6.5, 8.0],
-                ideal_temperature_range=[25.0, 30.0],
-                ideal_turbidity_range=[30.0, 80.0],
-                description="Tilapia is a hardy fish that can tolerate a wide range of water conditions. It's popular in aquaculture due to its fast growth rate and adaptability."
-            ),
-            "Catfish": FishSpeciesInfo(
-                name="Catfish",
-                scientific_name="Clarias gariepinus",
-                ideal_ph_range=[6.0, 8.0],
-                ideal_temperature_range=[24.0, 28.0],
-                ideal_turbidity_range=[20.0, 60.0],
-                description="Catfish are bottom-dwelling fish that can tolerate low oxygen levels and poor water quality. They are widely farmed for their high-quality meat."
-            ),
-            "Carp": FishSpeciesInfo(
-                name="Carp",
-                scientific_name="Cyprinus carpio",
-                ideal_ph_range=[6.5, 9.0],
-                ideal_temperature_range=[20.0, 28.0],
-                ideal_turbidity_range=[30.0, 70.0],
-                description="Carp is one of the most widely cultivated freshwater fish. It's tolerant of poor water conditions and can survive in water with low oxygen levels."
-            ),
-            "Salmon": FishSpeciesInfo(
-                name="Salmon",
-                scientific_name="Salmo salar",
-                ideal_ph_range=[6.5, 8.0],
-                ideal_temperature_range=[10.0, 16.0],
-                ideal_turbidity_range=[5.0, 20.0],
-                description="Salmon require clean, cold, oxygen-rich water. They are sensitive to water quality changes and need pristine conditions for optimal growth."
-            ),
-            "Trout": FishSpeciesInfo(
-                name="Trout",
-                scientific_name="Oncorhynchus mykiss",
-                ideal_ph_range=[6.5, 8.0],
-                ideal_temperature_range=[12.0, 18.0],
-                ideal_turbidity_range=[5.0, 25.0],
-                description="Trout are cold-water fish that require high-quality water with good oxygen levels. They're sensitive to pollution and temperature changes."
-            ),
-            "Shrimp": FishSpeciesInfo(
-                name="Shrimp",
-                scientific_name="Litopenaeus vannamei",
-                ideal_ph_range=[7.0, 8.5],
-                ideal_temperature_range=[26.0, 32.0],
-                ideal_turbidity_range=[30.0, 60.0],
-                description="Shrimp are highly sensitive to water quality parameters. They require stable conditions with careful management of ammonia and nitrite levels."
-            ),
-            "Goldfish": FishSpeciesInfo(
-                name="Goldfish",
-                scientific_name="Carassius auratus",
-                ideal_ph_range=[6.0, 8.0],
-                ideal_temperature_range=[20.0, 25.0],
-                ideal_turbidity_range=[20.0, 50.0],
-                description="Goldfish are hardy freshwater fish that can adapt to various water conditions. They're popular ornamental fish and can tolerate cooler temperatures."
-            )
-        }
-        return species_info
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        """Initialize the prediction service with the registry's current models."""
+        self.registry = registry = registry or model_registry
+        self.basic_model = registry.get('basic')
+        self.advanced_model = registry.get('advanced')
+        self.water_quality_model = registry.get('water_quality')
+        
+        # Fish species information database, serialized once per process
+        self.species_catalog = get_species_catalog()
+        self.fish_species_info = self.species_catalog.species
     
-    def predict_basic(self, data: BasicFishPredictionRequest) -> Dict[str, Any]:
+    def predict_basic(self, data: BasicFishPredictionRequest, explain: bool = False) -> Dict[str, Any]:
         """Make prediction using the basic model."""
-        logger.info(f"Making basic prediction with data: {data}")
+        logger.info("Making basic prediction")
         
-        input_data = {
-            'ph': data.ph,
-            'temperature': data.temperature,
-            'turbidity': data.turbidity
-        }
-        
-        # Get prediction from model
         try:
-            prediction_result = self.basic_model.predict(input_data)
-            predicted_species = prediction_result['predicted_species']
-            confidence = prediction_result['confidence']
-            
-            # Get water quality score if available
-            water_quality_score = None
-            try:
-                if self.water_quality_model.model:
-                    # We need to map the basic data to what the water quality model expects
-                    # This is simplified and would need to be improved in a real application
-                    water_quality_input = {
-                        'temperature': data.temperature,
-                        'turbidity': data.turbidity,
-                        'ph': data.ph,
-                        # Default values for required fields
-                        'dissolved_oxygen': 6.0,
-                        'bod': 2.0,
-                        'co2': 10.0,
-                        'alkalinity': 120.0,
-                        'hardness': 150.0,
-                        'calcium': 40.0,
-                        'ammonia': 0.05,
-                        'nitrite': 0.01,
-                        'phosphorus': 0.2,
-                        'h2s': 0.002,
-                        'plankton': 500.0
-                    }
-                    water_quality_score = self.water_quality_model.predict(water_quality_input)
-            except Exception as e:
-                logger.warning(f"Error getting water quality score: {e}")
-            
-            # Analyze parameters
-            parameter_analysis = self._analyze_parameters_basic(input_data)
-            
-            # Get suitable species
-            suitable_species = self._get_suitable_species_basic(input_data)
-            
-            result = {
-                'predicted_species': predicted_species,
-                'confidence': confidence,
-                'water_quality_score': water_quality_score,
-                'parameter_analysis': parameter_analysis,
-                'suitable_species': [
-                    self.fish_species_info.get(species, FishSpeciesInfo(name=species))
-                    for species in suitable_species
-                ]
-            }
-            
-            return result
-        
+            return self._predict_basic_rows([self._basic_input(data)], explain)[0]
         except Exception as e:
             logger.error(f"Error making basic prediction: {e}")
             raise
     
-    def predict_advanced(self, data: AdvancedFishPredictionRequest) -> Dict[str, Any]:
+    def predict_basic_batch(
+        self,
+        readings: List[BasicFishPredictionRequest],
+        explain: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Make predictions for many readings with one call per model."""
+        logger.info("Making basic batch prediction for %d readings", len(readings))
+        
+        try:
+            return self._predict_basic_rows([self._basic_input(data) for data in readings], explain)
+        except Exception as e:
+            logger.error(f"Error making basic batch prediction: {e}")
+            raise
+    
+    def predict_advanced(self, data: AdvancedFishPredictionRequest, explain: bool = False) -> Dict[str, Any]:
         """Make prediction using the advanced model."""
-        logger.info(f"Making advanced prediction with data")
+        logger.info("Making advanced prediction")
+        
+        try:
+            return self._predict_advanced_rows([self._advanced_input(data)], explain)[0]
+        except Exception as e:
+            logger.error(f"Error making advanced prediction: {e}")
+            raise
+    
+    def predict_advanced_batch(
+        self,
+        readings: List[AdvancedFishPredictionRequest],
+        explain: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Make predictions for many readings with one call per model."""
+        logger.info("Making advanced batch prediction for %d readings", len(readings))
+        
+        try:
+            return self._predict_advanced_rows([self._advanced_input(data) for data in readings], explain)
+        except Exception as e:
+            logger.error(f"Error making advanced batch prediction: {e}")
+            raise
+    
+    def predict_columnar(
+        self,
+        model_type: str,
+        payload: Dict[str, Any],
+        max_rows: Optional[int] = None,
+        labels_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Score a columnar batch, one array per feature, and return the results as columns.
+        
+        The arrays are validated as a whole and scored as a DataFrame built from them,
+        without creating an object per row. Parameter analysis and suitable species are
+        per-row lookups and are only returned by the row endpoints.
+        
+        Args:
+            model_type: "basic" or "advanced"
+            payload: Feature name to array of values, plus optional "site_ids"
+            max_rows: Largest accepted batch (defaults to COLUMNAR_MAX_ROWS)
+            labels_only: Skip confidence and probabilities, so gradient boosting models
+                can stop evaluating each row once its species is settled
+            
+        Returns:
+            Predicted species, confidence, class probabilities, water quality scores and
+            anomaly flags, one array each. With labels_only, confidence and probabilities
+            are None and early_exit holds the boosting stages the rows needed
+        """
+        import pandas as pd
+        
+        start_time = time.perf_counter()
+        features = BASIC_FEATURES if model_type == 'basic' else ADVANCED_FEATURES
+        model = self.basic_model if model_type == 'basic' else self.advanced_model
+        columns, site_ids = parse_columns(payload, features, max_rows or settings.COLUMNAR_MAX_ROWS)
+        n_rows = len(columns[features[0]])
+        logger.info("Making %s columnar prediction for %d readings", model_type, n_rows)
+        
+        classes = model.classes
+        result = {'count': n_rows, 'site_ids': site_ids, 'classes': classes}
+        frame = pd.DataFrame(columns, copy=False)
+        scoring_start = time.perf_counter()
+        if labels_only:
+            labels, early_exit = model.predict_labels(frame)
+            scoring_time = time.perf_counter() - scoring_start
+            result['predicted_species'] = labels.tolist()
+            result['confidence'] = None
+            result['probabilities'] = None
+            result['early_exit'] = early_exit
+            if early_exit is not None:
+                early_exit_monitor.record(
+                    model_type, n_rows, round(early_exit['mean_stages'] * n_rows), early_exit['n_stages']
+                )
+        else:
+            probabilities = model.predict_array(frame)
+            scoring_time = time.perf_counter() - scoring_start
+            best = probabilities.argmax(axis=1)
+            result['predicted_species'] = np.asarray(classes, dtype=object)[best].tolist()
+            result['confidence'] = probabilities[np.arange(n_rows), best]
+            result['probabilities'] = {name: probabilities[:, i] for i, name in enumerate(classes)}
+        self.registry.shadow_columns(model_type, frame, result['predicted_species'], scoring_time)
+        result['water_quality_score'] = self._water_quality_columns(model_type, columns, n_rows)
+        result['anomaly'] = self._anomaly_columns(model_type, model, columns, n_rows)
+        
+        if settings.PREDICTION_LOG_ENABLED:
+            inputs = dict(columns)
+            if site_ids is not None:
+                inputs['site_id'] = site_ids
+            outputs = {'predicted_species': result['predicted_species']}
+            if result['confidence'] is not None:
+                outputs['confidence'] = result['confidence']
+            if result['water_quality_score'] is not None:
+                outputs['water_quality_score'] = result['water_quality_score']
+            if result['anomaly'] is not None:
+                outputs['is_anomaly'] = result['anomaly']['is_anomaly']
+            prediction_log.record_columns(
+                model_type, model.model_info.get('version'), inputs, outputs, n_rows, time.perf_counter() - start_time
+            )
+        return result
+    
+    def forecast_water_quality(
+        self,
+        sites: List[Dict[str, Any]],
+        horizon: int,
+        window: Optional[int] = None,
+        include_features: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Forecast the water quality score of many sites for the next `horizon` intervals.
+        
+        Each site's recent readings are reduced to a level and a trend per parameter
+        (a least squares line over the last `window` readings), fitted for all sites at
+        once. Every parameter is extrapolated with a damped trend and the forecast
+        readings of every site and step are scored with one water quality model call.
+        Readings are assumed to be evenly spaced, oldest first.
+        
+        Args:
+            sites: Dicts with "site_id" and "readings", a list of readings keyed by model feature
+            horizon: Number of future intervals to forecast
+            window: Readings per site used for the trend (defaults to FORECAST_WINDOW),
+                at most FORECAST_MAX_WINDOW and cut to the longest history given
+            include_features: Also return the forecast parameter values
+        
+        Returns:
+            The horizon, the window and per site the score of the latest reading and
+            the forecast scores
+        """
+        import pandas as pd
+        from app.models.forecasting import stack_histories, rolling_trend, damped_trend_forecast
+        
+        window = window or settings.FORECAST_WINDOW
+        if horizon > settings.FORECAST_MAX_HORIZON:
+            raise ValueError(f"horizon must be at most {settings.FORECAST_MAX_HORIZON}")
+        if window > settings.FORECAST_MAX_WINDOW:
+            raise ValueError(f"window must be at most {settings.FORECAST_MAX_WINDOW}")
+        if len(sites) > settings.FORECAST_MAX_SITES:
+            raise ValueError(f"At most {settings.FORECAST_MAX_SITES} sites can be forecast at once")
+        # Steps before every site's first reading would only be padding
+        window = min(window, max(len(site['readings']) for site in sites))
+        model = self.water_quality_model
+        if not model.model:
+            raise ValueError("Model not loaded. Train or load a model first.")
+        logger.info("Forecasting water quality of %d sites for %d intervals", len(sites), horizon)
+        
+        features = model.feature_names
+        histories = [
+            np.array([[reading[name] for name in features] for reading in site['readings'][-window:]], dtype=np.float64)
+            for site in sites
+        ]
+        stacked = stack_histories(histories, window)
+        level, slope = rolling_trend(stacked)
+        forecast = damped_trend_forecast(level, slope, horizon, settings.FORECAST_DAMPING, features)
+        
+        # Score the latest reading and the forecast steps of every site together
+        latest = np.stack([history[-1] for history in histories])
+        rows = np.concatenate([latest[:, None, :], forecast], axis=1).reshape(-1, len(features))
+        scores = model.predict_array(pd.DataFrame(rows, columns=features, copy=False)).reshape(len(sites), horizon + 1)
+        
+        forecasts = []
+        for index, site in enumerate(sites):
+            site_forecast = {
+                'site_id': site['site_id'],
+                'current_score': float(scores[index, 0]),
+                'scores': scores[index, 1:].tolist()
+            }
+            if include_features:
+                site_forecast['features'] = [dict(zip(features, step)) for step in forecast[index].tolist()]
+            forecasts.append(site_forecast)
+        return {'horizon': horizon, 'window': window, 'forecasts': forecasts}
+    
+    def profile_allocations(self, model_type: str, predictions: int, batch_size: int = 1, top: int = 10) -> Dict[str, Any]:
+        """
+        Trace the memory allocated while a model scores `predictions` batches.
+        
+        Readings are drawn around the training mean of each feature, so no dataset is
+        needed and nothing is logged. Only the model call is traced, which is where the
+        per-request feature matrices and model outputs are allocated.
+        
+        Args:
+            model_type: "basic", "advanced" or "water_quality"
+            predictions: Number of traced model calls
+            batch_size: Readings per call; predictions x batch_size is at most
+                MEMORY_PROFILE_MAX_ROWS
+            top: Number of allocation sites to report
+        
+        Returns:
+            The allocation profile (see app.core.memory.allocation_profile) and the
+            model's memory footprint
+        """
+        from app.core.memory import allocation_profile
+        
+        models = {'basic': self.basic_model, 'advanced': self.advanced_model, 'water_quality': self.water_quality_model}
+        model = models.get(model_type)
+        if model is None:
+            raise ValueError(f"Unknown model type: {model_type}")
+        if not model.model or model.scaler is None:
+            raise ValueError(f"The {model_type} model is not loaded. Train or load a model first.")
+        if predictions * batch_size > settings.MEMORY_PROFILE_MAX_ROWS:
+            raise ValueError(
+                f"predictions x batch_size must be at most {settings.MEMORY_PROFILE_MAX_ROWS} readings, "
+                f"got {predictions * batch_size}"
+            )
+        
+        rng = np.random.default_rng(0)
+        values = np.clip(rng.normal(model.scaler.mean_, model.scaler.scale_, size=(batch_size, len(model.feature_names))), 0.0, None)
+        rows = [dict(zip(model.feature_names, row)) for row in values.tolist()]
+        logger.info("Profiling allocations of %d %s predictions of %d rows", predictions, model_type, batch_size)
+        
+        profile = allocation_profile(lambda: model.predict_batch(rows), predictions, top)
+        return {
+            'model_type': model_type,
+            'batch_size': batch_size,
+            **profile,
+            'model_memory': self.registry.memory_footprint(model_type)
+        }
+    
+    def nearest_samples(self, model_type: str, readings: List[Dict[str, float]], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Find the labelled training rows most similar to each reading."""
+        model = self.basic_model if model_type == 'basic' else self.advanced_model
+        if model.neighbor_index is None:
+            raise LookupError(f"No sample index for the {model_type} model; retrain it to build one")
+        return model.neighbor_index.query(readings, k)
+    
+    def render_prediction(self, result: Dict[str, Any], species_format: str = "full") -> bytes:
+        """
+        Serialize a prediction result to JSON.
+        
+        Suitable species are spliced in from the catalog's pre-serialized fragments,
+        or listed by name only when species_format is "ref".
         
-        input_data = {
+        Args:
+            result: A prediction result from one of the predict methods
+            species_format: "full" for complete species entries, "ref" for names only
+            
+        Returns:
+            The serialized PredictionResponse body
+        """
+        names = result.get('suitable_species') or []
+        body = dumps({key: value for key, value in result.items() if key != 'suitable_species'})
+        if species_format == "ref":
+            species = dumps(names)
+        else:
+            species = self.species_catalog.fragments_for(names)
+        return splice_field(body, 'suitable_species', species)
+    
+    def render_batch(self, results: List[Dict[str, Any]], species_format: str = "full") -> bytes:
+        """Serialize batch prediction results to a BatchPredictionResponse body."""
+        predictions = join_array(self.render_prediction(result, species_format) for result in results)
+        return splice_field(dumps({'count': len(results)}), 'predictions', predictions)
+    
+    def _basic_input(self, data: BasicFishPredictionRequest) -> Dict[str, float]:
+        """Extract the basic model inputs from a request."""
+        return {
+            'ph': data.ph,
+            'temperature': data.temperature,
+            'turbidity': data.turbidity
+        }
+    
+    def _advanced_input(self, data: AdvancedFishPredictionRequest) -> Dict[str, float]:
+        """Extract the advanced model inputs from a request."""
+        return {
             'temperature': data.temperature,
             'turbidity': data.turbidity,
             'dissolved_oxygen': data.dissolved_oxygen,
@@ -175,43 +352,189 @@ class PredictionService:
             'h2s': data.h2s,
             'plankton': data.plankton
         }
+    
+    def _predict_basic_rows(self, rows: List[Dict[str, float]], explain: bool = False) -> List[Dict[str, Any]]:
+        """Score basic inputs and assemble the prediction results."""
+        start_time = time.perf_counter()
+        predictions = self._score('basic', self.basic_model, rows)
+        
+        # We need to map the basic data to what the water quality model expects
+        water_quality_rows = [{**self.BASIC_WATER_QUALITY_DEFAULTS, **row} for row in rows]
+        water_quality_scores = self._water_quality_scores(water_quality_rows)
+        
+        results = [
+            self._build_result(
+                prediction,
+                water_quality_score,
+                self._analyze_parameters_basic(row),
+                self._get_suitable_species_basic(row)
+            )
+            for row, prediction, water_quality_score in zip(rows, predictions, water_quality_scores)
+        ]
+        self._add_anomalies(results, 'basic', self.basic_model, rows)
+        if explain:
+            self._add_explanations(results, self.basic_model, rows, predictions, water_quality_rows, water_quality_scores)
+        self._log_predictions('basic', self.basic_model, rows, results, time.perf_counter() - start_time)
+        return results
+    
+    def _predict_advanced_rows(self, rows: List[Dict[str, float]], explain: bool = False) -> List[Dict[str, Any]]:
+        """Score advanced inputs and assemble the prediction results."""
+        start_time = time.perf_counter()
+        predictions = self._score('advanced', self.advanced_model, rows)
+        water_quality_scores = self._water_quality_scores(rows)
         
-        # Get prediction from model
+        results = [
+            self._build_result(
+                prediction,
+                water_quality_score,
+                self._analyze_parameters_advanced(row),
+                self._get_suitable_species_advanced(row)
+            )
+            for row, prediction, water_quality_score in zip(rows, predictions, water_quality_scores)
+        ]
+        self._add_anomalies(results, 'advanced', self.advanced_model, rows)
+        if explain:
+            self._add_explanations(results, self.advanced_model, rows, predictions, rows, water_quality_scores)
+        self._log_predictions('advanced', self.advanced_model, rows, results, time.perf_counter() - start_time)
+        return results
+    
+    def _log_predictions(
+        self,
+        model_type: str,
+        model,
+        rows: List[Dict[str, float]],
+        results: List[Dict[str, Any]],
+        latency: float
+    ) -> None:
+        """Queue the predictions for the audit log; never fails the request."""
+        if not settings.PREDICTION_LOG_ENABLED:
+            return
         try:
-            prediction_result = self.advanced_model.predict(input_data)
-            predicted_species = prediction_result['predicted_species']
-            confidence = prediction_result['confidence']
-            
-            # Get water quality score
-            water_quality_score = None
+            outputs = [
+                {
+                    'predicted_species': result['predicted_species'],
+                    'confidence': result['confidence'],
+                    'water_quality_score': result['water_quality_score'],
+                    'water_quality_model_version': self.water_quality_model.model_info.get('version'),
+                    'is_anomaly': result['anomaly']['is_anomaly'] if 'anomaly' in result else None
+                }
+                for result in results
+            ]
+            prediction_log.record(model_type, model.model_info.get('version'), rows, outputs, latency)
+        except Exception as e:
+            logger.warning(f"Error queueing predictions for the log: {e}")
+    
+    def _add_anomalies(self, results: List[Dict[str, Any]], model_type: str, model, rows: List[Dict[str, float]]) -> None:
+        """Flag results whose inputs are out of the model's training distribution."""
+        if model.anomaly_detector is None:
+            return
+        start_time = time.perf_counter()
+        anomalies = model.anomaly_detector.check(rows)
+        anomaly_monitor.record(model_type, anomalies, time.perf_counter() - start_time)
+        
+        flagged = 0
+        for result, anomaly in zip(results, anomalies):
+            result['anomaly'] = anomaly
+            flagged += anomaly['is_anomaly']
+        if flagged:
+            logger.warning(f"{flagged} of {len(rows)} {model_type} inputs look out of distribution")
+    
+    def _add_explanations(
+        self,
+        results: List[Dict[str, Any]],
+        species_model,
+        rows: List[Dict[str, float]],
+        predictions: List[Dict[str, Any]],
+        water_quality_rows: List[Dict[str, float]],
+        water_quality_scores: List[Optional[float]]
+    ) -> None:
+        """Attach explanations of the predicted species and water quality score to each result."""
+        species = species_model.explain_batch(rows, predictions)
+        water_quality = [None] * len(rows)
+        if any(score is not None for score in water_quality_scores):
             try:
-                if self.water_quality_model.model:
-                    water_quality_score = self.water_quality_model.predict(input_data)
+                water_quality = self.water_quality_model.explain_batch(water_quality_rows)
             except Exception as e:
-                logger.warning(f"Error getting water quality score: {e}")
-            
-            # Analyze parameters
-            parameter_analysis = self._analyze_parameters_advanced(input_data)
-            
-            # Get suitable species
-            suitable_species = self._get_suitable_species_advanced(input_data)
-            
-            result = {
-                'predicted_species': predicted_species,
-                'confidence': confidence,
-                'water_quality_score': water_quality_score,
-                'parameter_analysis': parameter_analysis,
-                'suitable_species': [
-                    self.fish_species_info.get(species, FishSpeciesInfo(name=species))
-                    for species in suitable_species
-                ]
+                logger.warning(f"Error explaining water quality score: {e}")
+        
+        for result, species_explanation, water_quality_explanation in zip(results, species, water_quality):
+            result['explanation'] = {
+                'species': species_explanation,
+                'water_quality': water_quality_explanation
             }
-            
-            return result
+    
+    def _water_quality_columns(self, model_type: str, columns: Dict[str, np.ndarray], n_rows: int) -> Optional[np.ndarray]:
+        """Score columns with the water quality model, filling the basic model's missing parameters."""
+        import pandas as pd
         
+        try:
+            if self.water_quality_model.model:
+                if model_type == 'basic':
+                    columns = {
+                        **{name: np.full(n_rows, value) for name, value in self.BASIC_WATER_QUALITY_DEFAULTS.items()},
+                        **columns
+                    }
+                frame = pd.DataFrame(columns, copy=False)
+                start_time = time.perf_counter()
+                scores = self.water_quality_model.predict_array(frame)
+                self.registry.shadow_columns('water_quality', frame, scores, time.perf_counter() - start_time)
+                return scores
         except Exception as e:
-            logger.error(f"Error making advanced prediction: {e}")
-            raise
+            logger.warning(f"Error getting water quality scores: {e}")
+        return None
+    
+    def _anomaly_columns(self, model_type: str, model, columns: Dict[str, np.ndarray], n_rows: int) -> Optional[Dict[str, Any]]:
+        """Flag out of distribution rows of a columnar batch."""
+        detector = model.anomaly_detector
+        if detector is None:
+            return None
+        start_time = time.perf_counter()
+        X = np.column_stack([columns[name] for name in detector.feature_names])
+        is_anomaly, scores, implausible, out_of_range = detector.check_array(X)
+        
+        flagged = [
+            {
+                detector.feature_names[i]: 'implausible' if implausible[row, i] else 'out_of_range'
+                for i in np.flatnonzero(implausible[row] | out_of_range[row])
+            }
+            for row in np.flatnonzero(is_anomaly)
+        ]
+        anomaly_monitor.record_counts(model_type, n_rows, flagged, time.perf_counter() - start_time)
+        if flagged:
+            logger.warning(f"{len(flagged)} of {n_rows} {model_type} inputs look out of distribution")
+        return {'is_anomaly': is_anomaly, 'score': scores}
+    
+    def _water_quality_scores(self, rows: List[Dict[str, float]]) -> List[Optional[float]]:
+        """Get water quality scores if the model is available."""
+        try:
+            if self.water_quality_model.model:
+                return self._score('water_quality', self.water_quality_model, rows)
+        except Exception as e:
+            logger.warning(f"Error getting water quality score: {e}")
+        return [None] * len(rows)
+    
+    def _score(self, model_type: str, model, rows: List[Dict[str, float]]) -> List[Any]:
+        """Score rows with a model, handing them to the registry's shadow model if one is running."""
+        start_time = time.perf_counter()
+        outputs = model.predict_batch(rows)
+        self.registry.shadow(model_type, rows, outputs, time.perf_counter() - start_time)
+        return outputs
+    
+    def _build_result(
+        self,
+        prediction: Dict[str, Any],
+        water_quality_score: Optional[float],
+        parameter_analysis: Optional[Dict[str, Dict[str, Any]]],
+        suitable_species: List[str]
+    ) -> Dict[str, Any]:
+        """Assemble a prediction result; suitable species are kept as names until rendering."""
+        return {
+            'predicted_species': prediction['predicted_species'],
+            'confidence': prediction['confidence'],
+            'water_quality_score': water_quality_score,
+            'parameter_analysis': parameter_analysis,
+            'suitable_species': suitable_species
+        }
     
     def _analyze_parameters_basic(self, data: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
         """Analyze basic water parameters and provide status and recommendations."""
@@ -0,0 +1,355 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.serialization import dumps, loads
+from app.core.logging import logger
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    model_type TEXT NOT NULL,
+    model_version TEXT,
+    inputs TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    batch_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_model_type_id ON predictions (model_type, id);
+"""
+
+_INSERT = (
+    "INSERT INTO predictions (created_at, model_type, model_version, inputs, outputs, latency_ms, batch_size) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class _ColumnBlock:
+    """Rows of a columnar batch queued as one entry and split into rows by the writer thread."""
+
+    __slots__ = ('created_at', 'model_type', 'model_version', 'inputs', 'outputs', 'latency_ms', 'batch_size', 'n_rows')
+
+    def __init__(self, created_at, model_type, model_version, inputs, outputs, latency_ms, batch_size, n_rows):
+        self.created_at = created_at
+        self.model_type = model_type
+        self.model_version = model_version
+        self.inputs = inputs
+        self.outputs = outputs
+        self.latency_ms = latency_ms
+        # Rows of the whole call, and rows of this block
+        self.batch_size = batch_size
+        self.n_rows = n_rows
+
+    def chunks(self, size: int) -> List["_ColumnBlock"]:
+        """Split the first n_rows rows into blocks of at most `size` rows, slicing the arrays without copying them."""
+        blocks = []
+        for start in range(0, self.n_rows, size):
+            stop = min(start + size, self.n_rows)
+            blocks.append(_ColumnBlock(
+                self.created_at, self.model_type, self.model_version,
+                {name: values[start:stop] for name, values in self.inputs.items()},
+                {name: values[start:stop] for name, values in self.outputs.items()},
+                self.latency_ms, self.batch_size, stop - start
+            ))
+        return blocks
+
+    def rows(self) -> List[tuple]:
+        input_names, output_names = list(self.inputs), list(self.outputs)
+        input_rows = zip(*(self._values(self.inputs[name]) for name in input_names))
+        output_rows = zip(*(self._values(self.outputs[name]) for name in output_names))
+        return [
+            (
+                self.created_at, self.model_type, self.model_version,
+                dict(zip(input_names, row_inputs)), dict(zip(output_names, row_outputs)),
+                self.latency_ms, self.batch_size
+            )
+            for row_inputs, row_outputs in zip(input_rows, output_rows)
+        ]
+
+    def _values(self, values) -> list:
+        return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+class PredictionLog:
+    """
+    Append-only audit trail of predictions in a local SQLite database.
+
+    Requests only put records on an in-memory queue; a background thread drains it
+    and inserts them in batches of about batch_size rows, one transaction per batch.
+    The queue holds at most queue_size rows, counted until they are written.
+    Columnar batches are queued as blocks of at most batch_size rows, which are
+    split into rows on the writer thread. Rows that do not fit are dropped and
+    counted rather than making requests wait on the disk, as are rows of a failed
+    write. The database runs in WAL mode, so history queries do not block the
+    writer, and several worker processes can share one file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0
+    ):
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # Rows queued or being written, at most queue_size
+        self._pending_rows = 0
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._stopping = threading.Event()
+        self._stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'write_errors': 0,
+            'write_time': 0.0,
+            'max_queue_depth': 0,
+            'last_write_at': None
+        }
+
+    def record(
+        self,
+        model_type: str,
+        model_version: Optional[str],
+        inputs: List[Dict[str, Any]],
+        outputs: List[Dict[str, Any]],
+        latency: float
+    ) -> int:
+        """
+        Queue one entry per row of a prediction call without waiting for the disk.
+
+        Args:
+            model_type: The species model that made the predictions
+            model_version: Version of that model, if it has one
+            inputs: Model inputs of each row
+            outputs: Prediction result of each row
+            latency: Duration of the whole call in seconds
+
+        Returns:
+            Number of rows dropped because the queue was full
+        """
+        self._ensure_writer()
+        created_at = time.time()
+        latency_ms = latency * 1000
+        accepted = self._reserve(len(inputs))
+        for row_inputs, row_outputs in zip(inputs[:accepted], outputs[:accepted]):
+            self._queue.put((created_at, model_type, model_version, row_inputs, row_outputs, latency_ms, len(inputs)))
+        return len(inputs) - accepted
+
+    def record_columns(
+        self,
+        model_type: str,
+        model_version: Optional[str],
+        inputs: Dict[str, Any],
+        outputs: Dict[str, Any],
+        n_rows: int,
+        latency: float
+    ) -> int:
+        """
+        Queue a columnar batch in blocks of rows; the writer thread splits them into rows.
+
+        Args:
+            model_type: The species model that made the predictions
+            model_version: Version of that model, if it has one
+            inputs: Input name to array of values
+            outputs: Output name to array of values
+            n_rows: Number of rows in the batch
+            latency: Duration of the whole call in seconds
+
+        Returns:
+            Number of rows dropped because the queue was full
+        """
+        self._ensure_writer()
+        accepted = self._reserve(n_rows)
+        if accepted:
+            block = _ColumnBlock(time.time(), model_type, model_version, inputs, outputs, latency * 1000, n_rows, accepted)
+            for chunk in block.chunks(self.batch_size):
+                self._queue.put(chunk)
+        return n_rows - accepted
+
+    def recent(self, limit: int = 50, model_type: Optional[str] = None, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recently written entries, newest first.
+
+        Args:
+            limit: Maximum number of entries
+            model_type: Only entries of this model type
+            before_id: Only entries older than this id, for paging back through history
+
+        Returns:
+            The entries with their inputs and outputs decoded
+        """
+        if not os.path.exists(self.path):
+            return []
+        conditions, parameters = [], []
+        if model_type is not None:
+            conditions.append("model_type = ?")
+            parameters.append(model_type)
+        if before_id is not None:
+            conditions.append("id < ?")
+            parameters.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT id, created_at, model_type, model_version, inputs, outputs, latency_ms, batch_size "
+                f"FROM predictions {where} ORDER BY id DESC LIMIT ?",
+                parameters + [limit]
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return [
+            {
+                'id': row[0],
+                'created_at': row[1],
+                'model_type': row[2],
+                'model_version': row[3],
+                'inputs': loads(row[4]),
+                'outputs': loads(row[5]),
+                'latency_ms': row[6],
+                'batch_size': row[7]
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue, drop and write counters of this process, counted in rows."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._pending_rows
+        batches = stats['batches']
+        stats['queue_size'] = self.queue_size
+        stats['mean_batch_size'] = stats['written'] / batches if batches else 0.0
+        stats['mean_write_time_ms'] = stats.pop('write_time') / batches * 1000 if batches else 0.0
+        stats['path'] = self.path
+        return stats
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the writer after it has written everything already queued."""
+        if self._writer is None or self._writer_pid != os.getpid():
+            return
+        self._stopping.set()
+        self._writer.join(timeout)
+        self._writer = None
+
+    def _ensure_writer(self) -> None:
+        """Start the writer thread in this process if it is not running (e.g. after a fork)."""
+        pid = os.getpid()
+        if self._writer is not None and self._writer_pid == pid:
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == pid:
+                return
+            if self._writer_pid is not None and self._writer_pid != pid:
+                # Entries queued by the parent before forking belong to the parent
+                self._queue = queue.SimpleQueue()
+                self._pending_rows = 0
+            self._stopping.clear()
+            self._writer_pid = pid
+            self._writer = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+            self._writer.start()
+
+    def _reserve(self, n_rows: int) -> int:
+        """Take room for up to n_rows in the queue, counting the rest as dropped; returns the rows accepted."""
+        with self._lock:
+            accepted = max(0, min(n_rows, self.queue_size - self._pending_rows))
+            self._pending_rows += accepted
+            self._stats['enqueued'] += accepted
+            self._stats['dropped'] += n_rows - accepted
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._pending_rows)
+        if accepted < n_rows:
+            logger.warning(f"Prediction log queue full, dropped {n_rows - accepted} entries")
+        return accepted
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _run(self) -> None:
+        """Drain the queue in batches until stopped, then write what is left."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def _next_batch(self) -> List[Any]:
+        """Wait up to the flush interval for an entry, then take what else is queued, up to batch_size rows."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        n_rows = _entry_rows(batch[0])
+        while n_rows < self.batch_size:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(entry)
+            n_rows += _entry_rows(entry)
+        return batch
+
+    def _write(self, connection: sqlite3.Connection, batch: List[Any]) -> None:
+        start_time = time.perf_counter()
+        n_rows = sum(_entry_rows(entry) for entry in batch)
+        try:
+            entries = []
+            for entry in batch:
+                if isinstance(entry, _ColumnBlock):
+                    entries.extend(entry.rows())
+                else:
+                    entries.append(entry)
+            rows = [
+                (created_at, model_type, version, dumps(inputs).decode(), dumps(outputs).decode(), latency_ms, size)
+                for created_at, model_type, version, inputs, outputs, latency_ms, size in entries
+            ]
+            with connection:
+                connection.executemany(_INSERT, rows)
+        except Exception as e:
+            logger.error(f"Error writing {n_rows} prediction log entries: {e}")
+            with self._lock:
+                self._pending_rows -= n_rows
+                self._stats['write_errors'] += 1
+                self._stats['dropped'] += n_rows
+            return
+        with self._lock:
+            self._pending_rows -= n_rows
+            self._stats['written'] += len(rows)
+            self._stats['batches'] += 1
+            self._stats['write_time'] += time.perf_counter() - start_time
+            self._stats['last_write_at'] = time.time()
+
+
+def _entry_rows(entry: Any) -> int:
+    return entry.n_rows if isinstance(entry, _ColumnBlock) else 1
+
+
+# Prediction log shared by the whole process
+prediction_log = PredictionLog(
+    settings.PREDICTION_LOG_PATH,
+    queue_size=settings.PREDICTION_LOG_QUEUE_SIZE,
+    batch_size=settings.PREDICTION_LOG_BATCH_SIZE,
+    flush_interval=settings.PREDICTION_LOG_FLUSH_INTERVAL
+)
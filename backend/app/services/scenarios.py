@@ -0,0 +1,297 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.services.prediction import PredictionService
+from app.models.schemas import (
+    BasicFishPredictionRequest,
+    AdvancedFishPredictionRequest,
+    SweepSpec
+)
+from app.core.logging import logger
+from app.core.config import settings
+
+
+class ScenarioService:
+    """Service for what-if questions answered by scoring many variations of a reading at once."""
+
+    # Parameters a farm can change, used when a recommendation request does not list them
+    ADJUSTABLE_PARAMETERS = {
+        'basic': ['ph', 'temperature', 'turbidity'],
+        'advanced': [
+            'temperature', 'turbidity', 'dissolved_oxygen', 'bod', 'co2', 'ph', 'alkalinity',
+            'hardness', 'calcium', 'ammonia', 'nitrite', 'phosphorus', 'h2s'
+        ]
+    }
+
+    def __init__(self, prediction_service: PredictionService):
+        """Initialize with the prediction service whose models the scenarios are scored with."""
+        self.prediction_service = prediction_service
+
+    def sensitivity_sweep(self, model_type: str, base: Dict[str, float], sweeps: List[SweepSpec]) -> Dict[str, Any]:
+        """
+        Score a grid of readings that vary one or two parameters around a base reading.
+
+        The whole grid is scored with one call to the species model and one to the
+        water quality model.
+
+        Args:
+            model_type: "basic" or "advanced"
+            base: The base reading
+            sweeps: The parameters to vary and their ranges
+
+        Returns:
+            Species probabilities, predicted species and water quality scores as dense
+            arrays over the grid
+        """
+        reading = self._reading(model_type, base)
+        model = self._species_model(model_type)
+
+        parameters = [sweep.parameter for sweep in sweeps]
+        unknown = [parameter for parameter in parameters if parameter not in reading]
+        if unknown:
+            raise ValueError(f"Cannot sweep parameters the {model_type} model does not use: {unknown}")
+        if len(set(parameters)) != len(parameters):
+            raise ValueError("Each parameter can only be swept once")
+
+        axes = [np.linspace(sweep.start, sweep.stop, sweep.steps) for sweep in sweeps]
+        shape = [len(axis) for axis in axes]
+        n_points = int(np.prod(shape))
+        if n_points > settings.SWEEP_MAX_POINTS:
+            raise ValueError(f"Sweep grid has {n_points} points, more than the limit of {settings.SWEEP_MAX_POINTS}")
+
+        grid = dict(zip(parameters, (values.ravel() for values in np.meshgrid(*axes, indexing='ij'))))
+        logger.info(f"Running {model_type} sensitivity sweep over {parameters} with {n_points} points")
+
+        probabilities = model.predict_array(self._frame(reading, grid, n_points))
+        classes = model.classes
+        predicted_species = np.asarray(classes, dtype=object)[probabilities.argmax(axis=1)]
+
+        water_quality_reading = reading
+        if model_type == "basic":
+            water_quality_reading = {**PredictionService.BASIC_WATER_QUALITY_DEFAULTS, **reading}
+        water_quality_scores = self._water_quality_array(self._frame(water_quality_reading, grid, n_points))
+
+        return {
+            'model_type': model_type,
+            'parameters': parameters,
+            'axes': axes,
+            'shape': shape,
+            'classes': classes,
+            'probabilities': probabilities.reshape(shape + [len(classes)]),
+            'predicted_species': predicted_species.reshape(shape).tolist(),
+            'water_quality_score': water_quality_scores.reshape(shape) if water_quality_scores is not None else None
+        }
+
+    def recommend(
+        self,
+        model_type: str,
+        base: Dict[str, float],
+        target_species: Optional[str] = None,
+        min_water_quality: Optional[float] = None,
+        adjustable: Optional[List[str]] = None,
+        time_budget_ms: Optional[int] = None,
+        random_state: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Search for the smallest changes to a reading that reach a target species or water quality.
+
+        Changes are measured as the sum of absolute changes in standard deviations of
+        each parameter, which favours changing few parameters. Each iteration scores a
+        whole population of candidates with one call per model: random sparse changes
+        that grow until one works, then refinements of the best one found, shrunk
+        towards the current reading, until the time budget is spent.
+
+        Args:
+            model_type: "basic" or "advanced"
+            base: The current reading
+            target_species: Species the adjusted reading should be predicted as
+            min_water_quality: Lowest acceptable water quality score
+            adjustable: Parameters that may be changed
+            time_budget_ms: How long to search for, at most RECOMMEND_MAX_TIME_BUDGET_MS
+            random_state: Random seed for a reproducible search
+
+        Returns:
+            The best changes found, the outcome they lead to and search statistics
+        """
+        start_time = time.perf_counter()
+        if target_species is None and min_water_quality is None:
+            raise ValueError("Give a target species, a minimum water quality score, or both")
+
+        reading = self._reading(model_type, base)
+        model = self._species_model(model_type)
+        if target_species is not None and target_species not in model.classes:
+            raise ValueError(f"Unknown species for the {model_type} model: {target_species}")
+        if min_water_quality is not None and not self.prediction_service.water_quality_model.model:
+            raise ValueError("The water quality model is not trained yet")
+
+        names = list(reading)
+        adjustable = adjustable or self.ADJUSTABLE_PARAMETERS[model_type]
+        unknown = [parameter for parameter in adjustable if parameter not in reading]
+        if unknown:
+            raise ValueError(f"Cannot adjust parameters the {model_type} model does not use: {unknown}")
+        columns = np.array([names.index(parameter) for parameter in adjustable])
+
+        # Search in standardized units so a step means the same for every parameter
+        mean, scale = self._standardization(model, names)
+        current = np.array([reading[name] for name in names], dtype=np.float64)
+        low = np.maximum(mean - settings.RECOMMEND_MAX_STD * scale, 0.0)[columns]
+        high = (mean + settings.RECOMMEND_MAX_STD * scale)[columns]
+        low, high = np.minimum(low, current[columns]), np.maximum(high, current[columns])
+
+        water_quality_defaults = PredictionService.BASIC_WATER_QUALITY_DEFAULTS if model_type == "basic" else {}
+        target_index = model.classes.index(target_species) if target_species is not None else None
+
+        def evaluate(deltas: np.ndarray):
+            """Score the readings given by standardized changes to the adjustable parameters."""
+            candidates = np.repeat(current[None, :], len(deltas), axis=0)
+            candidates[:, columns] = np.clip(current[columns] + deltas * scale[columns], low, high)
+            varied = {name: candidates[:, i] for i, name in enumerate(names)}
+            probabilities = model.predict_array(self._frame(reading, varied, len(deltas)))
+            feasible = np.ones(len(deltas), dtype=bool)
+            if target_index is not None:
+                feasible &= probabilities.argmax(axis=1) == target_index
+            water_quality = None
+            if min_water_quality is not None:
+                water_quality_reading = {**water_quality_defaults, **reading}
+                water_quality = self.prediction_service.water_quality_model.predict_array(
+                    self._frame(water_quality_reading, varied, len(deltas))
+                )
+                feasible &= water_quality >= min_water_quality
+            # Clipping may have shortened a change, so cost what is actually applied
+            applied = (candidates[:, columns] - current[columns]) / scale[columns]
+            return applied, feasible, probabilities, water_quality
+
+        rng = np.random.default_rng(random_state)
+        budget_ms = min(time_budget_ms or settings.RECOMMEND_TIME_BUDGET_MS, settings.RECOMMEND_MAX_TIME_BUDGET_MS)
+        budget = budget_ms / 1000
+        population = settings.RECOMMEND_POPULATION
+        n_adjustable = len(columns)
+        radius = 0.25
+
+        best = None
+        evaluations = iterations = 0
+        deltas = np.zeros((1, n_adjustable))
+        while True:
+            applied, feasible, probabilities, water_quality = evaluate(deltas)
+            evaluations += len(deltas)
+            iterations += 1
+
+            if feasible.any():
+                costs = np.where(feasible, np.abs(applied).sum(axis=1), np.inf)
+                i = int(costs.argmin())
+                if best is None or costs[i] < best['distance']:
+                    best = {
+                        'delta': applied[i],
+                        'distance': float(costs[i]),
+                        'probabilities': probabilities[i],
+                        'water_quality': float(water_quality[i]) if water_quality is not None else None
+                    }
+            if best is not None and best['distance'] == 0.0:
+                break
+            if time.perf_counter() - start_time >= budget:
+                break
+
+            if best is None:
+                # Grow the search radius until some candidate reaches the goal
+                mask = rng.random((population, n_adjustable)) < rng.uniform(0.2, 1.0, (population, 1))
+                mask[np.arange(population), rng.integers(n_adjustable, size=population)] = True
+                deltas = rng.normal(size=(population, n_adjustable)) * radius * mask
+                radius = min(radius * 1.5, settings.RECOMMEND_MAX_STD * 2)
+            else:
+                # Refine around the best: jitter it, drop some of its changes, and shrink it
+                half = population // 2
+                step = max(best['distance'] / n_adjustable, 1e-3) * 0.5
+                jitter = best['delta'] + rng.normal(size=(half, n_adjustable)) * step * (best['delta'] != 0)
+                jitter *= rng.random((half, n_adjustable)) >= 0.1
+                shrink = best['delta'] * rng.uniform(0.0, 1.0, (population - half, 1))
+                deltas = np.vstack([jitter, shrink])
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        result = {
+            'found': best is not None,
+            'changes': {},
+            'distance': None,
+            'predicted_species': None,
+            'confidence': None,
+            'water_quality_score': None,
+            'evaluations': evaluations,
+            'iterations': iterations,
+            'time_budget_ms': budget_ms,
+            'elapsed_ms': elapsed_ms
+        }
+        if best is not None:
+            recommended = current.copy()
+            recommended[columns] += best['delta'] * scale[columns]
+            predicted = int(best['probabilities'].argmax())
+            result.update({
+                'changes': {
+                    name: {
+                        'current': float(current[i]),
+                        'recommended': float(recommended[i]),
+                        'change': float(recommended[i] - current[i])
+                    }
+                    for i, name in enumerate(names)
+                    if recommended[i] != current[i]
+                },
+                'distance': best['distance'],
+                'predicted_species': model.classes[predicted],
+                'confidence': float(best['probabilities'][predicted]),
+                'water_quality_score': best['water_quality']
+            })
+        logger.info(
+            f"Recommendation search {'found' if best else 'did not find'} changes after "
+            f"{evaluations} evaluations in {elapsed_ms:.0f}ms"
+        )
+        return result
+
+    def _standardization(self, model, names: List[str]):
+        """Get the training mean and standard deviation of each named feature."""
+        scaler = model.scaler
+        if scaler is None or not hasattr(scaler, 'scale_'):
+            return np.zeros(len(names)), np.ones(len(names))
+        index = [model.feature_names.index(name) for name in names]
+        return np.asarray(scaler.mean_)[index], np.asarray(scaler.scale_)[index]
+
+    def _reading(self, model_type: str, base: Dict[str, float]) -> Dict[str, float]:
+        """Validate a base reading for the model type and return the model inputs."""
+        try:
+            if model_type == "basic":
+                return self.prediction_service._basic_input(BasicFishPredictionRequest(**base))
+            if model_type == "advanced":
+                base = dict(base)
+                # Accept the model's feature name as well as the request field alias
+                if 'dissolved_oxygen' in base and 'DO' not in base:
+                    base['DO'] = base.pop('dissolved_oxygen')
+                return self.prediction_service._advanced_input(AdvancedFishPredictionRequest(**base))
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            raise ValueError(f"Invalid base reading for the {model_type} model: {problems}")
+        raise ValueError(f"Unknown model type: {model_type}")
+
+    def _species_model(self, model_type: str):
+        model = getattr(self.prediction_service, f"{model_type}_model")
+        if not model.model:
+            raise ValueError(f"The {model_type} model is not trained yet")
+        return model
+
+    def _frame(self, reading: Dict[str, float], varied: Dict[str, np.ndarray], n_rows: int):
+        """Build model input rows from a reading with some columns replaced by arrays."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            name: varied[name] if name in varied else np.full(n_rows, value)
+            for name, value in reading.items()
+        })
+
+    def _water_quality_array(self, frame) -> Optional[np.ndarray]:
+        """Score rows with the water quality model if it is available."""
+        model = self.prediction_service.water_quality_model
+        try:
+            if model.model:
+                return model.predict_array(frame)
+        except Exception as e:
+            logger.warning(f"Error getting water quality scores: {e}")
+        return None
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+import numpy as np
+
+from app.models.prediction import BasePredictionModel
+from app.core.logging import logger
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# One background thread scores every shadow model, so shadow work never competes
+# with request handling for more than a single core
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+
+class ShadowScorer:
+    """
+    Scores a sampled fraction of live traffic with a candidate model off the request path.
+
+    Requests hand over their inputs and the live model's outputs; the candidate is run
+    in a background thread and compared with them. Row, batch and columnar requests
+    are all sampled, each request counting once whatever its number of rows. When the
+    background thread falls behind, further samples are dropped rather than queued
+    without bound.
+    """
+
+    def __init__(self, model_type: str, candidate: BasePredictionModel, sample_rate: float):
+        """
+        Args:
+            model_type: The model type being shadowed
+            candidate: The candidate model, already loaded
+            sample_rate: Fraction of requests to score with the candidate, between 0 and 1
+        """
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("Shadow sample rate must be greater than 0 and at most 1")
+        self.model_type = model_type
+        self.candidate = candidate
+        self.version = candidate.model_info.get('version')
+        self.sample_rate = sample_rate
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            'requests': 0,
+            'sampled': 0,
+            'dropped': 0,
+            'errors': 0,
+            'rows': 0,
+            'agreements': 0,
+            'abs_error_sum': 0.0,
+            'primary_latency_sum': 0.0,
+            'candidate_latency_sum': 0.0
+        }
+
+    def submit(self, rows: List[Dict[str, float]], primary_outputs: List[Any], primary_latency: float) -> None:
+        """Sample a request for shadow scoring; returns immediately."""
+        if self._sample():
+            _executor.submit(self._score, rows, primary_outputs, primary_latency)
+
+    def submit_columns(self, frame: "pd.DataFrame", primary_outputs: Any, primary_latency: float) -> None:
+        """
+        Sample a columnar request for shadow scoring; returns immediately.
+
+        primary_outputs holds the live model's predicted class, or value for regression
+        models, of each row of the DataFrame.
+        """
+        if self._sample():
+            _executor.submit(self._score_columns, frame, primary_outputs, primary_latency)
+
+    def _sample(self) -> bool:
+        """Count a request and decide whether to score it; reserves a pending slot if so."""
+        with self._lock:
+            self._stats['requests'] += 1
+            if random.random() >= self.sample_rate:
+                return False
+            if self._pending >= settings.SHADOW_MAX_PENDING:
+                self._stats['dropped'] += 1
+                return False
+            self._pending += 1
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        """Get the agreement and latency of the candidate against the live model so far."""
+        with self._lock:
+            stats = dict(self._stats)
+            pending = self._pending
+
+        scored = stats['sampled']
+        rows = stats['rows']
+        report = {
+            'model_type': self.model_type,
+            'candidate_version': self.version,
+            'sample_rate': self.sample_rate,
+            'started_at': self.started_at,
+            'requests_seen': stats['requests'],
+            'requests_scored': scored,
+            'requests_dropped': stats['dropped'],
+            'requests_pending': pending,
+            'errors': stats['errors'],
+            'rows_compared': rows,
+            'agreement_rate': stats['agreements'] / rows if rows else None,
+            'primary_mean_latency_ms': stats['primary_latency_sum'] / scored * 1000 if scored else None,
+            'candidate_mean_latency_ms': stats['candidate_latency_sum'] / scored * 1000 if scored else None
+        }
+        if self.candidate.TASK == 'regression':
+            # Regression outputs agree when within SHADOW_REGRESSION_TOLERANCE of each other
+            report['mean_absolute_difference'] = stats['abs_error_sum'] / rows if rows else None
+        return report
+
+    def _score(self, rows: List[Dict[str, float]], primary_outputs: List[Any], primary_latency: float) -> None:
+        """Run the candidate on a sampled request and record how it compares."""
+        def candidate_outputs():
+            outputs = self.candidate.predict_batch(rows)
+            if self.candidate.TASK == 'classification':
+                return [output['predicted_species'] for output in outputs]
+            return outputs
+
+        if self.candidate.TASK == 'classification':
+            primary_outputs = [output['predicted_species'] for output in primary_outputs]
+        self._compare(candidate_outputs, primary_outputs, primary_latency)
+
+    def _score_columns(self, frame: "pd.DataFrame", primary_outputs: Any, primary_latency: float) -> None:
+        """Run the candidate on a sampled columnar request and record how it compares."""
+        def candidate_outputs():
+            if self.candidate.TASK == 'classification':
+                return self.candidate.predict_labels(frame)[0]
+            return self.candidate.predict_array(frame)
+
+        self._compare(candidate_outputs, primary_outputs, primary_latency)
+
+    def _compare(self, candidate_outputs: Callable[[], Any], primary_outputs: Any, primary_latency: float) -> None:
+        """Time the candidate, compare its outputs with the live model's and record the result."""
+        try:
+            start_time = time.perf_counter()
+            candidate = np.asarray(candidate_outputs())
+            candidate_latency = time.perf_counter() - start_time
+            primary = np.asarray(primary_outputs)
+
+            if self.candidate.TASK == 'classification':
+                agreements = int((primary == candidate).sum())
+                abs_error = 0.0
+            else:
+                differences = np.abs(primary.astype(np.float64) - candidate.astype(np.float64))
+                agreements = int((differences <= settings.SHADOW_REGRESSION_TOLERANCE).sum())
+                abs_error = float(differences.sum())
+
+            with self._lock:
+                self._stats['sampled'] += 1
+                self._stats['rows'] += len(primary)
+                self._stats['agreements'] += agreements
+                self._stats['abs_error_sum'] += abs_error
+                self._stats['primary_latency_sum'] += primary_latency
+                self._stats['candidate_latency_sum'] += candidate_latency
+        except Exception as e:
+            logger.warning(f"Shadow scoring of {self.model_type} model failed: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
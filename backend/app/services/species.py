@@ -0,0 +1,102 @@
+from functools import lru_cache
+from typing import Dict, List
+
+from app.core.serialization import dumps, join_array
+from app.models.schemas import FishSpeciesInfo
+
+
+class SpeciesCatalog:
+    """Static fish species information with JSON fragments serialized once at load time."""
+
+    def __init__(self, species: Dict[str, FishSpeciesInfo]):
+        """Build the catalog and pre-serialize every species entry."""
+        self.species = species
+        self.fragments = {
+            name: dumps(info.model_dump())
+            for name, info in species.items()
+        }
+        self.catalog_json = join_array(self.fragments.values())
+
+    def get(self, name: str) -> FishSpeciesInfo:
+        """Get the information for a species, falling back to a bare entry."""
+        return self.species.get(name, FishSpeciesInfo(name=name))
+
+    def fragment(self, name: str) -> bytes:
+        """Get the serialized JSON for a species."""
+        fragment = self.fragments.get(name)
+        if fragment is None:
+            fragment = dumps(FishSpeciesInfo(name=name).model_dump())
+        return fragment
+
+    def fragments_for(self, names: List[str]) -> bytes:
+        """Get a serialized JSON array of the given species."""
+        return join_array(self.fragment(name) for name in names)
+
+
+def _default_species() -> Dict[str, FishSpeciesInfo]:
+    """Initialize information about fish species."""
+    # This could be loaded from a database or external file
+    return {
+        "Tilapia": FishSpeciesInfo(
+            name="Tilapia",
+            scientific_name="Oreochromis niloticus",
+            ideal_ph_range=[6.5, 8.0],
+            ideal_temperature_range=[25.0, 30.0],
+            ideal_turbidity_range=[30.0, 80.0],
+            description="Tilapia is a hardy fish that can tolerate a wide range of water conditions. It's popular in aquaculture due to its fast growth rate and adaptability."
+        ),
+        "Catfish": FishSpeciesInfo(
+            name="Catfish",
+            scientific_name="Clarias gariepinus",
+            ideal_ph_range=[6.0, 8.0],
+            ideal_temperature_range=[24.0, 28.0],
+            ideal_turbidity_range=[20.0, 60.0],
+            description="Catfish are bottom-dwelling fish that can tolerate low oxygen levels and poor water quality. They are widely farmed for their high-quality meat."
+        ),
+        "Carp": FishSpeciesInfo(
+            name="Carp",
+            scientific_name="Cyprinus carpio",
+            ideal_ph_range=[6.5, 9.0],
+            ideal_temperature_range=[20.0, 28.0],
+            ideal_turbidity_range=[30.0, 70.0],
+            description="Carp is one of the most widely cultivated freshwater fish. It's tolerant of poor water conditions and can survive in water with low oxygen levels."
+        ),
+        "Salmon": FishSpeciesInfo(
+            name="Salmon",
+            scientific_name="Salmo salar",
+            ideal_ph_range=[6.5, 8.0],
+            ideal_temperature_range=[10.0, 16.0],
+            ideal_turbidity_range=[5.0, 20.0],
+            description="Salmon require clean, cold, oxygen-rich water. They are sensitive to water quality changes and need pristine conditions for optimal growth."
+        ),
+        "Trout": FishSpeciesInfo(
+            name="Trout",
+            scientific_name="Oncorhynchus mykiss",
+            ideal_ph_range=[6.5, 8.0],
+            ideal_temperature_range=[12.0, 18.0],
+            ideal_turbidity_range=[5.0, 25.0],
+            description="Trout are cold-water fish that require high-quality water with good oxygen levels. They're sensitive to pollution and temperature changes."
+        ),
+        "Shrimp": FishSpeciesInfo(
+            name="Shrimp",
+            scientific_name="Litopenaeus vannamei",
+            ideal_ph_range=[7.0, 8.5],
+            ideal_temperature_range=[26.0, 32.0],
+            ideal_turbidity_range=[30.0, 60.0],
+            description="Shrimp are highly sensitive to water quality parameters. They require stable conditions with careful management of ammonia and nitrite levels."
+        ),
+        "Goldfish": FishSpeciesInfo(
+            name="Goldfish",
+            scientific_name="Carassius auratus",
+            ideal_ph_range=[6.0, 8.0],
+            ideal_temperature_range=[20.0, 25.0],
+            ideal_turbidity_range=[20.0, 50.0],
+            description="Goldfish are hardy freshwater fish that can adapt to various water conditions. They're popular ornamental fish and can tolerate cooler temperatures."
+        )
+    }
+
+
+@lru_cache(maxsize=1)
+def get_species_catalog() -> SpeciesCatalog:
+    """Get the process-wide species catalog, building it on first use."""
+    return SpeciesCatalog(_default_species())
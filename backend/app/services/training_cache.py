@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+from app.models.prediction import BasePredictionModel, _atomic_write
+from app.core.serialization import dumps, loads
+from app.core.logging import logger
+from app.core.config import settings
+
+# Not a .json file, which would be listed as a version's metadata
+CACHE_FILE = 'TRAINING_CACHE'
+
+
+class TrainingCache:
+    """
+    Content-addressed index of training runs, so an identical run can reuse its saved version.
+
+    A run is identified by a hash of the dataset's contents, the model class and its
+    estimator hyperparameters, the training options and the settings that affect
+    training. The index lives next to each model type's saved versions and maps that
+    hash to the version the run produced and the result it returned. Entries whose
+    version has been pruned are treated as misses. Changes to the training code itself
+    are not detected; retrain with force for those.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Dataset digests by path, reused while the file's size and mtime are unchanged
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+
+    def key(self, model_class: Type[BasePredictionModel], options: Dict[str, Any]) -> str:
+        """
+        Hash everything that determines the outcome of a training run.
+
+        Args:
+            model_class: The model class being trained
+            options: Training options such as test_size, random_state and compact
+
+        Returns:
+            Hex SHA-256 of the run's inputs
+        """
+        fingerprint = {
+            'model_class': model_class.__name__,
+            'estimator_params': model_class.ESTIMATOR_PARAMS,
+            'dataset_sha256': self.dataset_digest(model_class.DEFAULT_DATA_PATH),
+            'options': options,
+            'settings': {
+                name: getattr(settings, name)
+                for name in sorted(type(settings).model_fields)
+                if name.startswith(('ANOMALY_', 'CV_'))
+                or (options.get('compact') and name.startswith('COMPACT_'))
+                or (options.get('streaming') and name.startswith('STREAMING_'))
+            }
+        }
+        return hashlib.sha256(dumps(fingerprint)).hexdigest()
+
+    def dataset_digest(self, path: str) -> str:
+        """SHA-256 of a dataset file's contents, recomputed only when the file changes."""
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+    def lookup(self, model: BasePredictionModel, key: str) -> Optional[Dict[str, Any]]:
+        """Get the result of an earlier identical run whose version is still saved."""
+        entry = self._read(model).get(key)
+        if entry is None:
+            return None
+        if not os.path.exists(os.path.join(model.versions_dir, f"{entry['version']}.pkl")):
+            return None
+        return entry
+
+    def store(self, model: BasePredictionModel, key: str, result: Dict[str, Any]) -> None:
+        """Record the version and result of a finished training run."""
+        with self._lock:
+            entries = self._read(model)
+            entries[key] = {'version': result['version'], 'result': result}
+            # Forget runs whose versions have been pruned
+            entries = {
+                entry_key: entry for entry_key, entry in entries.items()
+                if os.path.exists(os.path.join(model.versions_dir, f"{entry['version']}.pkl"))
+            }
+            try:
+                _atomic_write(self._path(model), dumps(entries))
+            except OSError as e:
+                logger.warning(f"Error writing the training cache: {e}")
+
+    def _read(self, model: BasePredictionModel) -> Dict[str, Any]:
+        try:
+            with open(self._path(model), 'rb') as f:
+                return loads(f.read())
+        except (OSError, ValueError):
+            return {}
+
+    def _path(self, model: BasePredictionModel) -> str:
+        return os.path.join(model.versions_dir, CACHE_FILE)
+
+
+# Cache shared by the whole process
+training_cache = TrainingCache()
@@ -0,0 +1,75 @@
+"""
+Shared fixtures.
+
+Settings are read from the environment when app.core.config is first imported, so
+model files, versions and the prediction log are pointed at a temporary directory
+here, before any test imports the app. The bundled datasets are used as they are.
+"""
+import os
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="fish-habitat-tests-")
+
+os.environ.update({
+    "BASIC_MODEL_PATH": os.path.join(WORK_DIR, "models", "basic_fish_prediction_model.pkl"),
+    "ADVANCED_MODEL_PATH": os.path.join(WORK_DIR, "models", "advanced_fish_prediction_model.pkl"),
+    "WATER_QUALITY_MODEL_PATH": os.path.join(WORK_DIR, "models", "water_quality_model.pkl"),
+    "MODEL_VERSIONS_PATH": os.path.join(WORK_DIR, "models", "versions"),
+    "PREDICTION_LOG_PATH": os.path.join(WORK_DIR, "predictions.db"),
+    "REAL_FISH_DATASET": os.path.join(BACKEND_DIR, "data", "raw", "realfishdataset.csv"),
+    "WATER_QUALITY_DATASET": os.path.join(BACKEND_DIR, "data", "raw", "WQD_with_Fish_Species_v2.csv"),
+    "LOG_LEVEL": "WARNING"
+})
+
+
+@pytest.fixture(scope="session")
+def trained_models():
+    """
+    Every model type trained once on the bundled datasets and published as the live model.
+
+    The scaler is not folded, so the models are the scikit-learn estimators behind a
+    StandardScaler. Tests that change a model should work on a copy.
+    """
+    from app.models.prediction import BasicFishPredictionModel, AdvancedFishPredictionModel, WaterQualityModel
+
+    models = {}
+    for model_type, model_class in (
+        ('basic', BasicFishPredictionModel),
+        ('advanced', AdvancedFishPredictionModel),
+        ('water_quality', WaterQualityModel)
+    ):
+        model = model_class()
+        model.train(fold_scaler=False)
+        models[model_type] = model
+    return models
+
+
+@pytest.fixture(scope="session")
+def datasets(trained_models):
+    """Unscaled features and targets of the bundled dataset each model type is trained on."""
+    import pandas as pd
+
+    data = {}
+    for model_type, model in trained_models.items():
+        df = pd.read_csv(model.DEFAULT_DATA_PATH).dropna().rename(columns=model.COLUMN_MAPPING)
+        data[model_type] = (df[model.feature_names].to_numpy(dtype=float), df[model.target_name].to_numpy())
+    return data
+
+
+@pytest.fixture(scope="session")
+def plausible_datasets(trained_models, datasets):
+    """The dataset rows an API request accepts: every feature within its plausible sensor range."""
+    import numpy as np
+    from app.models.anomaly import PLAUSIBLE_RANGES
+
+    data = {}
+    for model_type, (X, y) in datasets.items():
+        names = trained_models[model_type].feature_names
+        low = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[0] for name in names])
+        high = np.array([PLAUSIBLE_RANGES.get(name, (0.0, np.inf))[1] for name in names])
+        keep = ((X >= low) & (X <= high)).all(axis=1)
+        data[model_type] = (X[keep], y[keep])
+    return data
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import admission
+from app.core.admission import ConcurrencyLimiter, admission_stats
+from app.core.config import settings
+from app.main import app
+from app.models.schemas import BasicFishPredictionRequest
+
+API = settings.API_V1_STR
+BASIC_READING = BasicFishPredictionRequest.model_config['json_schema_extra']['example']
+
+
+def _wait_for(condition, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        time.sleep(0.01)
+
+
+def test_predictions_are_served_while_a_model_trains(trained_models):
+    """Training runs off the event loop, so predictions finish and excess training is shed meanwhile."""
+    with TestClient(app) as client:
+        training = {}
+
+        def train():
+            training['response'] = client.post(
+                f"{API}/train", json={"model_type": "advanced", "force": True, "activate": False}
+            )
+
+        trainer = threading.Thread(target=train)
+        trainer.start()
+        try:
+            _wait_for(lambda: admission_stats()['classes']['train']['active'] == 1)
+            time.sleep(0.5)
+
+            start_time = time.perf_counter()
+            prediction = client.post(f"{API}/predict/basic", json=BASIC_READING)
+            prediction_time = time.perf_counter() - start_time
+            health = client.get("/health")
+            second_training = client.post(f"{API}/train", json={"model_type": "basic", "force": True})
+
+            assert trainer.is_alive(), "Training finished before the checks; they prove nothing"
+            assert prediction.status_code == 200
+            assert prediction.json()['predicted_species']
+            assert prediction_time < 5.0
+            assert health.status_code == 200
+            # Only one training run at a time, and no queue: shed immediately
+            assert second_training.status_code == 503
+            assert int(second_training.headers['retry-after']) >= 1
+        finally:
+            trainer.join()
+        assert training['response'].status_code == 200
+
+
+async def _settle() -> None:
+    """Let woken tasks run until they block again."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_in_order_as_slots_free():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, queue_size=2, queue_timeout=5.0)
+        assert await limiter.acquire()
+        admitted = []
+
+        async def wait(name):
+            assert await limiter.acquire()
+            admitted.append(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in ("first", "second")]
+        await _settle()
+        assert limiter.queue_length == 2
+        # The queue is full, so the next request is shed without waiting
+        assert not await limiter.acquire()
+
+        limiter.release(0.01)
+        await _settle()
+        # The slot is handed over, so the count of running requests does not drop
+        assert admitted == ["first"] and limiter.active == 1
+        limiter.release(0.01)
+        await asyncio.gather(*waiters)
+        assert admitted == ["first", "second"] and limiter.active == 1
+        limiter.release(0.01)
+        assert limiter.active == 0 and limiter.queue_length == 0
+        return limiter.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot['admitted'] == 3 and snapshot['queued'] == 2
+    assert snapshot['rejected'] == 1 and snapshot['max_queue_length'] == 2
+
+
+def test_waiters_give_up_after_the_queue_timeout():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, queue_size=4, queue_timeout=0.05)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.queue_length == 0
+
+        # A cancelled waiter leaves the queue without taking the slot
+        waiter = asyncio.create_task(limiter.acquire())
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queue_length == 0
+
+        limiter.release(0.5)
+        assert limiter.active == 0
+        assert await limiter.acquire()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.stats['timed_out'] == 1
+    assert limiter.snapshot()['mean_wait_ms'] >= 50 / 2
+    assert limiter.retry_after() == 1
+
+
+def test_a_slot_handed_over_as_the_wait_times_out_goes_to_the_next_waiter(monkeypatch):
+    real_wait_for = asyncio.wait_for
+    race = {'pending': True}
+
+    async def wait_for(awaitable, timeout):
+        if not race['pending']:
+            return await real_wait_for(awaitable, timeout)
+        race['pending'] = False
+        await race['go'].wait()
+        # The slot arrives just as the wait runs out
+        race['limiter'].release(0.01)
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, 'wait_for', wait_for)
+
+    async def scenario():
+        race['go'] = asyncio.Event()
+        limiter = race['limiter'] = ConcurrencyLimiter("test", limit=1, queue_size=4, queue_timeout=5.0)
+        assert await limiter.acquire()
+        late = asyncio.create_task(limiter.acquire())
+        await _settle()
+        next_waiter = asyncio.create_task(limiter.acquire())
+        await _settle()
+        race['go'].set()
+        return limiter, await late, await next_waiter
+
+    limiter, late, next_waiter = asyncio.run(scenario())
+    assert late is False and next_waiter is True
+    assert limiter.active == 1 and limiter.queue_length == 0
+    assert limiter.stats['timed_out'] == 1
+
+
+def test_shed_requests_carry_cors_headers(trained_models, monkeypatch):
+    """A request shed by admission control is still readable by a browser on an allowed origin."""
+    limiter = admission._limiters['batch']
+    monkeypatch.setattr(limiter, 'limit', 0)
+    monkeypatch.setattr(limiter, 'queue_size', 0)
+    origin = settings.ALLOWED_ORIGINS[0]
+
+    with TestClient(app) as client:
+        response = client.post(
+            f"{API}/predict/basic/batch", json={"readings": [BASIC_READING]}, headers={"Origin": origin}
+        )
+
+    assert response.status_code == 503
+    assert int(response.headers['retry-after']) >= 1
+    assert response.headers['access-control-allow-origin'] == origin
+    exposed = {name.strip().lower() for name in response.headers['access-control-expose-headers'].split(",")}
+    assert {"retry-after", "x-request-id", "etag"} <= exposed
+    assert response.headers['x-request-id']
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.anomaly import AnomalyDetector
+from app.services.monitoring import anomaly_monitor
+
+API = settings.API_V1_STR
+FEATURES = ['temperature', 'ph', 'ammonia']
+
+
+@pytest.fixture(scope="module")
+def training_rows():
+    """Correlated readings: pH rises with temperature."""
+    rng = np.random.default_rng(0)
+    temperature = rng.normal(25.0, 3.0, 20000)
+    ph = 7.0 + 0.1 * (temperature - 25.0) + rng.normal(0.0, 0.05, 20000)
+    ammonia = rng.gamma(2.0, 0.05, 20000)
+    return np.column_stack([temperature, ph, ammonia])
+
+
+def test_detector_flags_each_kind_of_anomaly(training_rows):
+    detector = AnomalyDetector.fit(training_rows, FEATURES, contamination=0.01)
+
+    is_anomaly, scores, _, _ = detector.check_array(training_rows)
+    assert 0.005 < is_anomaly.mean() < 0.02
+    assert (scores <= 1.0).mean() >= 0.99
+
+    results = detector.check([
+        {'temperature': 25.0, 'ph': 7.0, 'ammonia': 0.1},
+        {'temperature': 60.0, 'ph': 7.0, 'ammonia': 0.1},
+        {'temperature': 25.0, 'ph': 7.0, 'ammonia': 5.0},
+        # Both values are common, but not together
+        {'temperature': 30.0, 'ph': 6.5, 'ammonia': 0.1}
+    ])
+    normal, implausible, out_of_range, unusual = results
+    assert not normal['is_anomaly'] and normal['features'] == {}
+    assert implausible['is_anomaly'] and implausible['features'] == {'temperature': 'implausible'}
+    assert out_of_range['is_anomaly'] and out_of_range['features'] == {'ammonia': 'out_of_range'}
+    assert unusual['is_anomaly'] and unusual['features'] == {} and unusual['score'] > 1.0
+
+
+def test_detector_ignores_implausible_training_rows(training_rows):
+    """Sensor glitches in the training data do not widen the accepted range."""
+    glitched = np.vstack([training_rows, [[99.0, 7.0, 0.1]] * 50])
+    detector = AnomalyDetector.fit(glitched, FEATURES)
+    clean = AnomalyDetector.fit(training_rows, FEATURES)
+
+    np.testing.assert_array_equal(detector.high, clean.high)
+    assert detector.threshold == clean.threshold
+
+
+def test_check_matches_check_array(training_rows):
+    detector = AnomalyDetector.fit(training_rows, FEATURES)
+    X = np.vstack([training_rows[:200], [[60.0, 7.0, 0.1], [25.0, 7.0, 5.0]]])
+
+    results = detector.check([dict(zip(FEATURES, row)) for row in X])
+    is_anomaly, scores, implausible, out_of_range = detector.check_array(X)
+
+    assert [result['is_anomaly'] for result in results] == is_anomaly.tolist()
+    np.testing.assert_allclose([result['score'] for result in results], scores)
+    assert [bool(result['features']) for result in results] == (implausible | out_of_range).any(axis=1).tolist()
+
+
+def test_predictions_report_anomalies(trained_models, datasets):
+    model = trained_models['basic']
+    reading = dict(zip(model.feature_names, np.median(datasets['basic'][0], axis=0)))
+    before = anomaly_monitor.report('basic').get('basic', {'rows_checked': 0, 'rows_flagged': 0})
+    with TestClient(app) as client:
+        normal = client.post(f"{API}/predict/basic", json=reading)
+        glitch = client.post(f"{API}/predict/basic", json={**reading, "temperature": 80.0})
+    after = anomaly_monitor.report('basic')['basic']
+
+    assert normal.status_code == glitch.status_code == 200
+    assert not normal.json()['anomaly']['is_anomaly']
+    assert normal.json()['anomaly']['features'] == {}
+    assert glitch.json()['anomaly']['is_anomaly']
+    assert glitch.json()['anomaly']['features'] == {'temperature': 'implausible'}
+    assert after['rows_checked'] - before['rows_checked'] == 2
+    assert after['rows_flagged'] - before['rows_flagged'] == 1
+    assert after['feature_flags']['temperature:implausible'] >= 1
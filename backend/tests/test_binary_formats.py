@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.binary_formats import (
+    ARROW_STREAM, JSON, MSGPACK, UnsupportedMediaType, decode_columns, request_format, response_format
+)
+from app.core.config import settings
+from app.main import app
+from app.models.columnar import ADVANCED_FEATURES, BASIC_FEATURES, parse_columns
+
+# Both formats are optional dependencies
+pa = pytest.importorskip("pyarrow")
+msgpack = pytest.importorskip("msgpack")
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture(scope="module")
+def client(trained_models):
+    with TestClient(app) as client:
+        yield client
+
+
+def _payload(X: np.ndarray, features):
+    return {name: X[:, i].tolist() for i, name in enumerate(features)}
+
+
+def _arrow_body(columns) -> bytes:
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_arrow_and_msgpack_bodies_round_trip(client, plausible_datasets):
+    """Binary bodies and responses carry the same results as JSON."""
+    X = plausible_datasets['advanced'][0][:200]
+    payload = _payload(X, ADVANCED_FEATURES)
+    site_ids = [f"site-{i}" for i in range(len(X))]
+    expected = client.post(f"{API}/predict/advanced/columnar", json={**payload, 'site_ids': site_ids}).json()
+
+    arrow = client.post(
+        f"{API}/predict/advanced/columnar",
+        content=_arrow_body({**{name: X[:, i] for i, name in enumerate(ADVANCED_FEATURES)}, 'site_ids': site_ids}),
+        headers={'content-type': ARROW_STREAM, 'accept': ARROW_STREAM}
+    )
+    assert arrow.status_code == 200
+    assert arrow.headers['content-type'] == ARROW_STREAM
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.column('site_id').to_pylist() == site_ids
+    assert table.column('predicted_species').to_pylist() == expected['predicted_species']
+    np.testing.assert_allclose(table.column('confidence').to_numpy(), expected['confidence'])
+    for name in expected['classes']:
+        np.testing.assert_allclose(table.column(f"probability_{name}").to_numpy(), expected['probabilities'][name])
+    assert table.column('is_anomaly').to_pylist() == expected['anomaly']['is_anomaly']
+
+    # MessagePack columns may be arrays of numbers or float64 blobs
+    body = {name: X[:, i].astype('<f8').tobytes() for i, name in enumerate(ADVANCED_FEATURES)}
+    body['temperature'] = X[:, 0].tolist()
+    packed = client.post(
+        f"{API}/predict/advanced/columnar",
+        content=msgpack.packb(body),
+        headers={'content-type': 'application/x-msgpack', 'accept': MSGPACK}
+    )
+    assert packed.status_code == 200
+    result = msgpack.unpackb(packed.content, raw=False)
+    assert result['predicted_species'] == expected['predicted_species']
+    np.testing.assert_allclose(result['confidence'], expected['confidence'])
+    np.testing.assert_allclose(result['water_quality_score'], expected['water_quality_score'])
+
+
+def test_binary_columns_are_read_without_copying():
+    values = np.linspace(6.0, 8.0, 1000)
+    arrow = decode_columns(_arrow_body({'ph': values}), ARROW_STREAM)['ph']
+    blob = decode_columns(msgpack.packb({'ph': values.tobytes()}), MSGPACK)['ph']
+
+    np.testing.assert_array_equal(arrow, values)
+    np.testing.assert_array_equal(blob, values)
+    # Views of the body are read-only; a copy would be writeable
+    assert not arrow.flags.writeable and not blob.flags.writeable
+    columns, _ = parse_columns({'ph': blob, 'temperature': blob * 3, 'turbidity': blob}, BASIC_FEATURES, 1000)
+    assert np.shares_memory(columns['ph'], blob)
+
+
+def test_body_and_response_negotiation(client):
+    assert response_format(None) == JSON
+    assert response_format("application/msgpack;q=0.5, application/vnd.apache.arrow.stream;q=0.9") == ARROW_STREAM
+    assert response_format("application/msgpack;q=0") == JSON
+    assert response_format("text/html, application/vnd.msgpack") == MSGPACK
+    assert request_format("application/json; charset=utf-8") == JSON
+    with pytest.raises(UnsupportedMediaType):
+        request_format("text/csv")
+
+    unsupported = client.post(f"{API}/predict/basic/columnar", content=b"ph\n7", headers={'content-type': 'text/csv'})
+    broken_arrow = client.post(f"{API}/predict/basic/columnar", content=b"nope", headers={'content-type': ARROW_STREAM})
+    blob = client.post(
+        f"{API}/predict/basic/columnar",
+        content=msgpack.packb({'ph': b"1234567", 'temperature': [20.0], 'turbidity': [30.0]}),
+        headers={'content-type': MSGPACK}
+    )
+    assert unsupported.status_code == 415
+    assert broken_arrow.status_code == 400 and "Arrow" in broken_arrow.json()['detail']
+    assert blob.status_code == 400 and "float64" in blob.json()['detail']
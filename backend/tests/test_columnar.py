@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.columnar import ADVANCED_FEATURES, BASIC_FEATURES, parse_columns
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture(scope="module")
+def client(trained_models):
+    with TestClient(app) as client:
+        yield client
+
+
+def _payload(X: np.ndarray, features):
+    return {name: X[:, i].tolist() for i, name in enumerate(features)}
+
+
+def test_parse_columns_validates_whole_arrays():
+    ph = np.array([7.0, 7.5])
+    columns, site_ids = parse_columns(
+        {'ph': ph, 'temperature': [20, 21], 'turbidity': [30.0, 40.0], 'site_ids': ["a", "b"]}, BASIC_FEATURES, 10
+    )
+    assert np.shares_memory(columns['ph'], ph)
+    assert columns['temperature'].dtype == np.float64
+    assert site_ids == ["a", "b"]
+
+    advanced = {name: [1.0] for name in ADVANCED_FEATURES if name != 'dissolved_oxygen'}
+    columns, _ = parse_columns({**advanced, 'DO': [6.0]}, ADVANCED_FEATURES, 10)
+    assert columns['dissolved_oxygen'].tolist() == [6.0]
+
+    invalid = [
+        ({'ph': [7.0], 'temperature': [20.0]}, "turbidity: missing"),
+        ({'ph': [7.0, 7.0], 'temperature': [20.0], 'turbidity': [30.0]}, "same length"),
+        ({'ph': ["7"], 'temperature': [20.0], 'turbidity': [30.0]}, "ph: must be an array of numbers"),
+        ({'ph': [True], 'temperature': [20.0], 'turbidity': [30.0]}, "ph: must be an array of numbers"),
+        ({'ph': [7.0, 15.0], 'temperature': [20.0, float('nan')], 'turbidity': [30.0, 30.0]},
+         "ph: 1 values are not finite"),
+        ({'ph': [7.0] * 11, 'temperature': [20.0] * 11, 'turbidity': [30.0] * 11}, "more than the limit of 10"),
+        ({'ph': [7.0], 'temperature': [20.0], 'turbidity': [30.0], 'site_ids': ["a", "b"]}, "site_ids: has 2 values"),
+        ([1, 2, 3], "must be an object")
+    ]
+    for payload, message in invalid:
+        with pytest.raises(ValueError, match=message):
+            parse_columns(payload, BASIC_FEATURES, 10)
+
+
+def test_columnar_results_match_row_batches(client, plausible_datasets):
+    X = plausible_datasets['basic'][0][:50]
+    readings = [dict(zip(BASIC_FEATURES, row)) for row in X]
+    site_ids = [f"site-{i}" for i in range(len(X))]
+
+    columnar = client.post(f"{API}/predict/basic/columnar", json={**_payload(X, BASIC_FEATURES), 'site_ids': site_ids})
+    rows = client.post(f"{API}/predict/basic/batch", json={'readings': readings})
+
+    assert columnar.status_code == rows.status_code == 200
+    columns, predictions = columnar.json(), rows.json()['predictions']
+    assert columns['count'] == len(X)
+    assert columns['site_ids'] == site_ids
+    assert columns['predicted_species'] == [prediction['predicted_species'] for prediction in predictions]
+    np.testing.assert_allclose(columns['confidence'], [prediction['confidence'] for prediction in predictions])
+    np.testing.assert_allclose(
+        columns['water_quality_score'], [prediction['water_quality_score'] for prediction in predictions]
+    )
+    assert columns['anomaly']['is_anomaly'] == [prediction['anomaly']['is_anomaly'] for prediction in predictions]
+    probabilities = np.column_stack([columns['probabilities'][name] for name in columns['classes']])
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+
+
+def test_labels_only_columnar_batch(client, plausible_datasets):
+    X = plausible_datasets['advanced'][0][:500]
+    payload = _payload(X, ADVANCED_FEATURES)
+
+    full = client.post(f"{API}/predict/advanced/columnar", json=payload).json()
+    labels = client.post(f"{API}/predict/advanced/columnar", params={'labels_only': True}, json=payload).json()
+
+    assert labels['predicted_species'] == full['predicted_species']
+    assert labels['confidence'] is None and labels['probabilities'] is None
+    assert labels['early_exit']['mean_stages'] <= labels['early_exit']['n_stages']
+
+
+def test_invalid_columnar_batches_are_rejected(client):
+    bad_range = client.post(f"{API}/predict/basic/columnar", json={'ph': [7.0, 20.0], 'temperature': [20, 20], 'turbidity': [30, 30]})
+    not_json = client.post(f"{API}/predict/basic/columnar", content=b"{", headers={'content-type': 'application/json'})
+
+    assert bad_range.status_code == 400
+    assert "ph: 1 values are not finite or outside [0.0, 14.0] (rows 1)" in bad_range.json()['detail']
+    assert not_json.status_code == 400
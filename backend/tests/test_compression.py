@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.config import settings
+from app.main import app
+from app.models.schemas import BasicFishPredictionRequest
+from app.services.model_trainer import ModelTrainingService
+
+API = settings.API_V1_STR
+BASIC_READING = BasicFishPredictionRequest.model_config['json_schema_extra']['example']
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0, *", None),
+    ("gzip;q=abc", None),
+    ("deflate, identity", None),
+    ("", None),
+    (None, None),
+    ("*", "gzip"),
+    ("br", None),
+    ("br, gzip;q=0.1", "gzip"),
+])
+def test_negotiation_without_brotli(without_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("*", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0.2", "gzip"),
+    ("br;q=0, *", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+])
+def test_negotiation_with_brotli(header, expected):
+    pytest.importorskip("brotli")
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.fixture(scope="module")
+def client(trained_models):
+    with TestClient(app) as client:
+        yield client
+
+
+def _batch(n: int):
+    return {"readings": [BASIC_READING] * n}
+
+
+def test_large_responses_are_gzipped(client, without_brotli):
+    plain = client.post(f"{API}/predict/basic/batch", json=_batch(50), headers={"Accept-Encoding": "identity"})
+    gzipped = client.post(f"{API}/predict/basic/batch", json=_batch(50), headers={"Accept-Encoding": "gzip"})
+    refused = client.post(f"{API}/predict/basic/batch", json=_batch(50), headers={"Accept-Encoding": "gzip;q=0"})
+    small = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert 'content-encoding' not in plain.headers and 'content-encoding' not in refused.headers
+    assert gzipped.headers['content-encoding'] == "gzip"
+    assert "Accept-Encoding" in gzipped.headers['vary'] and "Accept-Encoding" in refused.headers['vary']
+    # httpx decodes the body; the stated length is that of the compressed bytes
+    assert int(gzipped.headers['content-length']) < len(plain.content) / 5
+    assert gzipped.json() == plain.json()
+    assert len(small.content) < settings.COMPRESSION_MIN_SIZE
+    assert 'content-encoding' not in small.headers
+
+
+def test_large_responses_are_brotli_compressed(client):
+    pytest.importorskip("brotli")
+    plain = client.post(f"{API}/predict/basic/batch", json=_batch(50))
+    response = client.post(f"{API}/predict/basic/batch", json=_batch(50), headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers['content-encoding'] == "br"
+    assert response.json() == plain.json()
+
+
+def _run(asgi_app, accept_encoding: str):
+    """Call an ASGI app through the middleware and collect what it sends."""
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(asgi_app)(scope, receive, send))
+    return sent
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk(without_brotli):
+    pieces = [json.dumps({'chunk': i, 'values': list(range(100))}).encode() for i in range(3)]
+
+    async def streaming_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+        for index, piece in enumerate(pieces):
+            await send({'type': 'http.response.body', 'body': piece, 'more_body': index < len(pieces) - 1})
+
+    start, *bodies = _run(streaming_app, "gzip")
+
+    headers = dict(start['headers'])
+    assert headers[b'content-encoding'] == b"gzip"
+    assert b'content-length' not in headers
+    # Each chunk is flushed, so the client can decode it as soon as it arrives
+    decoder = zlib.decompressobj(31)
+    for piece, body in zip(pieces, bodies):
+        assert decoder.decompress(body['body']) == piece
+    assert gzip.decompress(b"".join(body['body'] for body in bodies)) == b"".join(pieces)
+
+
+def test_encoded_and_binary_responses_are_left_alone(without_brotli):
+    async def image_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'image/png')]})
+        await send({'type': 'http.response.body', 'body': b"\x89PNG" * 1000})
+
+    start, body = _run(image_app, "gzip")
+    assert b'content-encoding' not in dict(start['headers'])
+    assert body['body'] == b"\x89PNG" * 1000
+
+
+def test_model_status_revalidates_with_etags(client, monkeypatch):
+    first = client.get(f"{API}/models/status")
+    etag = first.headers['etag']
+
+    assert first.status_code == 200
+    assert etag.startswith('W/"') and first.headers['cache-control'] == "no-cache"
+    for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        cached = client.get(f"{API}/models/status", headers={"If-None-Match": if_none_match})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers['etag'] == etag
+
+    # Reading the status of the models again is only needed once they change
+    calls = []
+    monkeypatch.setattr(ModelTrainingService, 'get_model_status', lambda self: calls.append(1) or {})
+    assert client.get(f"{API}/models/status", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == []
+
+    original = ModelTrainingService.status_version
+    monkeypatch.setattr(ModelTrainingService, 'status_version', lambda self: original(self) + ['retrained'])
+    changed = client.get(f"{API}/models/status", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers['etag'] != etag
+    assert calls == [1]
+
+
+@pytest.mark.parametrize("model_type", ["basic", "advanced"])
+def test_parameter_influence_revalidates_with_etags(client, model_type):
+    first = client.get(f"{API}/parameters/{model_type}/influence")
+    cached = client.get(f"{API}/parameters/{model_type}/influence", headers={"If-None-Match": first.headers['etag']})
+    stale = client.get(f"{API}/parameters/{model_type}/influence", headers={"If-None-Match": 'W/"stale"'})
+
+    assert first.status_code == 200 and first.json()
+    assert cached.status_code == 304 and cached.content == b""
+    assert stale.status_code == 200 and stale.json() == first.json()
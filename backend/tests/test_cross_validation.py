@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from app.core.config import settings
+from app.services.model_trainer import ModelTrainingService
+
+
+def _frame(model, datasets, model_type):
+    X, y = datasets[model_type]
+    return pd.DataFrame(X, columns=model.feature_names), pd.Series(y)
+
+
+def _manual_folds(model, X, y, splitter, metrics):
+    """Fit each fold one after another, scaling on the fold's training rows only."""
+    scores = {name: [] for name in metrics}
+    for train, test in splitter.split(X, y):
+        scaler = StandardScaler().fit(X.iloc[train])
+        estimator = clone(model.model).fit(scaler.transform(X.iloc[train]), y.iloc[train])
+        predicted = estimator.predict(scaler.transform(X.iloc[test]))
+        for name, metric in metrics.items():
+            scores[name].append(metric(y.iloc[test], predicted))
+    return scores
+
+
+def test_parallel_folds_match_a_serial_run(trained_models, datasets, monkeypatch):
+    model = trained_models['basic']
+    X, y = _frame(model, datasets, 'basic')
+
+    monkeypatch.setattr(settings, 'CV_N_JOBS', 1)
+    serial = model.cross_validate(X, y, folds=4, random_state=0)
+    monkeypatch.setattr(settings, 'CV_N_JOBS', 2)
+    parallel = model.cross_validate(X, y, folds=4, random_state=0)
+
+    expected = _manual_folds(
+        model, X, y, StratifiedKFold(n_splits=4, shuffle=True, random_state=0),
+        {'accuracy': accuracy_score, 'f1_score': lambda true, predicted: f1_score(true, predicted, average='weighted')}
+    )
+    for report in (serial, parallel):
+        assert report['folds'] == 4
+        assert len(report['fit_time']) == 4
+        assert report['wall_time'] > 0 and report['speedup'] > 0
+        for name in ('accuracy', 'f1_score'):
+            np.testing.assert_allclose(report[name]['folds'], expected[name])
+            assert report[name]['mean'] == pytest.approx(np.mean(expected[name]))
+            assert report[name]['std'] == pytest.approx(np.std(expected[name]))
+
+
+def test_regressor_folds_report_r2_and_mse(trained_models, datasets, monkeypatch):
+    model = trained_models['water_quality']
+    X, y = _frame(model, datasets, 'water_quality')
+    X, y = X.iloc[:1000], y.iloc[:1000]
+    monkeypatch.setattr(settings, 'CV_N_JOBS', 2)
+
+    report = model.cross_validate(X, y, folds=3, random_state=0)
+
+    expected = _manual_folds(
+        model, X, y, KFold(n_splits=3, shuffle=True, random_state=0),
+        {'r2_score': r2_score, 'mse': mean_squared_error}
+    )
+    np.testing.assert_allclose(report['r2_score']['folds'], expected['r2_score'])
+    np.testing.assert_allclose(report['mse']['folds'], expected['mse'])
+    # sklearn negates losses; the report gives them back as plain MSE
+    assert min(report['mse']['folds']) >= 0 and report['mse']['mean'] >= 0
+
+
+def test_streaming_training_rejects_cross_validation():
+    with pytest.raises(ValueError, match="Cross validation"):
+        ModelTrainingService().train_model('basic', streaming=True, cv_folds=3)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.forecasting import damped_trend_forecast, rolling_trend, stack_histories
+from app.models.schemas import WaterQualityRequest
+from app.services.model_registry import ModelRegistry
+from app.services.prediction import PredictionService
+
+API = settings.API_V1_STR
+READING = WaterQualityRequest.model_config['json_schema_extra']['example']
+
+
+@pytest.fixture(scope="module")
+def prediction_service(trained_models):
+    registry = ModelRegistry()
+    registry.load_all(parallel=False)
+    return PredictionService(registry)
+
+
+def test_trends_are_fitted_per_site_and_feature():
+    steps = np.arange(5, dtype=np.float64)
+    linear = np.column_stack([10.0 + 2.0 * steps, 7.0 - 0.5 * steps])
+    short = linear[-2:] + 1.0
+    single = linear[:1]
+
+    stacked = stack_histories([linear, short, single], window=4)
+    assert stacked.shape == (3, 4, 2)
+    assert np.isnan(stacked[1, :2]).all() and np.isnan(stacked[2, :3]).all()
+
+    level, slope = rolling_trend(stacked)
+    np.testing.assert_allclose(level[0], linear[-1])
+    np.testing.assert_allclose(slope[0], [2.0, -0.5])
+    np.testing.assert_allclose(level[1], short[-1])
+    np.testing.assert_allclose(slope[1], [2.0, -0.5])
+    # A single reading has no trend
+    np.testing.assert_allclose(level[2], single[0])
+    np.testing.assert_allclose(slope[2], [0.0, 0.0])
+
+
+def test_damped_forecast_levels_off_within_the_plausible_range():
+    level = np.array([[30.0, 13.0, 1.0]])
+    slope = np.array([[1.0, 1.0, -1.0]])
+
+    forecast = damped_trend_forecast(
+        level, slope, horizon=20, damping=0.5, feature_names=['temperature', 'ph', 'ammonia']
+    )
+
+    assert forecast.shape == (1, 20, 3)
+    np.testing.assert_allclose(forecast[0, :3, 0], [30.5, 30.75, 30.875])
+    assert forecast[0, -1, 0] < 31.0
+    # Values stop at the ends of their sensor's range
+    np.testing.assert_allclose(forecast[0, :3, 1], [13.5, 13.75, 13.875])
+    assert forecast[0, :, 1].max() <= 14.0
+    assert forecast[0, :, 2].min() >= 0.0
+    np.testing.assert_allclose(damped_trend_forecast(level, slope * 20, 2, 0.5, ['temperature', 'ph', 'ammonia'])[0, 1],
+                               [45.0, 14.0, 0.0])
+
+
+def _history(n: int, drift: float):
+    """Readings as a request sends them, with the temperature drifting each interval."""
+    return [{**READING, 'temperature': READING['temperature'] + drift * i} for i in range(n)]
+
+
+def _to_features(reading):
+    """A reading keyed by model feature, as the service takes it."""
+    return WaterQualityRequest(**reading).model_dump()
+
+
+def test_forecast_scores_the_latest_reading_and_each_step(prediction_service):
+    sites = [
+        {'site_id': "rising", 'readings': [_to_features(r) for r in _history(8, 0.5)]},
+        {'site_id': "steady", 'readings': [_to_features(READING)]}
+    ]
+
+    result = prediction_service.forecast_water_quality(sites, horizon=4, window=6, include_features=True)
+
+    assert result['horizon'] == 4 and result['window'] == 6
+    rising, steady = result['forecasts']
+    model = prediction_service.water_quality_model
+    latest = pd.DataFrame([sites[0]['readings'][-1]])[model.feature_names]
+    assert rising['current_score'] == pytest.approx(float(model.predict_array(latest)[0]))
+    assert len(rising['scores']) == 4
+    temperatures = [step['temperature'] for step in rising['features']]
+    assert temperatures == sorted(temperatures) and temperatures[0] > sites[0]['readings'][-1]['temperature']
+    assert all(step == steady['features'][0] for step in steady['features'])
+
+
+def test_forecast_window_is_capped_and_cut_to_the_longest_history(prediction_service, monkeypatch):
+    sites = [{'site_id': "a", 'readings': [_to_features(r) for r in _history(3, 0.1)]}]
+
+    result = prediction_service.forecast_water_quality(sites, horizon=2, window=settings.FORECAST_MAX_WINDOW)
+    assert result['window'] == 3
+
+    with pytest.raises(ValueError, match="window must be at most"):
+        prediction_service.forecast_water_quality(sites, horizon=2, window=settings.FORECAST_MAX_WINDOW + 1)
+
+
+def test_forecast_endpoint_rejects_huge_windows(trained_models):
+    body = {'sites': [{'site_id': "a", 'readings': _history(4, 0.2)}], 'horizon': 3}
+    with TestClient(app) as client:
+        response = client.post(f"{API}/water-quality/forecast", json=body)
+        huge = client.post(f"{API}/water-quality/forecast", json={**body, 'window': 10 ** 9})
+
+    assert response.status_code == 200
+    assert response.json()['window'] == 4
+    assert len(response.json()['forecasts'][0]['scores']) == 3
+    assert huge.status_code == 400
+    assert "window must be at most" in huge.json()['detail']
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+
+import pytest
+
+from app.loadtest import parse_mix, run, summarize
+
+
+def test_parse_mix():
+    assert parse_mix("advanced=8,basic=1,status") == {"advanced": 8.0, "basic": 1.0, "status": 1.0}
+    with pytest.raises(ValueError, match="Unknown request kind"):
+        parse_mix("advanced=1,fish=2")
+    with pytest.raises(ValueError, match="positive weight"):
+        parse_mix("advanced=0")
+
+
+def test_summary_percentiles():
+    summary = summarize([0.001 * i for i in range(1, 101)], errors=5, elapsed=2.0)
+
+    assert summary['requests'] == 100
+    assert summary['error_rate'] == 0.05
+    assert summary['throughput_rps'] == 50.0
+    latency = summary['latency_ms']
+    assert latency['p50'] == pytest.approx(50.5)
+    assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max'] == pytest.approx(100.0)
+    assert 'latency_ms' not in summarize([], errors=0, elapsed=1.0)
+
+
+def test_in_process_run_reports_every_kind(trained_models):
+    args = argparse.Namespace(
+        url=None,
+        concurrency=4,
+        duration=1.0,
+        warmup=0.2,
+        mix={"basic": 1.0, "advanced": 1.0, "water_quality": 1.0, "status": 1.0},
+        samples=50,
+        seed=0,
+        timeout=30.0
+    )
+    report = asyncio.run(run(args))
+
+    assert report['target'] == "in-process"
+    assert report['config']['concurrency'] == 4
+    assert report['requests'] > 0 and report['errors'] == 0
+    assert report['status_codes'] == {"200": report['requests']}
+    assert report['throughput_rps'] == pytest.approx(report['requests'] / 1.0)
+    assert set(report['by_kind']) == {"basic", "advanced", "water_quality", "status"}
+    assert sum(kind['requests'] for kind in report['by_kind'].values()) == report['requests']
+    for summary in [report, *report['by_kind'].values()]:
+        if summary['requests']:
+            latency = summary['latency_ms']
+            assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
@@ -0,0 +1,98 @@
+import json
+import logging
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.config import Settings
+from app.core.logging import ContextQueueHandler, JsonFormatter, SamplingFilter, TextFormatter, request_id_var
+from app.main import app
+
+
+def _record(name: str = "fish-habitat-analyzer.prediction", level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, "scored %d rows", (3,), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_records_carry_context_and_extra_fields():
+    record = _record(request_id="abc", model_type="basic", duration_ms=1.5, model=object())
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == "scored 3 rows"
+    assert entry['level'] == "INFO"
+    assert entry['logger'] == "fish-habitat-analyzer.prediction"
+    assert entry['request_id'] == "abc"
+    assert entry['model_type'] == "basic" and entry['duration_ms'] == 1.5
+    # Values that cannot be serialized are written as their repr
+    assert entry['model'].startswith("<object object")
+
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = _record(level=logging.ERROR)
+        record.exc_info = sys.exc_info()
+    assert "RuntimeError: boom" in json.loads(JsonFormatter().format(record))['exception']
+
+
+def test_text_records_keep_the_plain_format():
+    assert Settings.model_fields['LOG_FORMAT'].default == "text"
+    text = TextFormatter().format(_record(request_id="abc"))
+    assert text.endswith(" - fish-habitat-analyzer.prediction - INFO - scored 3 rows [request_id=abc]")
+    assert TextFormatter().format(_record()).endswith("scored 3 rows")
+
+
+def test_sampling_keeps_warnings_and_follows_parent_rates():
+    sampling = SamplingFilter({"fish-habitat-analyzer.prediction": 0.0, "fish-habitat-analyzer": 1.0})
+
+    assert not sampling.filter(_record())
+    assert not sampling.filter(_record("fish-habitat-analyzer.prediction.batch"))
+    assert sampling.filter(_record(level=logging.WARNING))
+    assert sampling.filter(_record("fish-habitat-analyzer.access"))
+    assert sampling.filter(_record("uvicorn"))
+    assert sampling.sampled_out == {
+        "fish-habitat-analyzer.prediction": 1,
+        "fish-habitat-analyzer.prediction.batch": 1
+    }
+
+
+def test_sampled_out_counts_are_exact_across_threads():
+    sampling = SamplingFilter({"fish-habitat-analyzer": 0.0})
+    record = _record()
+    start = threading.Barrier(8)
+
+    def log_many():
+        start.wait()
+        for _ in range(20000):
+            sampling.filter(record)
+
+    threads = [threading.Thread(target=log_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sampling.sampled_out == {"fish-habitat-analyzer.prediction": 160000}
+
+
+def test_queued_records_are_stamped_with_the_request_id():
+    handler = ContextQueueHandler(None)
+    token = request_id_var.set("req-1")
+    try:
+        prepared = handler.prepare(_record())
+    finally:
+        request_id_var.reset(token)
+
+    assert prepared.request_id == "req-1"
+    assert prepared.msg == "scored 3 rows" and prepared.args is None
+
+
+def test_responses_carry_the_request_id():
+    with TestClient(app) as client:
+        given = client.get("/health", headers={"X-Request-ID": "client-chosen"})
+        generated = client.get("/health")
+
+    assert given.headers['x-request-id'] == "client-chosen"
+    assert len(generated.headers['x-request-id']) == 32
@@ -0,0 +1,110 @@
+import copy
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import admission
+from app.core.config import settings
+from app.core.memory import allocation_profile, deep_nbytes
+from app.main import app
+from app.models.prediction import BasePredictionModel
+from app.services import model_trainer
+from app.services.model_registry import ModelRegistry
+
+API = settings.API_V1_STR
+
+
+def test_deep_nbytes_counts_shared_buffers_once():
+    data = np.zeros(100000)
+    single = deep_nbytes({'data': data})
+    shared = deep_nbytes({'data': data, 'view': data[10:], 'again': [data]})
+
+    assert data.nbytes < single < data.nbytes + 2000
+    assert shared - single < 1000
+
+
+def test_allocation_profile_attributes_retained_memory():
+    kept = []
+
+    def leak():
+        kept.append(bytearray(8000))
+
+    profile = allocation_profile(leak, calls=50, top=3)
+
+    assert profile['calls'] == 50
+    assert profile['retained_bytes_per_call'] >= 8000
+    assert profile['peak_bytes'] >= profile['retained_bytes'] >= 50 * 8000
+    assert profile['top_sites'][0]['site'].endswith(f"{__file__}:{leak.__code__.co_firstlineno + 1}")
+    assert len(kept) == 51
+
+
+@pytest.fixture
+def registry(trained_models, monkeypatch):
+    """A registry of the trained models, standing in for the process-wide one."""
+    registry = ModelRegistry()
+    registry.load_all(parallel=False)
+    monkeypatch.setattr(model_trainer, 'model_registry', registry)
+    return registry
+
+
+def test_status_reports_the_served_models_without_reading_them_from_disk(registry, monkeypatch):
+    measured = []
+    original = BasePredictionModel.memory_footprint
+    monkeypatch.setattr(BasePredictionModel, 'memory_footprint', lambda self: measured.append(self) or original(self))
+
+    def no_disk(self, path=None):
+        raise AssertionError("get_model_status read a model from disk")
+
+    monkeypatch.setattr(BasePredictionModel, 'load_model', no_disk)
+    service = model_trainer.ModelTrainingService()
+    first = service.get_model_status()
+    second = service.get_model_status()
+
+    assert first == second
+    for model_type in ModelRegistry.MODEL_CLASSES:
+        model = registry.get(model_type)
+        assert first[model_type]['status'] == "available"
+        assert first[model_type]['info'] is model.model_info
+        assert first[model_type]['memory']['estimator'] == type(model.model).__name__
+        assert first[model_type]['memory']['bytes']['total'] > 0
+    # The footprints were measured when the models were loaded
+    assert measured == []
+
+    # A swapped in model is measured once, when it is swapped in
+    replacement = copy.copy(registry.get('basic'))
+    replacement.model_info = {**replacement.model_info, 'version': "replacement"}
+    registry.swap('basic', replacement)
+    assert measured == [replacement]
+    status = service.get_model_status()
+    assert status['basic']['info']['version'] == "replacement"
+    assert measured == [replacement]
+
+    # Building the explainer adds to the footprint, so it is measured once more
+    replacement._explainer = None
+    replacement.explain_batch([dict(zip(replacement.feature_names, replacement.scaler.mean_))])
+    with_explainer = service.get_model_status()['basic']['memory']
+    service.get_model_status()
+    assert measured == [replacement, replacement]
+    assert with_explainer['bytes']['explainer'] > 0
+
+
+def test_allocation_profiles_are_bounded_batch_requests(trained_models):
+    limiter = admission._limiter_for({'method': 'POST', 'path': f"{API}/admin/memory/allocations"})
+    assert limiter is admission._limiters['batch']
+
+    with TestClient(app) as client:
+        profile = client.post(
+            f"{API}/admin/memory/allocations", json={'model_type': "basic", 'predictions': 5, 'batch_size': 20}
+        )
+        too_many = client.post(
+            f"{API}/admin/memory/allocations", json={'model_type': "basic", 'predictions': 10000, 'batch_size': 10000}
+        )
+
+    assert profile.status_code == 200
+    body = profile.json()
+    assert body['calls'] == 5 and body['batch_size'] == 20
+    assert body['peak_bytes'] > 0
+    assert body['model_memory']['bytes']['total'] > 0
+    assert too_many.status_code == 400
+    assert f"at most {settings.MEMORY_PROFILE_MAX_ROWS}" in too_many.json()['detail']
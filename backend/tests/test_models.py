@@ -0,0 +1,60 @@
+import copy
+
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from app.core.config import settings
+from app.models.tree_ensemble import FlatTreeEnsemble
+
+# Most holdout accuracy compaction may cost with the default COMPACT_* settings
+MAX_ACCURACY_LOSS = 0.05
+
+
+def _split(model, X, y):
+    """The train/test split the model was trained on."""
+    return train_test_split(model.scaler.transform(X), y, test_size=settings.TEST_SIZE, random_state=settings.RANDOM_STATE)
+
+
+@pytest.mark.parametrize("model_type", ["basic", "advanced", "water_quality"])
+def test_float32_storage_keeps_predictions(trained_models, datasets, model_type):
+    """Storing thresholds and values in float32 sends every row down the same paths."""
+    model = trained_models[model_type]
+    X, y = datasets[model_type]
+    _, X_test, _, _ = _split(model, X, y)
+    flat = FlatTreeEnsemble.from_sklearn(model.model)
+    compacted = flat.compact()
+
+    np.testing.assert_array_equal(compacted.apply(X_test), flat.apply(X_test))
+    if model.TASK == 'classification':
+        np.testing.assert_array_equal(compacted.predict(X_test), model.model.predict(X_test))
+        np.testing.assert_allclose(compacted.predict_proba(X_test), model.model.predict_proba(X_test), rtol=0, atol=1e-5)
+    else:
+        np.testing.assert_allclose(compacted.predict(X_test), model.model.predict(X_test), rtol=0, atol=1e-5)
+
+
+def test_compaction_report_matches_compacted_model(trained_models, datasets):
+    """The reported accuracies describe the two models, and tree selection keeps its agreement target."""
+    model = copy.deepcopy(trained_models['basic'])
+    original = model.model
+    X, y = datasets['basic']
+    X_train, X_test, _, y_test = _split(model, X, y)
+
+    report = model.compact_model(X_train, X_test, y_test)
+    compacted = model.model
+
+    assert isinstance(compacted, FlatTreeEnsemble)
+    assert report['n_trees'][1] < report['n_trees'][0]
+    assert report['after']['size_bytes'] < report['before']['size_bytes']
+    assert report['before']['accuracy'] == accuracy_score(y_test, original.predict(X_test))
+    assert report['after']['accuracy'] == accuracy_score(y_test, compacted.predict(X_test))
+    assert report['after']['accuracy'] >= report['before']['accuracy'] - MAX_ACCURACY_LOSS
+
+    pruned = FlatTreeEnsemble.from_sklearn(original).prune(
+        max_depth=settings.COMPACT_MAX_DEPTH,
+        min_samples_leaf=settings.COMPACT_MIN_SAMPLES_LEAF
+    )
+    selection = X_train[:settings.COMPACT_SELECTION_ROWS]
+    agreement = (compacted.predict(selection) == pruned.predict(selection)).mean()
+    assert agreement >= report['min_agreement']
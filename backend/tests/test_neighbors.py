@@ -0,0 +1,76 @@
+import copy
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.schemas import AdvancedFishPredictionRequest
+from app.services.model_registry import ModelRegistry
+from app.services.prediction import PredictionService
+
+API = settings.API_V1_STR
+
+
+@pytest.mark.parametrize("model_type", ["basic", "advanced"])
+def test_nearest_samples_match_brute_force(trained_models, datasets, model_type):
+    """The KD-tree returns the k rows nearest in standardized units, nearest first."""
+    model = trained_models[model_type]
+    index = model.neighbor_index
+    X, y = datasets[model_type]
+    assert len(index) == len(X)
+    standardized = model.scaler.transform(X)
+
+    rng = np.random.default_rng(0)
+    queries = X[rng.choice(len(X), 20, replace=False)] * rng.uniform(0.9, 1.1, (20, X.shape[1]))
+    readings = [dict(zip(model.feature_names, row)) for row in queries]
+    results = index.query(readings, k=7)
+
+    for query, neighbors in zip(model.scaler.transform(queries), results):
+        distances = np.sqrt(((standardized - query) ** 2).sum(axis=1))
+        expected = np.sort(distances)[:7]
+        np.testing.assert_allclose([neighbor['distance'] for neighbor in neighbors], expected, rtol=1e-9)
+        for neighbor in neighbors:
+            position = np.flatnonzero(index.rows == neighbor['row'])[0]
+            assert distances[position] == pytest.approx(neighbor['distance'], rel=1e-9)
+            assert neighbor['species'] == y[position]
+            np.testing.assert_allclose(list(neighbor['features'].values()), X[position])
+            assert (neighbor['water_quality'] is None) == (model_type == 'basic')
+
+
+def test_nearest_sample_of_a_training_row_is_itself(trained_models, datasets):
+    model = trained_models['advanced']
+    X, y = datasets['advanced']
+    reading = dict(zip(model.feature_names, X[10]))
+
+    nearest = model.neighbor_index.query([reading], k=1)[0]
+
+    assert len(nearest) == 1
+    assert nearest[0]['distance'] == 0.0
+    assert nearest[0]['species'] == y[10]
+
+
+def test_models_without_an_index_are_reported(trained_models):
+    registry = ModelRegistry()
+    registry.load_all(parallel=False)
+    model = copy.copy(registry.get('basic'))
+    model.neighbor_index = None
+    registry.swap('basic', model)
+
+    with pytest.raises(LookupError, match="retrain"):
+        PredictionService(registry).nearest_samples('basic', [{"ph": 7, "temperature": 25, "turbidity": 40}])
+
+
+def test_nearest_samples_endpoint(trained_models):
+    reading = AdvancedFishPredictionRequest.model_config['json_schema_extra']['example']
+    with TestClient(app) as client:
+        response = client.post(f"{API}/samples/advanced/nearest", params={"k": 3}, json=reading)
+        too_many = client.post(f"{API}/samples/advanced/nearest", params={"k": 1000}, json=reading)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['k'] == 3
+    distances = [sample['distance'] for sample in body['samples']]
+    assert distances == sorted(distances)
+    assert too_many.status_code == 422
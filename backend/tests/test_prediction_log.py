@@ -0,0 +1,119 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.services.prediction_log import PredictionLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = PredictionLog(str(tmp_path / "log" / "predictions.db"), queue_size=100, batch_size=10, flush_interval=0.05)
+    yield log
+    log.close()
+
+
+def _rows(n: int, start: int = 0):
+    inputs = [{'ph': 7.0, 'temperature': float(start + i)} for i in range(n)]
+    outputs = [{'predicted_species': f"species-{start + i}", 'confidence': 0.5} for i in range(n)]
+    return inputs, outputs
+
+
+def test_entries_are_written_in_batches(log):
+    for call in range(5):
+        inputs, outputs = _rows(7, call * 7)
+        assert log.record('basic', 'v1', inputs, outputs, 0.002) == 0
+    log.record('advanced', 'v2', *_rows(3, 100), 0.004)
+    log.close()
+
+    stats = log.stats()
+    assert stats['enqueued'] == stats['written'] == 38
+    assert stats['dropped'] == stats['write_errors'] == 0
+    assert 0 < stats['mean_batch_size'] <= 10
+    assert stats['queue_depth'] == 0
+
+    latest = log.recent(limit=3)
+    assert [entry['model_type'] for entry in latest] == ['advanced'] * 3
+    assert latest[0]['inputs'] == {'ph': 7.0, 'temperature': 102.0}
+    assert latest[0]['outputs']['predicted_species'] == "species-102"
+    assert latest[0]['latency_ms'] == pytest.approx(4.0)
+    assert latest[0]['batch_size'] == 3
+
+    basic = log.recent(limit=100, model_type='basic')
+    assert [entry['inputs']['temperature'] for entry in basic] == [float(i) for i in reversed(range(35))]
+    older = log.recent(limit=5, model_type='basic', before_id=basic[9]['id'])
+    assert [entry['id'] for entry in older] == [entry['id'] for entry in basic[10:15]]
+
+
+def test_full_queue_drops_instead_of_blocking(log, monkeypatch):
+    # Hold the writer back so the queue fills up
+    monkeypatch.setattr(log, '_ensure_writer', lambda: None)
+    assert log.record('basic', 'v1', *_rows(80), 0.001) == 0
+    assert log.record('basic', 'v1', *_rows(30, 80), 0.001) == 10
+
+    stats = log.stats()
+    assert stats['enqueued'] == 100
+    assert stats['dropped'] == 10
+    assert stats['max_queue_depth'] == 100
+
+    monkeypatch.undo()
+    log.record('basic', 'v1', [], [], 0.0)
+    log.close()
+    assert log.stats()['written'] == 100
+    with sqlite3.connect(log.path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 100
+
+
+def test_recent_without_a_database(tmp_path):
+    assert PredictionLog(str(tmp_path / "missing.db")).recent() == []
+
+
+def _columns(n: int):
+    inputs = {'ph': np.full(n, 7.0), 'temperature': np.arange(n, dtype=float), 'site_id': [f"site-{i}" for i in range(n)]}
+    outputs = {'predicted_species': [f"species-{i}" for i in range(n)], 'confidence': np.full(n, 0.5)}
+    return inputs, outputs
+
+
+def test_columnar_rows_count_against_the_queue(log, monkeypatch):
+    """A columnar batch takes queue room for each of its rows, not one slot per batch."""
+    monkeypatch.setattr(log, '_ensure_writer', lambda: None)
+    assert log.record_columns('advanced', 'v1', *_columns(95), 95, 0.01) == 0
+    assert log.record_columns('advanced', 'v1', *_columns(1000), 1000, 0.01) == 995
+    assert log.record('basic', 'v1', *_rows(3), 0.001) == 3
+
+    stats = log.stats()
+    assert stats['enqueued'] == 100 and stats['dropped'] == 998
+    assert stats['queue_depth'] == stats['max_queue_depth'] == 100
+
+    monkeypatch.undo()
+    log._ensure_writer()
+    log.close()
+    stats = log.stats()
+    assert stats['written'] == 100 and stats['queue_depth'] == 0
+    # Blocks are split so that no transaction is much larger than batch_size
+    assert stats['mean_batch_size'] <= 10
+
+    entries = log.recent(limit=200, model_type='advanced')
+    assert len(entries) == 100
+    assert entries[-1]['inputs'] == {'ph': 7.0, 'temperature': 0.0, 'site_id': "site-0"}
+    assert entries[-1]['outputs'] == {'predicted_species': "species-0", 'confidence': 0.5}
+    assert entries[0]['inputs']['temperature'] == 4.0
+    assert {entry['batch_size'] for entry in entries} == {95, 1000}
+
+
+def test_failed_writes_count_as_dropped(log, monkeypatch):
+    from app.services import prediction_log as module
+
+    def failing_dumps(value):
+        raise ValueError("cannot encode")
+
+    monkeypatch.setattr(module, 'dumps', failing_dumps)
+    log.record_columns('advanced', 'v1', *_columns(25), 25, 0.01)
+    log.close()
+
+    stats = log.stats()
+    assert stats['written'] == 0
+    assert stats['write_errors'] >= 1
+    assert stats['dropped'] == 25
+    assert stats['queue_depth'] == 0
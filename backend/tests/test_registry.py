@@ -0,0 +1,17 @@
+from app.services.model_registry import ModelRegistry
+from app.services.monitoring import anomaly_monitor
+from app.services.prediction_log import prediction_log
+
+
+def test_warmup_skips_prediction_log_and_monitoring(trained_models):
+    """Warmup inferences are not audited predictions: nothing is logged or counted."""
+    registry = ModelRegistry()
+    enqueued = prediction_log.stats()['enqueued']
+    anomalies = anomaly_monitor.report()
+
+    registry.startup()
+
+    assert registry.state == "ready"
+    assert all(status['loaded'] for status in registry.status().values())
+    assert prediction_log.stats()['enqueued'] == enqueued
+    assert anomaly_monitor.report() == anomalies
@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.schemas import SensitivitySweepRequest, SweepSpec
+from app.services.model_registry import ModelRegistry
+from app.services.prediction import PredictionService
+from app.services.scenarios import ScenarioService
+
+API = settings.API_V1_STR
+BASIC_READING = {"ph": 7.2, "temperature": 28.5, "turbidity": 45.2}
+
+
+@pytest.fixture(scope="module")
+def scenario_service(trained_models):
+    registry = ModelRegistry()
+    registry.load_all(parallel=False)
+    return ScenarioService(PredictionService(registry))
+
+
+def test_sweep_grid_matches_row_predictions(scenario_service):
+    """Every grid point has the probabilities, species and score of that reading scored on its own."""
+    sweeps = [
+        SweepSpec(parameter="ph", start=6.0, stop=9.0, steps=7),
+        SweepSpec(parameter="temperature", start=15.0, stop=35.0, steps=5)
+    ]
+    result = scenario_service.sensitivity_sweep("basic", BASIC_READING, sweeps)
+
+    assert result['shape'] == [7, 5]
+    np.testing.assert_allclose(result['axes'][0], np.linspace(6.0, 9.0, 7))
+    assert result['probabilities'].shape == (7, 5, len(result['classes']))
+    np.testing.assert_allclose(result['probabilities'].sum(axis=2), 1.0)
+
+    service = scenario_service.prediction_service
+    for i, ph in enumerate(result['axes'][0]):
+        for j, temperature in enumerate(result['axes'][1]):
+            reading = {**BASIC_READING, 'ph': ph, 'temperature': temperature}
+            probabilities = service.basic_model.predict_array([reading])[0]
+            np.testing.assert_allclose(result['probabilities'][i, j], probabilities, rtol=0, atol=1e-12)
+            assert result['predicted_species'][i][j] == result['classes'][probabilities.argmax()]
+            water_quality = service.water_quality_model.predict_array(
+                [{**PredictionService.BASIC_WATER_QUALITY_DEFAULTS, **reading}]
+            )[0]
+            assert result['water_quality_score'][i, j] == pytest.approx(water_quality, abs=1e-12)
+
+
+def test_sweep_rejects_invalid_grids(scenario_service, monkeypatch):
+    with pytest.raises(ValueError, match="does not use"):
+        scenario_service.sensitivity_sweep("basic", BASIC_READING, [SweepSpec(parameter="ammonia", start=0, stop=1)])
+    with pytest.raises(ValueError, match="only be swept once"):
+        scenario_service.sensitivity_sweep("basic", BASIC_READING, [
+            SweepSpec(parameter="ph", start=6, stop=9), SweepSpec(parameter="ph", start=6, stop=9)
+        ])
+    with pytest.raises(ValueError, match="Invalid base reading"):
+        scenario_service.sensitivity_sweep("basic", {"ph": 7.0}, [SweepSpec(parameter="ph", start=6, stop=9)])
+
+    monkeypatch.setattr(settings, 'SWEEP_MAX_POINTS', 99)
+    with pytest.raises(ValueError, match="100 points"):
+        scenario_service.sensitivity_sweep("basic", BASIC_READING, [
+            SweepSpec(parameter="ph", start=6, stop=9, steps=10),
+            SweepSpec(parameter="temperature", start=15, stop=35, steps=10)
+        ])
+
+
+def test_sweep_endpoint(trained_models):
+    example = SensitivitySweepRequest.model_config['json_schema_extra']['example']
+    with TestClient(app) as client:
+        response = client.post(f"{API}/predict/sensitivity", json=example)
+        invalid = client.post(f"{API}/predict/sensitivity", json={
+            **example, 'sweeps': [{"parameter": "bod", "start": 0, "stop": 1}]
+        })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['shape'] == [31, 21]
+    assert len(body['predicted_species']) == 31 and len(body['predicted_species'][0]) == 21
+    assert len(body['probabilities'][0][0]) == len(body['classes'])
+    assert invalid.status_code == 400
+
+
+def _applied(result, reading):
+    return {**reading, **{name: change['recommended'] for name, change in result['changes'].items()}}
+
+
+def test_recommendation_reaches_target_species(scenario_service):
+    """The recommended reading is predicted as the target, changing only adjustable parameters."""
+    model = scenario_service.prediction_service.basic_model
+    probabilities = model.predict_array([BASIC_READING])[0]
+    target = model.classes[np.argsort(probabilities)[-2]]
+
+    result = scenario_service.recommend(
+        "basic", BASIC_READING, target_species=target, adjustable=["ph", "temperature"],
+        time_budget_ms=500, random_state=0
+    )
+
+    assert result['found']
+    assert set(result['changes']) <= {"ph", "temperature"}
+    recommended = _applied(result, BASIC_READING)
+    assert model.classes[model.predict_array([recommended])[0].argmax()] == target
+    assert result['predicted_species'] == target
+    mean, scale = scenario_service._standardization(model, list(BASIC_READING))
+    distance = sum(abs(change['change']) / scale[list(BASIC_READING).index(name)]
+                   for name, change in result['changes'].items())
+    assert result['distance'] == pytest.approx(distance)
+    assert result['elapsed_ms'] < result['time_budget_ms'] + 1000
+
+
+def test_recommendation_meets_water_quality(scenario_service):
+    """A reading that already meets the goal needs no changes; otherwise the changes reach it."""
+    service = scenario_service.prediction_service
+    current = service.water_quality_model.predict_array(
+        [{**PredictionService.BASIC_WATER_QUALITY_DEFAULTS, **BASIC_READING}]
+    )[0]
+
+    already = scenario_service.recommend("basic", BASIC_READING, min_water_quality=current - 1, time_budget_ms=200)
+    assert already['found'] and already['distance'] == 0.0 and already['changes'] == {}
+    assert already['iterations'] == 1
+
+    result = scenario_service.recommend(
+        "basic", BASIC_READING, min_water_quality=current + 0.01, time_budget_ms=500, random_state=0
+    )
+    assert result['found']
+    recommended = {**PredictionService.BASIC_WATER_QUALITY_DEFAULTS, **_applied(result, BASIC_READING)}
+    assert service.water_quality_model.predict_array([recommended])[0] >= current + 0.01
+    assert result['water_quality_score'] >= current + 0.01
+
+
+def test_recommendation_budget_is_capped(scenario_service, monkeypatch):
+    """Requested budgets above RECOMMEND_MAX_TIME_BUDGET_MS are cut to it."""
+    monkeypatch.setattr(settings, 'RECOMMEND_MAX_TIME_BUDGET_MS', 100)
+    # A species the reading cannot reach keeps the search running until the budget is spent
+    result = scenario_service.recommend(
+        "basic", BASIC_READING, target_species=scenario_service.prediction_service.basic_model.classes[0],
+        min_water_quality=1e9, time_budget_ms=60000, random_state=0
+    )
+
+    assert not result['found']
+    assert result['time_budget_ms'] == 100
+    assert 100 <= result['elapsed_ms'] < 2000
+
+
+def test_recommendation_rejects_invalid_goals(scenario_service):
+    with pytest.raises(ValueError, match="target species"):
+        scenario_service.recommend("basic", BASIC_READING)
+    with pytest.raises(ValueError, match="Unknown species"):
+        scenario_service.recommend("basic", BASIC_READING, target_species="Unicorn")
+    with pytest.raises(ValueError, match="does not use"):
+        scenario_service.recommend("basic", BASIC_READING, min_water_quality=1.0, adjustable=["ammonia"])
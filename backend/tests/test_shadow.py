@@ -0,0 +1,44 @@
+import time
+
+from app.models.columnar import ADVANCED_FEATURES
+from app.services.model_registry import ModelRegistry
+from app.services.prediction import PredictionService
+
+
+def _finished(registry: ModelRegistry, model_type: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    report = registry.shadow_report(model_type)
+    while report['requests_pending']:
+        assert time.monotonic() < deadline, "Shadow scoring did not finish"
+        time.sleep(0.01)
+        report = registry.shadow_report(model_type)
+    return report
+
+
+def test_shadow_scores_columnar_and_row_requests(plausible_datasets):
+    """Columnar batches reach the shadow model like row requests, every row compared."""
+    registry = ModelRegistry()
+    registry.load_all(parallel=False)
+    service = PredictionService(registry)
+    for model_type in ('advanced', 'water_quality'):
+        registry.set_shadow(model_type, registry.get(model_type).model_info['version'], 1.0)
+
+    X = plausible_datasets['advanced'][0][:300]
+    payload = {name: X[:, i].tolist() for i, name in enumerate(ADVANCED_FEATURES)}
+    service.predict_columnar('advanced', payload)
+    service.predict_columnar('advanced', payload, labels_only=True)
+    rows = [dict(zip(ADVANCED_FEATURES, row)) for row in X[:20]]
+    service._predict_advanced_rows(rows)
+
+    # The candidate is the live version, so every compared row agrees
+    report = _finished(registry, 'advanced')
+    assert report['requests_seen'] == report['requests_scored'] == 3
+    assert report['errors'] == 0
+    assert report['rows_compared'] == 2 * len(X) + len(rows)
+    assert report['agreement_rate'] == 1.0
+
+    report = _finished(registry, 'water_quality')
+    assert report['requests_scored'] == 3
+    assert report['errors'] == 0
+    assert report['rows_compared'] == 2 * len(X) + len(rows)
+    assert report['mean_absolute_difference'] == 0.0
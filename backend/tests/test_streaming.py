@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, r2_score
+
+from app.core.config import settings
+from app.models.prediction import AdvancedFishPredictionModel, WaterQualityModel
+
+CHUNK_SIZE = 500
+
+
+@pytest.fixture
+def streaming_model(tmp_path, monkeypatch, request):
+    """A model of the requested class whose live file and versions go to an empty directory."""
+    monkeypatch.setattr(settings, 'MODEL_VERSIONS_PATH', str(tmp_path / "versions"))
+    monkeypatch.setattr(settings, 'STREAMING_EPOCHS', 2)
+    return request.param(model_path=str(tmp_path / "model.pkl"))
+
+
+def _holdout(model, chunk_size: int):
+    """The holdout rows of a streamed dataset, gathered in memory."""
+    X, y = [], []
+    for X_chunk, y_chunk, is_test in model._stream_chunks(model.DEFAULT_DATA_PATH, chunk_size, settings.TEST_SIZE, 42):
+        assert len(y_chunk) <= chunk_size
+        X.append(X_chunk[is_test])
+        y.append(y_chunk[is_test])
+    return np.concatenate(X), np.concatenate(y)
+
+
+@pytest.mark.parametrize("streaming_model", [AdvancedFishPredictionModel, WaterQualityModel], indirect=True)
+def test_streaming_metrics_match_in_memory_scoring(streaming_model):
+    """Running totals over the chunks give the metrics scikit-learn computes on the whole holdout."""
+    model = streaming_model
+    result = model.train_streaming(chunk_size=CHUNK_SIZE, test_size=settings.TEST_SIZE, random_state=42)
+
+    columns = [name for name in pd.read_csv(model.DEFAULT_DATA_PATH, nrows=0).columns
+               if model.COLUMN_MAPPING.get(name, name) in model.FEATURE_NAMES + [model.TARGET_NAME]]
+    data = pd.read_csv(model.DEFAULT_DATA_PATH, usecols=columns)
+    assert result['streaming']['n_chunks'] == -(-len(data) // CHUNK_SIZE)
+    assert result['streaming']['n_rows'] == len(data.dropna())
+    assert result['streaming']['peak_memory_mb'] > 0
+
+    X_test, y_test = _holdout(model, CHUNK_SIZE)
+    assert 0.1 < len(y_test) / result['streaming']['n_rows'] < 0.3
+    y_pred = model.model.predict(model.scaler.transform(X_test))
+    if model.TASK == 'classification':
+        assert result['accuracy'] == pytest.approx(accuracy_score(y_test, y_pred), abs=1e-12)
+        assert result['f1_score'] == pytest.approx(f1_score(y_test, y_pred, average='weighted'), abs=1e-12)
+    else:
+        assert result['mse'] == pytest.approx(mean_squared_error(y_test, y_pred), rel=1e-9)
+        assert result['r2_score'] == pytest.approx(r2_score(y_test, y_pred), rel=1e-9)
+
+    # The saved model is the streamed one
+    reloaded = type(model)(model_path=model.model_path)
+    assert reloaded.model_info['streaming'] == result['streaming']
+    np.testing.assert_array_equal(reloaded.model.predict(reloaded.scaler.transform(X_test)), y_pred)
+
+
+@pytest.mark.parametrize("streaming_model", [AdvancedFishPredictionModel], indirect=True)
+def test_streaming_split_is_the_same_on_every_pass(streaming_model):
+    """Each pass sees the same rows held out, so no training row is ever scored."""
+    first = [is_test for _, _, is_test in streaming_model._stream_chunks(streaming_model.DEFAULT_DATA_PATH, 100, 0.2, 7)]
+    second = [is_test for _, _, is_test in streaming_model._stream_chunks(streaming_model.DEFAULT_DATA_PATH, 100, 0.2, 7)]
+    other_seed = [is_test for _, _, is_test in streaming_model._stream_chunks(streaming_model.DEFAULT_DATA_PATH, 100, 0.2, 8)]
+
+    assert len(first) > 1
+    for mask, again in zip(first, second):
+        np.testing.assert_array_equal(mask, again)
+    assert any((mask != other).any() for mask, other in zip(first, other_seed))
@@ -0,0 +1,94 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.synthetic import DATASETS, SyntheticDataset
+
+
+def _fit(dataset: str):
+    spec = DATASETS[dataset]
+    source = pd.read_csv(spec["path"])
+    return source, SyntheticDataset.fit(source, spec["target"], spec["discrete"])
+
+
+@pytest.fixture(scope="module")
+def basic():
+    return _fit("basic")
+
+
+@pytest.fixture(scope="module")
+def advanced():
+    return _fit("advanced")
+
+
+def test_samples_keep_the_schema_and_group_proportions(basic, tmp_path):
+    source, generator = basic
+    path = tmp_path / "fish.csv"
+
+    report = generator.write(str(path), 20000, chunk_size=3000, seed=1)
+
+    assert report["rows"] == 20000 and report["chunks"] == 7
+    synthetic = pd.read_csv(path)
+    assert list(synthetic.columns) == list(source.columns)
+    assert len(synthetic) == 20000
+    expected = source["fish"].value_counts(normalize=True)
+    actual = synthetic["fish"].value_counts(normalize=True).reindex(expected.index, fill_value=0.0)
+    np.testing.assert_allclose(actual, expected, atol=0.01)
+
+    # Each species stays within its own range of every feature, at the source's precision
+    for species, rows in synthetic.groupby("fish"):
+        real = source[source["fish"] == species]
+        for feature in ("ph", "temperature", "turbidity"):
+            values = rows[feature].dropna()
+            assert values.min() >= real[feature].min() and values.max() <= real[feature].max()
+    for feature, decimals in zip(generator.features, generator.decimals):
+        for values in (source[feature].dropna(), synthetic[feature].dropna()):
+            np.testing.assert_allclose(values, values.round(decimals), rtol=0, atol=1e-9)
+    assert generator.decimals.max() < 6
+
+
+def test_rank_correlations_and_missing_rates_are_kept(advanced):
+    source, generator = advanced
+    sample = generator.sample(50000, np.random.default_rng(0))
+
+    assert list(sample.columns) == list(source.columns)
+    assert set(sample["Water Quality"].unique()) <= {0, 1, 2}
+    np.testing.assert_allclose(sample.isna().mean(), source.dropna(subset=["fish", "Water Quality"]).isna().mean(), atol=0.003)
+
+    # Within the largest group, features keep their rank correlations
+    labels = ["fish", "Water Quality"]
+    key = source.dropna(subset=labels).groupby(labels).size().idxmax()
+    real = source[(source["fish"] == key[0]) & (source["Water Quality"] == key[1])].drop(columns=labels)
+    fake = sample[(sample["fish"] == key[0]) & (sample["Water Quality"] == key[1])].drop(columns=labels)
+    difference = np.abs(real.corr(method="spearman") - fake.corr(method="spearman")).to_numpy()
+    assert np.nanmax(difference) < 0.15
+
+
+def test_the_same_seed_writes_the_same_file(basic, tmp_path):
+    _, generator = basic
+    paths = [tmp_path / name for name in ("a.csv", "b.csv", "c.csv")]
+    generator.write(str(paths[0]), 5000, chunk_size=1000, seed=7)
+    generator.write(str(paths[1]), 5000, chunk_size=1000, seed=7)
+    generator.write(str(paths[2]), 5000, chunk_size=1000, seed=8)
+
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+    assert paths[0].read_bytes() != paths[2].read_bytes()
+
+
+def test_memory_does_not_grow_with_the_rows_written(advanced, tmp_path):
+    """Only one chunk is held at a time, so writing 8x the rows needs about the same peak memory."""
+    _, generator = advanced
+
+    def peak(rows: int) -> int:
+        tracemalloc.start()
+        try:
+            generator.write(str(tmp_path / f"{rows}.csv"), rows, chunk_size=5000, seed=0)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(10000), peak(80000)
+
+    assert large < 1.5 * small
@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import pytest
+
+from app.core.config import settings
+from app.models.prediction import BasicFishPredictionModel
+from app.services import model_trainer
+from app.services.model_registry import ModelRegistry
+from app.services.training_cache import TrainingCache
+
+OPTIONS = {'test_size': 0.2, 'random_state': 42, 'compact': False, 'streaming': False}
+
+
+@pytest.fixture
+def dataset_copy(tmp_path):
+    """A basic model class trained on a copy of the dataset that the test may change."""
+    path = tmp_path / "fish.csv"
+    shutil.copy(settings.REAL_FISH_DATASET, path)
+
+    class CopiedDatasetModel(BasicFishPredictionModel):
+        DEFAULT_DATA_PATH = str(path)
+
+    return CopiedDatasetModel, path
+
+
+def test_key_changes_with_every_input(dataset_copy, monkeypatch):
+    model_class, path = dataset_copy
+    cache = TrainingCache()
+    key = cache.key(model_class, OPTIONS)
+
+    assert cache.key(model_class, dict(OPTIONS)) == key
+    assert cache.key(model_class, {**OPTIONS, 'random_state': 1}) != key
+
+    monkeypatch.setattr(model_class, 'ESTIMATOR_PARAMS', {'n_estimators': 50})
+    assert cache.key(model_class, OPTIONS) != key
+    monkeypatch.undo()
+
+    monkeypatch.setattr(settings, 'ANOMALY_QUANTILE', settings.ANOMALY_QUANTILE / 2)
+    assert cache.key(model_class, OPTIONS) != key
+    monkeypatch.undo()
+
+    # Compaction settings only count for compacted runs
+    monkeypatch.setattr(settings, 'COMPACT_MAX_DEPTH', 3)
+    assert cache.key(model_class, OPTIONS) == key
+    monkeypatch.undo()
+
+    with open(path, 'a') as f:
+        f.write("7.0,25.0,40.0,tilapia\n")
+    assert cache.key(model_class, OPTIONS) != key
+
+
+def test_dataset_digest_is_reused_while_the_file_is_unchanged(dataset_copy, monkeypatch):
+    _, path = dataset_copy
+    cache = TrainingCache()
+    digest = cache.dataset_digest(str(path))
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+    assert cache.dataset_digest(str(path)) == digest
+    assert opened == []
+
+    monkeypatch.undo()
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.dataset_digest(str(path)) == digest
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch, trained_models):
+    """A training service whose versions, live files and registry are private to the test."""
+    monkeypatch.setattr(settings, 'BASIC_MODEL_PATH', str(tmp_path / "basic.pkl"))
+    monkeypatch.setattr(settings, 'MODEL_VERSIONS_PATH', str(tmp_path / "versions"))
+    monkeypatch.setattr(model_trainer, 'model_registry', ModelRegistry())
+    monkeypatch.setattr(model_trainer, 'training_cache', TrainingCache())
+    return model_trainer.ModelTrainingService()
+
+
+def test_identical_runs_reuse_the_saved_version(trainer):
+    first = trainer.train_model('basic', fold_scaler=False)
+    again = trainer.train_model('basic', fold_scaler=False)
+
+    assert first['cached'] is False and again['cached'] is True
+    assert again['version'] == first['version']
+    assert again['training_key'] == first['training_key']
+    assert again['accuracy'] == first['accuracy']
+    assert [info['version'] for info in trainer.list_versions('basic')] == [first['version']]
+
+    forced = trainer.train_model('basic', fold_scaler=False, force=True)
+    other = trainer.train_model('basic', fold_scaler=False, random_state=7)
+
+    assert not forced['cached'] and forced['version'] != first['version']
+    assert forced['training_key'] == first['training_key']
+    assert not other['cached'] and other['training_key'] != first['training_key']
+
+    # Reusing an older run's version makes it live again
+    reused = trainer.train_model('basic', fold_scaler=False, random_state=7)
+    assert reused['cached'] and reused['activated']
+    assert model_trainer.model_registry.get('basic').model_info['version'] == other['version']
+
+
+def test_pruned_versions_are_misses(trainer):
+    first = trainer.train_model('basic', fold_scaler=False, activate=False)
+    model = model_trainer.model_registry.get('basic')
+    os.remove(os.path.join(model.versions_dir, f"{first['version']}.pkl"))
+
+    retrained = trainer.train_model('basic', fold_scaler=False, activate=False)
+
+    assert not retrained['cached']
+    assert retrained['version'] != first['version']
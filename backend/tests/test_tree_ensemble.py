@@ -0,0 +1,273 @@
+import copy
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.models.tree_ensemble import FlatTreeEnsemble
+
+MODEL_TYPES = ["basic", "advanced", "water_quality"]
+
+
+def _scaled(model, X):
+    return model.scaler.transform(X)
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_explain_sums_to_raw_prediction(trained_models, datasets, model_type):
+    """For every row, the bias plus the feature contributions is the ensemble's raw output."""
+    model = trained_models[model_type]
+    X = _scaled(model, datasets[model_type][0][:500])
+    ensemble = FlatTreeEnsemble.from_sklearn(model.model)
+    raw = ensemble.raw_predict(X)
+
+    bias, contributions = ensemble.explain(X)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), raw, rtol=0, atol=1e-9)
+
+    outputs = np.arange(len(X)) % raw.shape[1]
+    bias, contributions = ensemble.explain(X, outputs)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), raw[np.arange(len(X)), outputs], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_explain_batch_sums_to_model_output(trained_models, datasets, model_type):
+    """Each explanation's base value plus contributions is the model's output for the explained target."""
+    model = trained_models[model_type]
+    X = datasets[model_type][0][:200]
+    rows = [dict(zip(model.feature_names, row)) for row in X]
+    explanations = model.explain_batch(rows)
+    totals = np.array([
+        explanation['base_value'] + sum(explanation['contributions'].values()) for explanation in explanations
+    ])
+
+    X_scaled = _scaled(model, X)
+    if model.TASK == 'regression':
+        expected = model.model.predict(X_scaled)
+    else:
+        predicted = [explanation['target'] for explanation in explanations]
+        class_index = np.searchsorted(model.model.classes_, predicted)
+        if model_type == 'basic':
+            expected = model.model.predict_proba(X_scaled)[np.arange(len(X)), class_index]
+        else:
+            expected = model.model.decision_function(X_scaled)[np.arange(len(X)), class_index]
+        assert predicted == list(model.model.predict(X_scaled))
+    np.testing.assert_allclose(totals, expected, rtol=0, atol=1e-9)
+
+
+def _rows_on_thresholds(ensemble: FlatTreeEnsemble, thresholds: np.ndarray, base: np.ndarray) -> np.ndarray:
+    """Copies of dataset rows with one split's feature set to the given value, one row per split."""
+    split = np.flatnonzero(ensemble.left != np.arange(ensemble.n_nodes))
+    rows = base[np.arange(len(split)) % len(base)].copy()
+    rows[np.arange(len(split)), ensemble.feature[split].astype(int)] = thresholds[split]
+    return rows
+
+
+@pytest.mark.parametrize("model_type", MODEL_TYPES)
+def test_folded_scaler_matches_scaled_path(trained_models, datasets, model_type):
+    """With the scaler folded in, every row reaches the same leaf of every tree as through scaler + scikit-learn."""
+    model = trained_models[model_type]
+    X = datasets[model_type][0]
+    folded_model = copy.deepcopy(model)
+    report = folded_model.fold_scaler(pd.DataFrame(X, columns=model.feature_names))
+    assert report['applied'] and report['mismatches'] == 0
+    folded = folded_model.model
+    assert folded.raw_features
+
+    # Rows on every split boundary: the folded threshold (the largest value that goes
+    # left), the next float up (the smallest that goes right) and the original scaled
+    # threshold mapped back to unscaled units
+    unfolded = FlatTreeEnsemble.from_sklearn(model.model)
+    unscaled = unfolded.threshold * model.scaler.scale_[unfolded.feature] + model.scaler.mean_[unfolded.feature]
+    X_all = np.vstack([
+        X,
+        _rows_on_thresholds(folded, folded.threshold, X),
+        _rows_on_thresholds(folded, np.nextafter(folded.threshold, np.inf), X),
+        _rows_on_thresholds(unfolded, unscaled, X)
+    ])
+    X_scaled = model.scaler.transform(X_all)
+
+    sklearn_leaves = model.model.apply(X_scaled).reshape(len(X_all), -1)
+    np.testing.assert_array_equal(folded.apply(X_all) - folded.node_offsets[:-1], sklearn_leaves)
+    np.testing.assert_array_equal(folded.raw_predict(X_all), unfolded.raw_predict(X_scaled))
+
+    # Outputs only differ from scikit-learn's by the order leaf values are summed in
+    rows = pd.DataFrame(X_all, columns=model.feature_names)
+    if model.TASK == 'classification':
+        np.testing.assert_array_equal(folded.predict(X_all), model.model.predict(X_scaled))
+        np.testing.assert_allclose(folded.predict_proba(X_all), model.model.predict_proba(X_scaled), rtol=0, atol=1e-12)
+        # The serving path: unscaled rows straight into the folded model
+        np.testing.assert_array_equal(folded_model.predict_array(rows).argmax(axis=1), model.predict_array(rows).argmax(axis=1))
+    else:
+        np.testing.assert_allclose(folded.predict(X_all), model.model.predict(X_scaled), rtol=0, atol=1e-12)
+        np.testing.assert_allclose(folded_model.predict_array(rows), model.predict_array(rows), rtol=0, atol=1e-12)
+
+
+def _best_time(function, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def test_folded_models_score_large_batches_in_bounded_memory(trained_models, datasets):
+    """Big batches neither hold a leaf per row and tree nor run slower than scikit-learn."""
+    model = trained_models['advanced']
+    X = datasets['advanced'][0]
+    folded_model = copy.deepcopy(model)
+    assert folded_model.fold_scaler(pd.DataFrame(X, columns=model.feature_names))['applied']
+    folded = folded_model.model
+    assert type(folded_model.scaled_model).__name__ == 'GradientBoostingClassifier'
+
+    batch = X[np.random.default_rng(0).integers(0, len(X), 20000)]
+    tracemalloc.start()
+    try:
+        probabilities = folded.predict_proba(batch)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # A leaf index and value per row and tree would take hundreds of megabytes
+    assert folded.n_trees * len(batch) * 16 > 300e6
+    assert peak < 40e6
+    np.testing.assert_allclose(probabilities, model.model.predict_proba(model.scaler.transform(batch)), rtol=0, atol=1e-12)
+
+    rows = pd.DataFrame(batch, columns=model.feature_names)
+    np.testing.assert_allclose(folded_model.predict_array(rows), model.predict_array(rows), rtol=0, atol=1e-12)
+    folded_time = _best_time(lambda: folded_model.predict_array(rows))
+    scaled_time = _best_time(lambda: model.predict_array(rows))
+    assert folded_time < 1.5 * scaled_time + 0.02
+
+    # A few rows are still scored by the folded ensemble, which skips the scaler
+    few = rows.iloc[:settings.FOLDED_MAX_BATCH_ROWS // 4].to_dict('records')
+    assert _best_time(lambda: folded_model.predict_array(few), 10) < _best_time(lambda: model.predict_array(few), 10)
+
+
+def _bisect_to_boundary(ensemble: FlatTreeEnsemble, X: np.ndarray, steps: int = 40) -> np.ndarray:
+    """Rows on both sides of a class change, found by bisecting between rows of different classes."""
+    predicted = ensemble.predict(X)
+    first = np.flatnonzero(predicted != predicted[0])[:50]
+    low = np.repeat(X[:1], len(first), axis=0)
+    high = X[first].copy()
+    for _ in range(steps):
+        middle = (low + high) / 2
+        same = ensemble.predict(middle) == predicted[0]
+        low[same] = middle[same]
+        high[~same] = middle[~same]
+    return np.vstack([low, high])
+
+
+def _with_tie(ensemble: FlatTreeEnsemble, raw: np.ndarray, offset: float) -> FlatTreeEnsemble:
+    """A copy whose initial scores put the row's two leading classes `offset` apart."""
+    tied = copy.deepcopy(ensemble)
+    init_raw = tied.init_raw.astype(np.float64)
+    if len(init_raw) == 1:
+        init_raw[0] -= raw[0] + offset
+    else:
+        leader, runner_up = np.argsort(raw)[::-1][:2]
+        init_raw[runner_up] += raw[leader] - raw[runner_up] + offset
+    tied.init_raw = init_raw
+    return tied
+
+
+def _assert_early_exit_matches(ensemble: FlatTreeEnsemble, X: np.ndarray, block: int = 5) -> np.ndarray:
+    predictions, stages = ensemble.predict_early_exit(X, block)
+    np.testing.assert_array_equal(predictions, ensemble.predict(X))
+    assert ((stages >= 1) & (stages <= ensemble.n_stages)).all()
+    return stages
+
+
+def test_early_exit_labels_match_full_evaluation(trained_models, datasets):
+    """predict_labels gives predict's classes, skipping stages only for folded mid-sized batches."""
+    model = trained_models['advanced']
+    X = datasets['advanced'][0]
+    rows = pd.DataFrame(X, columns=model.feature_names)
+    expected = model.model.predict(_scaled(model, X))
+    n_stages = model.model.n_estimators_
+
+    labels, early_exit = model.predict_labels(rows)
+    np.testing.assert_array_equal(labels, expected)
+    assert early_exit == {'n_stages': n_stages, 'mean_stages': n_stages, 'min_stages': n_stages, 'max_stages': n_stages}
+
+    folded_model = copy.deepcopy(model)
+    folded_model.fold_scaler(rows)
+    for n_rows in (1, settings.EARLY_EXIT_MIN_BATCH_ROWS, settings.FOLDED_MAX_BATCH_ROWS, len(X)):
+        folded_labels, folded_exit = folded_model.predict_labels(rows.iloc[:n_rows])
+        np.testing.assert_array_equal(folded_labels, expected[:n_rows])
+        assert folded_exit['n_stages'] == n_stages
+        early = settings.EARLY_EXIT_MIN_BATCH_ROWS <= n_rows <= settings.FOLDED_MAX_BATCH_ROWS
+        assert (folded_exit['mean_stages'] < n_stages) == early
+        assert folded_exit['min_stages'] <= folded_exit['max_stages'] <= n_stages
+
+    for block in (1, 3, n_stages):
+        _assert_early_exit_matches(model._tree_ensemble(), _scaled(model, X), block)
+
+
+def test_early_exit_is_only_used_where_it_beats_predict(trained_models, datasets):
+    """Labels-only batches take no longer than scikit-learn's predict, and early exit saves stages."""
+    model = trained_models['advanced']
+    X = datasets['advanced'][0]
+    folded_model = copy.deepcopy(model)
+    folded_model.fold_scaler(pd.DataFrame(X, columns=model.feature_names))
+    batch = pd.DataFrame(X[np.random.default_rng(0).integers(0, len(X), 20000)], columns=model.feature_names)
+
+    def sklearn_predict(rows):
+        return model.model.predict(model.scaler.transform(rows))
+
+    # Mid-sized folded batches exit early, skipping stages and beating predict
+    rows = batch.iloc[:settings.FOLDED_MAX_BATCH_ROWS]
+    labels, early_exit = folded_model.predict_labels(rows)
+    np.testing.assert_array_equal(labels, sklearn_predict(rows))
+    assert early_exit['mean_stages'] < 0.8 * early_exit['n_stages']
+    assert _best_time(lambda: folded_model.predict_labels(rows), 10) < _best_time(lambda: sklearn_predict(rows), 10)
+
+    # Large batches, and every batch of an unfolded model, are left to predict
+    for labels_model in (model, folded_model):
+        labels, early_exit = labels_model.predict_labels(batch)
+        np.testing.assert_array_equal(labels, sklearn_predict(batch))
+        assert early_exit['mean_stages'] == early_exit['n_stages']
+        labels_time = _best_time(lambda: labels_model.predict_labels(batch))
+        assert labels_time < 1.2 * _best_time(lambda: sklearn_predict(batch)) + 0.02
+
+
+def test_early_exit_matches_on_near_ties(trained_models, datasets):
+    """Rows at class boundaries and rows whose leading classes (nearly) tie get predict's class."""
+    model = trained_models['advanced']
+    ensemble = FlatTreeEnsemble.from_sklearn(model.model)
+    X = _scaled(model, datasets['advanced'][0])
+
+    boundary = _bisect_to_boundary(ensemble, X)
+    assert len(set(ensemble.predict(boundary))) > 1
+    _assert_early_exit_matches(ensemble, boundary)
+
+    raw = ensemble.raw_predict(X)
+    for row in range(0, len(X), max(1, len(X) // 8)):
+        for offset in (0.0, 1e-15, -1e-15, 1e-9, -1e-9):
+            tied = _with_tie(ensemble, raw[row], offset)
+            stages = _assert_early_exit_matches(tied, X)
+            if abs(offset) < 1e-12:
+                # A lead within rounding error can never be settled early
+                assert stages[row] == tied.n_stages
+
+
+def test_early_exit_binary_classifier():
+    """Binary boosting has a single raw score; its sign decides the class, ties included."""
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    X, y = make_classification(n_samples=2000, n_features=8, n_informative=5, random_state=0)
+    sklearn_model = GradientBoostingClassifier(n_estimators=60, max_depth=3, random_state=0).fit(X, y)
+    ensemble = FlatTreeEnsemble.from_sklearn(sklearn_model)
+
+    stages = _assert_early_exit_matches(ensemble, X)
+    np.testing.assert_array_equal(ensemble.predict_early_exit(X)[0], sklearn_model.predict(X))
+    assert stages.mean() < ensemble.n_stages
+    _assert_early_exit_matches(ensemble, _bisect_to_boundary(ensemble, X))
+
+    raw = ensemble.raw_predict(X)[:, 0]
+    for row in (0, 1, 2):
+        for offset in (0.0, 1e-15, -1e-15):
+            _assert_early_exit_matches(_with_tie(ensemble, raw[row:row + 1], offset), X)
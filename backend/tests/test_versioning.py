@@ -0,0 +1,88 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.models.prediction import BasicFishPredictionModel
+from app.services.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def version_paths(tmp_path, monkeypatch):
+    """Point the basic model's live file and versions at an empty directory."""
+    monkeypatch.setattr(settings, 'BASIC_MODEL_PATH', str(tmp_path / "basic.pkl"))
+    monkeypatch.setattr(settings, 'MODEL_VERSIONS_PATH', str(tmp_path / "versions"))
+    return tmp_path
+
+
+def _live_bytes(model) -> bytes:
+    with open(model.model_path, 'rb') as f:
+        return f.read()
+
+
+def _version_bytes(model, version: str) -> bytes:
+    with open(model._version_path(version), 'rb') as f:
+        return f.read()
+
+
+def test_save_and_rollback_restore_previous_version(version_paths, datasets):
+    first = BasicFishPredictionModel()
+    first.train(random_state=1, fold_scaler=False)
+    second = BasicFishPredictionModel()
+    second.train(random_state=2, fold_scaler=False)
+    v1, v2 = first.model_info['version'], second.model_info['version']
+
+    assert v1 != v2
+    assert second.active_version() == v2
+    assert _live_bytes(second) == _version_bytes(second, v2)
+    assert [info['version'] for info in second.list_versions()] == [v2, v1]
+
+    registry = ModelRegistry()
+    assert registry.get('basic').model_info['version'] == v2
+    in_flight = registry.get('basic')
+
+    restored = registry.rollback('basic', v1)
+
+    assert restored.active_version() == v1
+    assert _live_bytes(restored) == _version_bytes(restored, v1)
+    assert registry.get('basic') is restored
+    # Requests that already took the previous model keep it
+    assert in_flight.model_info['version'] == v2
+    X, _ = datasets['basic']
+    rows = [dict(zip(first.feature_names, row)) for row in X[:50]]
+    assert restored.predict_batch(rows) == first.predict_batch(rows)
+    assert BasicFishPredictionModel().model_info['version'] == v1
+    assert not [name for name in os.listdir(version_paths) if name.startswith(".tmp-")]
+
+
+def test_rollback_is_atomic_for_readers(version_paths):
+    """Readers of the live file see one complete version or the other while versions are swapped."""
+    first = BasicFishPredictionModel()
+    first.train(random_state=1, fold_scaler=False)
+    second = BasicFishPredictionModel()
+    second.train(random_state=2, fold_scaler=False)
+    versions = {first.model_info['version'], second.model_info['version']}
+
+    registry = ModelRegistry()
+    done = threading.Event()
+
+    def swap_back_and_forth():
+        try:
+            for _ in range(10):
+                for version in sorted(versions):
+                    registry.rollback('basic', version)
+        finally:
+            done.set()
+
+    swapper = threading.Thread(target=swap_back_and_forth)
+    swapper.start()
+    seen = set()
+    while not done.is_set():
+        with open(settings.BASIC_MODEL_PATH, 'rb') as f:
+            seen.add(pickle.load(f)['model_info']['version'])
+    swapper.join()
+
+    assert seen <= versions
+    assert registry.get('basic').active_version() == max(versions)